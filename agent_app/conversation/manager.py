@@ -1,13 +1,26 @@
 """
 Conversation Manager for Interactive Chat Interface
 Manages conversation state, chart data caching, and message history
+
+Session store calls are blocking (the SQLite backend may wait up to its busy timeout for
+another worker's write), so the async entry points run them in threads via asyncio.to_thread.
+
+Long chats are compacted: once the unsummarized history exceeds SUMMARY_TOKEN_BUDGET,
+older turns are folded into a rolling summary in a background task, and the agent is sent
+the summary plus the recent turns instead of the whole history.
 """
 
 import uuid
 import os
-from typing import Dict, List, Optional
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
-from agent_app.graphs.astrology_agent_graph import agent_graph
+from agent_app.graphs.astrology_agent_graph import agent_graph, stream_agent, rag_system
+from agent_app.conversation.session_store import create_session_store
+
+logger = logging.getLogger(__name__)
 
 # Try to import tiktoken for token counting, fallback if not available
 try:
@@ -21,14 +34,19 @@ class ConversationManager:
     """Manages conversation sessions and state"""
     
     def __init__(self):
-        # In-memory storage (in production, use Redis or database)
-        self.sessions: Dict[str, Dict] = {}
+        # Session storage: in-memory or SQLite (SESSION_BACKEND), bounded with idle expiry
+        self.sessions = create_session_store()
         
         # Context window management
         self.max_messages = int(os.getenv("MAX_MESSAGES", "50"))  # Hard limit on messages
         self.max_tokens = int(os.getenv("MAX_TOKENS", "8000"))  # Token limit (leave room for response)
         self.recent_messages_count = int(os.getenv("RECENT_MESSAGES_COUNT", "10"))  # Always keep last N messages
         
+        # Rolling summary of older turns (budget 0 disables summarization)
+        self.summary_token_budget = int(os.getenv("SUMMARY_TOKEN_BUDGET", "1000"))  # Unsummarized history limit
+        self.context_recent_messages = int(os.getenv("CONTEXT_RECENT_MESSAGES", "4"))  # Never summarized
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
+        
         # Initialize token encoding if available
         if TIKTOKEN_AVAILABLE:
             try:
@@ -62,10 +80,14 @@ class ConversationManager:
         }
         
         # Initialize session
-        self.sessions[session_id] = {
+        self.sessions.save({
             "session_id": session_id,
             "birth_data": normalized_birth_data,
             "messages": [],
+            "token_count": 0,
+            "message_seq": 0,
+            "epoch": 0,
+            "summary": None,
             "chart_cache": {
                 "bav_sav_data": None,
                 "dasha_data": None,
@@ -79,10 +101,28 @@ class ConversationManager:
             },
             "created_at": datetime.now().isoformat(),
             "last_activity": datetime.now().isoformat()
-        }
+        })
         
         return session_id
     
+    async def astart_conversation(self, birth_data: Dict) -> str:
+        """start_conversation without blocking the event loop"""
+        return await asyncio.to_thread(self.start_conversation, birth_data)
+    
+    def _get_session(self, session_id: str) -> Dict:
+        """Session by id; raises ValueError if it doesn't exist or has expired"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ValueError(f"Session {session_id} not found")
+        return session
+    
+    def _update_session(self, session_id: str, change) -> Dict:
+        """Apply change(session) atomically in the store; raises ValueError if the session is gone"""
+        session = self.sessions.update(session_id, change)
+        if session is None:
+            raise ValueError(f"Session {session_id} not found")
+        return session
+    
     def _count_tokens(self, text: str) -> int:
         """Count tokens in text"""
         if not text:
@@ -98,44 +138,42 @@ class ConversationManager:
             # Fallback: rough estimate (1 token ≈ 4 characters)
             return len(text) // 4
     
-    def _truncate_messages(self, messages: List[Dict]) -> List[Dict]:
-        """Truncate messages to fit token limit while preserving recent messages"""
-        if not messages:
-            return []
-        
-        # Separate system message if present
-        system_msg = None
-        other_messages = []
-        for msg in messages:
-            if msg.get('role') == 'system':
-                system_msg = msg
-            else:
-                other_messages.append(msg)
-        
-        # Always keep recent messages
-        recent_messages = other_messages[-self.recent_messages_count:] if len(other_messages) > self.recent_messages_count else other_messages
+    def _message_tokens(self, message: Dict) -> int:
+        """Token count of a message, computed once and stored on the message"""
+        if "tokens" not in message:
+            message["tokens"] = self._count_tokens(message.get("content", ""))
+        return message["tokens"]
+    
+    def _session_token_count(self, session: Dict) -> int:
+        """Running token total of the session's non-system messages"""
+        if session.get("token_count") is None:
+            # Sessions created before token accounting
+            session["token_count"] = sum(
+                self._message_tokens(msg) for msg in session["messages"] if msg.get("role") != "system"
+            )
+        return session["token_count"]
+    
+    def _truncate_messages(self, messages: List[Dict], token_count: int) -> int:
+        """
+        Drop the oldest messages (in place) until the history fits the message and token limits.
         
-        # Count tokens in recent messages
-        total_tokens = 0
-        truncated = []
+        A leading system message is always kept. Uses the stored per-message token counts,
+        so the cost is proportional to the number of messages removed.
         
-        # Start from most recent and work backwards
-        for msg in reversed(recent_messages):
-            content = msg.get('content', '')
-            tokens = self._count_tokens(content)
-            
-            if total_tokens + tokens > self.max_tokens:
-                # Stop if adding this message would exceed limit
-                break
-            
-            total_tokens += tokens
-            truncated.insert(0, msg)  # Insert at beginning to maintain order
+        Returns:
+            Token total of the remaining non-system messages
+        """
+        start = 1 if messages and messages[0].get("role") == "system" else 0
+        max_count = min(self.recent_messages_count, self.max_messages - start)
+        excess = len(messages) - start - max_count
         
-        # Add system message at start if present
-        if system_msg:
-            truncated.insert(0, system_msg)
+        remove = 0
+        while start + remove < len(messages) and (remove < excess or token_count > self.max_tokens):
+            token_count -= self._message_tokens(messages[start + remove])
+            remove += 1
         
-        return truncated
+        del messages[start:start + remove]
+        return token_count
     
     def add_message(self, session_id: str, role: str, content: str, metadata: Optional[Dict] = None) -> None:
         """
@@ -145,57 +183,48 @@ class ConversationManager:
             session_id: Session identifier
             role: 'user' or 'assistant'
             content: Message content
-            metadata: Optional metadata (citations, chart_data, etc.)
+            metadata: Optional metadata (citations, etc.)
         """
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-        
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "metadata": metadata or {}
-        }
+        tokens = self._count_tokens(content)
         
-        self.sessions[session_id]["messages"].append(message)
-        self.sessions[session_id]["last_activity"] = datetime.now().isoformat()
-        
-        # Apply message count limit
-        messages = self.sessions[session_id]["messages"]
-        if len(messages) > self.max_messages:
-            # Keep system message + recent messages
-            system_msg = None
-            other_messages = []
-            for msg in messages:
-                if msg.get('role') == 'system':
-                    system_msg = msg
-                else:
-                    other_messages.append(msg)
+        def append(session: Dict):
+            token_count = self._session_token_count(session)
+            
+            # Sequence numbers keep increasing across truncation; the summary records the last one it covers
+            session["message_seq"] = (session.get("message_seq") or 0) + 1
             
-            # Keep last N-1 messages (excluding system)
-            recent = other_messages[-(self.max_messages-1):] if system_msg else other_messages[-self.max_messages:]
-            self.sessions[session_id]["messages"] = ([system_msg] + recent) if system_msg else recent
+            session["messages"].append({
+                "role": role,
+                "content": content,
+                "timestamp": datetime.now().isoformat(),
+                "metadata": metadata or {},
+                "tokens": tokens,
+                "seq": session["message_seq"]
+            })
+            session["last_activity"] = datetime.now().isoformat()
+            if role != "system":
+                token_count += tokens
+            
+            # Apply message count and token limits
+            session["token_count"] = self._truncate_messages(session["messages"], token_count)
         
-        # Also truncate by tokens
-        self.sessions[session_id]["messages"] = self._truncate_messages(
-            self.sessions[session_id]["messages"]
-        )
+        self._update_session(session_id, append)
     
     def get_conversation(self, session_id: str) -> Optional[Dict]:
         """Get full conversation state"""
         return self.sessions.get(session_id)
     
+    async def aget_conversation(self, session_id: str) -> Optional[Dict]:
+        """get_conversation without blocking the event loop"""
+        return await asyncio.to_thread(self.sessions.get, session_id)
+    
     def get_messages(self, session_id: str) -> List[Dict]:
-        """Get conversation messages with automatic truncation"""
-        if session_id not in self.sessions:
+        """Get conversation messages (kept within the limits by add_message)"""
+        session = self.sessions.get(session_id)
+        if session is None:
             return []
         
-        messages = self.sessions[session_id]["messages"]
-        
-        # Apply truncation
-        messages = self._truncate_messages(messages)
-        
-        return messages
+        return session["messages"]
     
     def update_chart_cache(self, session_id: str, chart_data: Dict) -> None:
         """
@@ -205,99 +234,159 @@ class ConversationManager:
             session_id: Session identifier
             chart_data: Dictionary with bav_sav_data, dasha_data, gochara_data
         """
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-        
-        self.sessions[session_id]["chart_cache"].update({
+        # A new dict: the store compares the chart cache by identity instead of serializing it
+        self._update_session(session_id, lambda session: session.update(chart_cache={
+            **session["chart_cache"],
             "bav_sav_data": chart_data.get("bav_sav_data"),
             "dasha_data": chart_data.get("dasha_data"),
             "gochara_data": chart_data.get("gochara_data"),
             "cached_at": datetime.now().isoformat()
-        })
+        }))
     
     def get_chart_cache(self, session_id: str) -> Dict:
         """Get cached chart data"""
-        if session_id not in self.sessions:
+        session = self.sessions.get(session_id)
+        if session is None:
             return {}
-        return self.sessions[session_id]["chart_cache"]
+        return session["chart_cache"]
     
     def update_context(self, session_id: str, context_updates: Dict) -> None:
         """Update conversation context"""
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-        
-        self.sessions[session_id]["context"].update(context_updates)
+        self._update_session(session_id, lambda session: session["context"].update(context_updates))
     
     def get_context(self, session_id: str) -> Dict:
         """Get conversation context"""
-        if session_id not in self.sessions:
+        session = self.sessions.get(session_id)
+        if session is None:
             return {}
-        return self.sessions[session_id]["context"]
+        return session["context"]
     
     def reset_conversation(self, session_id: str) -> None:
         """Reset conversation but keep birth data and chart cache"""
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-        
-        birth_data = self.sessions[session_id]["birth_data"]
-        chart_cache = self.sessions[session_id]["chart_cache"]
+        self._cancel_summary(session_id)
+        self._reset_session(session_id)
+    
+    async def areset_conversation(self, session_id: str) -> None:
+        """reset_conversation without blocking the event loop"""
+        self._cancel_summary(session_id)
+        await asyncio.to_thread(self._reset_session, session_id)
+    
+    def _cancel_summary(self, session_id: str):
+        """Cancel this process's summary task for the session (it belongs to the old history)"""
+        task = self._summary_tasks.pop(session_id, None)
+        if task:
+            task.cancel()
+    
+    def _reset_session(self, session_id: str):
+        """Clear the stored history, summary and context"""
+        def reset(session: Dict):
+            session.update({
+                "messages": [],
+                "token_count": 0,
+                "message_seq": 0,
+                # Summaries computed before the reset (on any worker) are discarded when they finish
+                "epoch": (session.get("epoch") or 0) + 1,
+                "summary": None,
+                "context": {
+                    "discussed_houses": [],
+                    "discussed_topics": [],
+                    "user_interests": []
+                },
+                "last_activity": datetime.now().isoformat()
+            })
         
-        self.sessions[session_id] = {
-            "session_id": session_id,
-            "birth_data": birth_data,
-            "messages": [],
-            "chart_cache": chart_cache,
-            "context": {
-                "discussed_houses": [],
-                "discussed_topics": [],
-                "user_interests": []
-            },
-            "created_at": self.sessions[session_id]["created_at"],
-            "last_activity": datetime.now().isoformat()
-        }
+        self._update_session(session_id, reset)
+    
+    def stats(self) -> Dict:
+        """Session store counts and memory use"""
+        return {**self.sessions.stats(), "summaries_in_progress": len(self._summary_tasks)}
+    
+    def _unsummarized_messages(self, session: Dict) -> List[Dict]:
+        """Messages not yet folded into the session's summary, oldest first"""
+        through_seq = (session.get("summary") or {}).get("through_seq", 0)
+        return [msg for msg in session["messages"] if msg.get("seq", 0) > through_seq]
+    
+    def _conversation_context(self, session: Dict) -> str:
+        """Prompt text for the history: the rolling summary (if any) plus the unsummarized turns"""
+        summary = session.get("summary") or {}
+        lines = []
+        if summary.get("text"):
+            lines.append(f"Summary of earlier conversation: {summary['text']}")
+        lines.extend(f"{msg['role']}: {msg['content']}" for msg in self._unsummarized_messages(session))
+        return "\n".join(lines)
     
-    def process_message(self, session_id: str, user_message: str) -> Dict:
+    async def _schedule_summary(self, session_id: str):
         """
-        Process user message through agent and return response
-        
-        Args:
-            session_id: Session identifier
-            user_message: User's question/message
-        
-        Returns:
-            Dictionary with response, citations, chart_data, etc.
+        Start a background summary update when the unsummarized history is over budget
+        (or about to be truncated). The request doesn't wait for it; until it finishes,
+        the unsummarized turns are sent as they are.
         """
-        import time
-        process_start = time.time()
-        
-        if session_id not in self.sessions:
-            raise ValueError(f"Session {session_id} not found")
-        
-        session = self.sessions[session_id]
+        if self.summary_token_budget <= 0 or session_id in self._summary_tasks:
+            return
+        session = await asyncio.to_thread(self.sessions.get, session_id)
+        # Another request may have started one while the session was read
+        if session is None or session_id in self._summary_tasks:
+            return
+        
+        unsummarized = self._unsummarized_messages(session)
+        older = unsummarized[:-self.context_recent_messages] if self.context_recent_messages else unsummarized
+        over_budget = sum(self._message_tokens(msg) for msg in unsummarized) > self.summary_token_budget
+        near_truncation = len(unsummarized) >= self.recent_messages_count
+        if not older or not (over_budget or near_truncation):
+            return
+        
+        task = asyncio.get_running_loop().create_task(self._update_summary(session_id, older))
+        self._summary_tasks[session_id] = task
+        task.add_done_callback(lambda _: self._summary_tasks.pop(session_id, None)
+                               if self._summary_tasks.get(session_id) is task else None)
+    
+    async def _update_summary(self, session_id: str, messages: List[Dict]):
+        """Fold messages into the session summary (runs off the request path)"""
+        summary_start = time.time()
+        try:
+            session = await asyncio.to_thread(self.sessions.get, session_id)
+            if session is None:
+                return
+            previous = session.get("summary") or {}
+            epoch = session.get("epoch") or 0
+            text = await rag_system.asummarize_conversation(previous.get("text"), messages)
+            
+            summary = {"text": text, "through_seq": messages[-1]["seq"], "tokens": self._count_tokens(text)}
+            
+            def store_summary(session: Dict):
+                # Only if no reset and no other summary landed while this one was generated
+                if ((session.get("epoch") or 0) == epoch
+                        and (session.get("summary") or {}).get("through_seq", 0) == previous.get("through_seq", 0)):
+                    session["summary"] = summary
+            
+            session = await asyncio.to_thread(self.sessions.update, session_id, store_summary)
+            if session is None or session.get("summary") is not summary:
+                return
+            logger.info(f"📝 Summarized {len(messages)} messages for session {session_id} "
+                        f"in {time.time() - summary_start:.2f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The turns stay unsummarized and are sent verbatim; retried after the next turn
+            logger.warning(f"⚠️ Conversation summary failed for session {session_id}: {e}")
+    
+    def _prepare_turn(self, session_id: str, user_message: str) -> Dict:
+        """Record the user message and build the agent's initial state for it"""
+        session = self._get_session(session_id)
         birth_data = session["birth_data"]
         chart_cache = session["chart_cache"]
         context = session["context"]
-        previous_messages = session["messages"]
+        # Summary of older turns plus the recent ones (before this message is added)
+        conversation_context = self._conversation_context(session)
         
         # Add user message to history
         self.add_message(session_id, "user", user_message)
         
-        # Prepare agent state with conversation context
-        # Get messages (already truncated by get_messages or add_message)
-        # Use all available messages (they're already limited)
-        conversation_context = "\n".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in previous_messages
-        ])
-        
-        # Build query with conversation context
-        enhanced_query = user_message
-        if conversation_context:
-            enhanced_query = f"Previous conversation:\n{conversation_context}\n\nCurrent question: {user_message}"
-        
-        # Prepare initial state for agent
-        initial_state = {
-            "user_query": enhanced_query,
+        # Prepare initial state for agent: the question drives routing and retrieval,
+        # the conversation context only goes into the interpretation prompt
+        return {
+            "user_query": user_message,
+            "conversation_context": conversation_context,
             "birth_data": birth_data,
             "query_intent": "",
             "selected_houses": context.get("discussed_houses", []),
@@ -309,15 +398,12 @@ class ConversationManager:
             "intermediate_results": {},
             "final_response": None,
             "citations": [],
-            "needs_more_context": False
+            "needs_more_context": False,
+            "fact_intent": None
         }
-        
-        # Run agent graph
-        agent_start = time.time()
-        result = agent_graph.invoke(initial_state)
-        agent_duration = time.time() - agent_start
-        print(f"⏱️ Total agent_graph.invoke took {agent_duration:.2f}s")
-        
+    
+    def _complete_turn(self, session_id: str, user_message: str, result: Dict) -> Dict:
+        """Cache chart data, update context and history from the agent result; build the reply"""
         # Update chart cache if new data was retrieved
         if result.get("bav_sav_data") or result.get("dasha_data") or result.get("gochara_data"):
             self.update_chart_cache(session_id, {
@@ -335,22 +421,18 @@ class ConversationManager:
         discussed_houses = self._extract_houses(user_message, response)
         discussed_topics = self._extract_topics(user_message)
         
-        if discussed_houses:
-            context["discussed_houses"] = list(set(context.get("discussed_houses", []) + discussed_houses))
-        if discussed_topics:
-            context["discussed_topics"] = list(set(context.get("discussed_topics", []) + discussed_topics))
+        def merge_context(session: Dict):
+            context = session["context"]
+            if discussed_houses:
+                context["discussed_houses"] = list(set(context.get("discussed_houses", []) + discussed_houses))
+            if discussed_topics:
+                context["discussed_topics"] = list(set(context.get("discussed_topics", []) + discussed_topics))
         
-        self.update_context(session_id, context)
+        # Merged into the stored context, which another request may have changed meanwhile
+        context = self._update_session(session_id, merge_context)["context"]
         
-        # Add assistant response to history
-        self.add_message(session_id, "assistant", response, {
-            "citations": citations,
-            "chart_data": {
-                "bav_sav": result.get("bav_sav_data"),
-                "dasha": result.get("dasha_data"),
-                "gochara": result.get("gochara_data")
-            }
-        })
+        # Add assistant response to history (chart data lives once, in the session's chart cache)
+        self.add_message(session_id, "assistant", response, {"citations": citations})
         
         return {
             "response": response,
@@ -362,9 +444,59 @@ class ConversationManager:
             },
             "suggestions": self._generate_suggestions(context, result)
         }
+    
+    async def process_message(self, session_id: str, user_message: str) -> Dict:
+        """
+        Process user message through agent and return response
+        
+        Args:
+            session_id: Session identifier
+            user_message: User's question/message
+        
+        Returns:
+            Dictionary with response, citations, chart_data, etc.
+        """
+        process_start = time.time()
+        
+        initial_state = await asyncio.to_thread(self._prepare_turn, session_id, user_message)
+        
+        # Run agent graph
+        agent_start = time.time()
+        result = await agent_graph.ainvoke(initial_state)
+        agent_duration = time.time() - agent_start
+        print(f"⏱️ Total agent_graph.ainvoke took {agent_duration:.2f}s")
+        
+        reply = await asyncio.to_thread(self._complete_turn, session_id, user_message, result)
+        await self._schedule_summary(session_id)
         
         process_duration = time.time() - process_start
         print(f"⏱️ Total process_message took {process_duration:.2f}s")
+        return reply
+    
+    async def stream_message(self, session_id: str, user_message: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Streaming variant of process_message.
+        
+        Yields the agent's ("progress", ...) and ("token", ...) events as they happen
+        (see stream_agent), then ("done", reply) with the same fields process_message returns.
+        """
+        process_start = time.time()
+        
+        initial_state = await asyncio.to_thread(self._prepare_turn, session_id, user_message)
+        
+        result = None
+        async for event, data in stream_agent(initial_state):
+            if event == "done":
+                result = data
+            else:
+                yield event, data
+        
+        reply = await asyncio.to_thread(self._complete_turn, session_id, user_message, result)
+        await self._schedule_summary(session_id)
+        
+        process_duration = time.time() - process_start
+        print(f"⏱️ Total stream_message took {process_duration:.2f}s")
+        yield "done", reply
     
     def _extract_houses(self, query: str, response: str) -> List[int]:
         """Extract house numbers mentioned in query/response"""
@@ -0,0 +1,502 @@
+"""
+Session Stores for Chat Conversations
+Bounded, thread-safe storage of chat sessions with two backends:
+- "memory" (default): sessions in process memory (one uvicorn worker)
+- "sqlite": sessions in a SQLite file in WAL mode, shared by all workers on one host,
+  so any worker can serve any session without sticky routing
+
+Both backends provide:
+- idle-TTL expiry (sessions not used for SESSION_IDLE_TTL seconds are dropped)
+- a cap on the number of sessions, evicting the least recently used
+- a background sweeper thread that removes expired sessions between requests
+- size accounting, reported by stats()
+- update(): atomic read-modify-write of one session; the sqlite backend holds the database
+  write lock for it and writes only what changed (new messages are single INSERTs), so
+  workers sharing a session don't overwrite each other's changes
+
+Configuration (environment variables):
+- SESSION_BACKEND: "memory" (default) or "sqlite"
+- SESSION_DB_PATH: SQLite file for the sqlite backend (default: chat_sessions.db)
+- MAX_SESSIONS: max sessions (default 1000)
+- SESSION_IDLE_TTL: seconds of inactivity before a session expires (default 3600)
+- SESSION_SWEEP_INTERVAL: seconds between sweeps (default 60)
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def session_size(session: Dict) -> int:
+    """Approximate memory footprint of a session: its JSON-serialized size in bytes"""
+    return len(json.dumps(session, default=str))
+
+
+class SessionStore(ABC):
+    """
+    Storage interface for ConversationManager.
+
+    get() returns the session dict (birth_data, messages, chart_cache, context, ...).
+    save() writes a whole session (new or replaced); changes to an existing session go
+    through update(), which applies them to the current stored copy atomically.
+    Writes refresh a session's last use.
+    """
+
+    name = "base"
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 3600, sweep_interval: float = 60):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Session by id, or None if unknown or expired"""
+
+    @abstractmethod
+    def save(self, session: Dict):
+        """Insert or replace a whole session, evicting the least recently used ones over the cap"""
+
+    @abstractmethod
+    def update(self, session_id: str, change: Callable[[Dict], None]) -> Optional[Dict]:
+        """
+        Apply change(session) to the stored session as one atomic read-modify-write.
+
+        change mutates the session dict in place; existing messages are never edited, only
+        appended or dropped, and a changed chart_cache is assigned as a new dict rather than
+        edited in place. Returns the updated session, or None if unknown or expired.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a session and its messages"""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove expired sessions; returns how many were removed"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Session counts and size for monitoring"""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def _ensure_sweeper(self):
+        """Start the background sweeper on first use"""
+        if self._sweeper is None or not self._sweeper.is_alive():
+            with self._lock:
+                if self._sweeper is None or not self._sweeper.is_alive():
+                    self._stop.clear()
+                    self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+                    self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"🧹 Expired {removed} idle chat sessions")
+            except Exception as e:
+                logger.error(f"❌ Session sweep failed: {e}")
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU of sessions in process memory with idle expiry; get() refreshes a session's last use"""
+
+    name = "memory"
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 3600, sweep_interval: float = 60):
+        super().__init__(max_sessions, idle_ttl, sweep_interval)
+        # session_id -> session, least recently used first
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}  # monotonic time of last get/save
+        self._sizes: Dict[str, int] = {}  # computed by stats(), dropped when a session changes
+
+    def _remove(self, session_id: str):
+        """Drop a session (caller holds the lock)"""
+        self._sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self._sizes.pop(session_id, None)
+
+    def _is_expired(self, session_id: str, now: float) -> bool:
+        return now - self._last_used.get(session_id, now) > self.idle_ttl
+
+    def _current(self, session_id: str, now: float) -> Optional[Dict]:
+        """Live session, marked as used now (caller holds the lock)"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._is_expired(session_id, now):
+            self._remove(session_id)
+            self.expired += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = now
+        return session
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._current(session_id, time.monotonic())
+
+    def update(self, session_id: str, change: Callable[[Dict], None]) -> Optional[Dict]:
+        with self._lock:
+            session = self._current(session_id, time.monotonic())
+            if session is None:
+                return None
+            change(session)
+            self._sizes.pop(session_id, None)
+            return session
+
+    def save(self, session: Dict):
+        self._ensure_sweeper()
+        session_id = session["session_id"]
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            self._last_used[session_id] = time.monotonic()
+            self._sizes.pop(session_id, None)
+            while len(self._sessions) > self.max_sessions:
+                oldest_id = next(iter(self._sessions))
+                self._remove(oldest_id)
+                self.evicted += 1
+                logger.info(f"Session {oldest_id} evicted (max {self.max_sessions} sessions)")
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._remove(session_id)
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired_ids = [session_id for session_id in self._sessions if self._is_expired(session_id, now)]
+            for session_id in expired_ids:
+                self._remove(session_id)
+            self.expired += len(expired_ids)
+        return len(expired_ids)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict:
+        """Session counts and memory use for monitoring (per process)"""
+        with self._lock:
+            # Sizes are measured here, only for sessions changed since the last call
+            for session_id, session in self._sessions.items():
+                if session_id not in self._sizes:
+                    self._sizes[session_id] = session_size(session)
+            sizes = list(self._sizes.values())
+            return {
+                "backend": self.name,
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_ttl_seconds": self.idle_ttl,
+                "memory_bytes": sum(sizes),
+                "largest_session_bytes": max(sizes) if sizes else 0,
+                "evicted": self.evicted,
+                "expired": self.expired
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite database (WAL mode) shared by every worker process on the host.
+
+    One row per session (birth data, context, zlib-compressed chart cache) plus one row per
+    message. Expiry uses wall-clock last-use times so all processes agree on them.
+
+    Reads take no write lock. update() runs under BEGIN IMMEDIATE, so another worker can't
+    change the session between its read and its write, and writes only the columns that
+    changed plus INSERTs/DELETEs for appended/dropped messages.
+    """
+
+    name = "sqlite"
+
+    # Session fields stored as chat_sessions columns and compared by value in update()
+    # (messages live in chat_messages; the large chart_cache is compared by identity)
+    COLUMNS = ("birth_data", "context", "last_activity", "summary", "message_seq", "epoch")
+
+    def __init__(self, db_path: str, max_sessions: int = 1000, idle_ttl: float = 3600,
+                 sweep_interval: float = 60):
+        super().__init__(max_sessions, idle_ttl, sweep_interval)
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                birth_data TEXT NOT NULL,
+                context TEXT NOT NULL,
+                chart_cache BLOB,
+                created_at TEXT NOT NULL,
+                last_activity TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                summary TEXT,
+                message_seq INTEGER,
+                epoch INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS chat_sessions_last_used ON chat_sessions (last_used);
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                session_id TEXT NOT NULL REFERENCES chat_sessions (session_id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                timestamp TEXT,
+                metadata TEXT,
+                tokens INTEGER,
+                PRIMARY KEY (session_id, position)
+            );
+        """)
+        # Databases created before per-message token counts, conversation summaries and reset epochs
+        for table, column in (("chat_messages", "tokens INTEGER"), ("chat_sessions", "summary TEXT"),
+                              ("chat_sessions", "message_seq INTEGER"), ("chat_sessions", "epoch INTEGER")):
+            try:
+                self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+            except sqlite3.OperationalError:
+                pass
+        self._db.commit()
+
+    @staticmethod
+    def _pack(value) -> bytes:
+        return zlib.compress(json.dumps(value, default=str).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: Optional[bytes]):
+        return json.loads(zlib.decompress(blob)) if blob else None
+
+    def _column_value(self, field: str, value):
+        """Stored form of a session field"""
+        if field == "chart_cache":
+            return self._pack(value)
+        if field == "summary":
+            return json.dumps(value) if value else None
+        if field == "context":
+            return json.dumps(value or {}, default=str)
+        if field == "birth_data":
+            return json.dumps(value, default=str)
+        return value
+
+    @staticmethod
+    def _message_row(session_id: str, message: Dict) -> tuple:
+        return (session_id, message["seq"], message.get("role"), message.get("content", ""),
+                message.get("timestamp"), json.dumps(message.get("metadata") or {}, default=str),
+                message.get("tokens"))
+
+    def _read(self, session_id: str) -> Optional[Dict]:
+        """Stored session, or None if unknown or expired (caller holds the lock)"""
+        row = self._db.execute(
+            "SELECT birth_data, context, chart_cache, created_at, last_activity, last_used, "
+            "summary, message_seq, epoch FROM chat_sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        # Expired rows are left for the sweeper, so reads never write
+        if row is None or time.time() - row[5] > self.idle_ttl:
+            return None
+        messages = []
+        # Positions are the messages' sequence numbers (list indexes for older rows)
+        for position, role, content, timestamp, metadata, tokens in self._db.execute(
+            "SELECT position, role, content, timestamp, metadata, tokens FROM chat_messages "
+            "WHERE session_id = ? ORDER BY position",
+            (session_id,)
+        ):
+            message = {"role": role, "content": content, "timestamp": timestamp,
+                       "metadata": json.loads(metadata) if metadata else {}, "seq": position}
+            if tokens is not None:
+                message["tokens"] = tokens
+            messages.append(message)
+        # Token total is derived from the stored per-message counts (None if any are missing)
+        counted = [message.get("tokens") for message in messages if message["role"] != "system"]
+        return {
+            "session_id": session_id,
+            "birth_data": json.loads(row[0]),
+            "messages": messages,
+            "token_count": None if None in counted else sum(counted),
+            "chart_cache": self._unpack(row[2]) or {},
+            "context": json.loads(row[1]),
+            "created_at": row[3],
+            "last_activity": row[4],
+            "summary": json.loads(row[6]) if row[6] else None,
+            "message_seq": row[7] if row[7] is not None else (messages[-1]["seq"] if messages else 0),
+            "epoch": row[8] or 0
+        }
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._read(session_id)
+
+    def update(self, session_id: str, change: Callable[[Dict], None]) -> Optional[Dict]:
+        with self._lock:
+            try:
+                # Take the write lock before reading: other workers wait instead of interleaving
+                self._db.execute("BEGIN IMMEDIATE")
+                session = self._read(session_id)
+                if session is None:
+                    self._db.rollback()
+                    return None
+                before = {field: json.dumps(session.get(field), default=str) for field in self.COLUMNS}
+                chart_cache = session.get("chart_cache")
+                stored_seqs = {message["seq"] for message in session["messages"]}
+
+                change(session)
+
+                kept_seqs = {message["seq"] for message in session["messages"]}
+                dropped = sorted(stored_seqs - kept_seqs)
+                added = [message for message in session["messages"] if message["seq"] not in stored_seqs]
+                changed = [field for field in self.COLUMNS
+                           if json.dumps(session.get(field), default=str) != before[field]]
+                if session.get("chart_cache") is not chart_cache:
+                    changed.append("chart_cache")
+                if not (dropped or added or changed):
+                    self._db.rollback()
+                    return session
+
+                self._db.executemany(
+                    "DELETE FROM chat_messages WHERE session_id = ? AND position = ?",
+                    [(session_id, seq) for seq in dropped]
+                )
+                self._db.executemany(
+                    "INSERT INTO chat_messages (session_id, position, role, content, timestamp, metadata, tokens) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [self._message_row(session_id, message) for message in added]
+                )
+                assignments = ", ".join(f"{field} = ?" for field in changed + ["last_used"])
+                self._db.execute(
+                    f"UPDATE chat_sessions SET {assignments} WHERE session_id = ?",
+                    [self._column_value(field, session.get(field)) for field in changed] + [time.time(), session_id]
+                )
+                self._db.commit()
+                return session
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def save(self, session: Dict):
+        self._ensure_sweeper()
+        session_id = session["session_id"]
+        messages: List[Dict] = session.get("messages", [])
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO chat_sessions "
+                    "(session_id, birth_data, context, chart_cache, created_at, last_activity, last_used, "
+                    "summary, message_seq, epoch) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (session_id) DO UPDATE SET birth_data = excluded.birth_data, "
+                    "context = excluded.context, chart_cache = excluded.chart_cache, "
+                    "last_activity = excluded.last_activity, last_used = excluded.last_used, "
+                    "summary = excluded.summary, message_seq = excluded.message_seq, epoch = excluded.epoch",
+                    (
+                        session_id,
+                        self._column_value("birth_data", session.get("birth_data")),
+                        self._column_value("context", session.get("context")),
+                        self._column_value("chart_cache", session.get("chart_cache")),
+                        session.get("created_at"),
+                        session.get("last_activity"),
+                        time.time(),
+                        self._column_value("summary", session.get("summary")),
+                        session.get("message_seq"),
+                        session.get("epoch", 0)
+                    )
+                )
+                self._db.execute("DELETE FROM chat_messages WHERE session_id = ?", (session_id,))
+                self._db.executemany(
+                    "INSERT INTO chat_messages (session_id, position, role, content, timestamp, metadata, tokens) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [self._message_row(session_id, {"seq": position, **message})
+                     for position, message in enumerate(messages)]
+                )
+                # Evict least recently used sessions over the cap
+                overflow = self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0] - self.max_sessions
+                if overflow > 0:
+                    self._db.execute(
+                        "DELETE FROM chat_sessions WHERE session_id IN "
+                        "(SELECT session_id FROM chat_sessions ORDER BY last_used LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evicted += overflow
+                self._db.commit()
+            except sqlite3.Error:
+                self._db.rollback()
+                raise
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def sweep(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM chat_sessions WHERE last_used < ?", (time.time() - self.idle_ttl,))
+            self._db.commit()
+            self.expired += cursor.rowcount
+            return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Session counts and stored size (shared by all workers; eviction counters are per process)"""
+        with self._lock:
+            sessions, session_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(birth_data) + LENGTH(context) + "
+                "COALESCE(LENGTH(chart_cache), 0)), 0) FROM chat_sessions"
+            ).fetchone()
+            message_bytes = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(content) + LENGTH(metadata)), 0) FROM chat_messages"
+            ).fetchone()[0]
+            page_count = self._db.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "backend": self.name,
+            "db_path": self.db_path,
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+            "stored_bytes": session_bytes + message_bytes,
+            "db_file_bytes": page_count * page_size,
+            "evicted": self.evicted,
+            "expired": self.expired
+        }
+
+
+SESSION_STORES = {
+    "memory": InMemorySessionStore,
+    "sqlite": SQLiteSessionStore
+}
+
+
+def create_session_store() -> SessionStore:
+    """Session store selected by SESSION_BACKEND and configured from environment variables"""
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend not in SESSION_STORES:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend} (use 'memory' or 'sqlite')")
+    limits = {
+        "max_sessions": int(os.getenv("MAX_SESSIONS", 1000)),
+        "idle_ttl": float(os.getenv("SESSION_IDLE_TTL", 3600)),
+        "sweep_interval": float(os.getenv("SESSION_SWEEP_INTERVAL", 60))
+    }
+    if backend == "sqlite":
+        store = SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "chat_sessions.db"), **limits)
+    else:
+        store = InMemorySessionStore(**limits)
+    logger.info(f"Chat session backend: {store.name}")
+    return store
@@ -1,19 +1,28 @@
 """
 LangGraph Agent for Vedic Astrology Analysis
 Intelligent agent that routes queries, calls APIs, retrieves RAG context, and generates interpretations
+
+Questions that only ask for a value in the chart ("What Dasha am I in?", "How many SAV points
+in my 7th house?") are answered from the chart data by a template, without retrieval or an LLM call.
+
+The I/O nodes (calculate, retrieve, analyze) are async: run the graph with
+`await agent_graph.ainvoke(state)` so waiting on APIs and OpenAI doesn't block the event loop.
 """
 
 import os
+import re
 import time
 import logging
-from typing import TypedDict, List, Optional, Dict, Annotated, Literal
+from typing import TypedDict, List, Optional, Dict, Annotated, Literal, AsyncIterator, Tuple
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
 from agent_app.tools.astrology_tools import get_all_tools
-from agent_app.rag.supabase_rag import SupabaseRAGSystem
+from agent_app.tools.chart_data import afetch_chart_data
+from agent_app.rag.supabase_rag import SupabaseRAGSystem, sav_strength
+from agent_app.rag.response_cache import response_cache
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
@@ -36,7 +45,8 @@ tools_dict = {tool.name: tool for tool in tools}
 
 class AgentState(TypedDict):
     """Agent state schema for LangGraph"""
-    user_query: str
+    user_query: str  # Current question only: drives routing, API selection and retrieval
+    conversation_context: str  # Earlier turns of a chat (summary + recent messages), for the LLM prompt only
     birth_data: Optional[Dict]
     query_intent: str  # 'house_analysis', 'dasha_analysis', 'gochara_analysis', 'full_dashboard', 'general'
     selected_houses: List[int]  # Which houses to analyze
@@ -49,6 +59,89 @@ class AgentState(TypedDict):
     final_response: Optional[str]
     citations: Annotated[List[str], "append"]
     needs_more_context: bool
+    fact_intent: Optional[str]  # 'current_dasha' or 'house_sav' when the chart data alone answers the question
+
+
+# House-specific query keywords
+HOUSE_KEYWORDS = {
+    "1st house": 1, "first house": 1, "lagna": 1, "ascendant": 1,
+    "2nd house": 2, "second house": 2, "wealth": 2,
+    "3rd house": 3, "third house": 3, "siblings": 3,
+    "4th house": 4, "fourth house": 4, "home": 4, "mother": 4,
+    "5th house": 5, "fifth house": 5, "children": 5, "education": 5,
+    "6th house": 6, "sixth house": 6, "enemies": 6, "health": 6,
+    "7th house": 7, "seventh house": 7, "marriage": 7, "spouse": 7,
+    "8th house": 8, "eighth house": 8, "longevity": 8,
+    "9th house": 9, "ninth house": 9, "fortune": 9, "father": 9,
+    "10th house": 10, "tenth house": 10, "career": 10, "profession": 10,
+    "11th house": 11, "eleventh house": 11, "gains": 11, "income": 11,
+    "12th house": 12, "twelfth house": 12, "losses": 12, "expenses": 12
+}
+HOUSE_ORDINAL = re.compile(r"\b(1[0-2]|[1-9])(?:st|nd|rd|th)\b")
+
+# Questions answered from chart data alone ask for a value, not for its meaning or a prediction
+FACT_QUESTION_EXCLUDE = re.compile(
+    r"\b(mean|means|meaning|effects?|impacts?|affect|predict\w*|will|should|why|explain|interpret\w*|"
+    r"remed\w*|good|bad|strong\w*|weak\w*|about|next|when|after|analy\w*|advice)\b",
+    re.IGNORECASE
+)
+# Only the period running now: "what dasha am I in", "my current mahadasha", "which bhukti is running"
+DASHA_FACT_QUESTION = re.compile(r"\b(am i|currently|running|now|my current)\b.*\b(maha ?dasa|maha ?dasha|dasha|dasa|bhukti)\b|"
+                                 r"\b(maha ?dasa|maha ?dasha|dasha|dasa|bhukti)\b.*\b(am i|currently|running|now)\b",
+                                 re.IGNORECASE)
+# A named planet, a year/date or the period system itself is a general Dasha question
+DASHA_FACT_EXCLUDE = re.compile(r"\b(sun|moon|mars|mercury|jupiter|venus|saturn|rahu|ketu|\d{4}|\d{1,2}[/-]\d{1,2}|"
+                                r"periods?|order|duration|difference)\b", re.IGNORECASE)
+# An explicit SAV term, or literally "how many ... points" ("what are my weak points" is not a count)
+SAV_FACT_QUESTION = re.compile(r"\b(how many|how much|what|score|count)\b.*\b(sav|sarvashtakavarga|ashtakavarga|bindus?)\b|"
+                               r"\bhow many\b.*\bpoints?\b", re.IGNORECASE)
+
+
+def named_houses(query: str) -> List[int]:
+    """Every house a question names, by number ("7th and 10th houses") or keyword ("career")"""
+    query = query.lower()
+    houses = {int(number) for number in HOUSE_ORDINAL.findall(query)}
+    houses.update(house_num for keyword, house_num in HOUSE_KEYWORDS.items() if keyword in query)
+    return sorted(houses)
+
+
+def detect_fact_intent(query: str) -> Optional[str]:
+    """
+    'current_dasha' / 'house_sav' for questions the chart data answers directly, else None
+    
+    >>> detect_fact_intent("What Dasha am I in?")
+    'current_dasha'
+    >>> detect_fact_intent("How many SAV points in my 7th house?")
+    'house_sav'
+    >>> detect_fact_intent("How many points does my career house have?")
+    'house_sav'
+    >>> detect_fact_intent("How many SAV points in my 7th and 10th houses?"), named_houses("How many SAV points in my 7th and 10th houses?")
+    ('house_sav', [7, 10])
+    >>> detect_fact_intent("What are the strong points of my career?") is None
+    True
+    >>> detect_fact_intent("What are my weak points in marriage?") is None
+    True
+    >>> detect_fact_intent("What does my current dasha mean?") is None
+    True
+    >>> detect_fact_intent("How many SAV points do I have?") is None  # no house named
+    True
+    >>> detect_fact_intent("Which bhukti is running now?")
+    'current_dasha'
+    >>> detect_fact_intent("What is my current mahadasha?")
+    'current_dasha'
+    >>> [detect_fact_intent(q) for q in ("What is Rahu dasha?", "What is the duration of Jupiter dasha?",
+    ...     "What dasha did I have in 2010?", "Which bhukti comes in 2030?",
+    ...     "What is the difference between dasha and bhukti?", "Which planets rule each dasha?",
+    ...     "What are the dasha periods in my chart?", "What is my Saturn bhukti like?")]
+    [None, None, None, None, None, None, None, None]
+    """
+    if FACT_QUESTION_EXCLUDE.search(query):
+        return None
+    if SAV_FACT_QUESTION.search(query) and named_houses(query):
+        return "house_sav"
+    if DASHA_FACT_QUESTION.search(query) and not DASHA_FACT_EXCLUDE.search(query):
+        return "current_dasha"
+    return None
 
 
 def route_query(state: AgentState) -> AgentState:
@@ -62,22 +155,7 @@ def route_query(state: AgentState) -> AgentState:
     selected_houses = []
     
     # Check for house-specific queries
-    house_keywords = {
-        "1st house": 1, "first house": 1, "lagna": 1, "ascendant": 1,
-        "2nd house": 2, "second house": 2, "wealth": 2,
-        "3rd house": 3, "third house": 3, "siblings": 3,
-        "4th house": 4, "fourth house": 4, "home": 4, "mother": 4,
-        "5th house": 5, "fifth house": 5, "children": 5, "education": 5,
-        "6th house": 6, "sixth house": 6, "enemies": 6, "health": 6,
-        "7th house": 7, "seventh house": 7, "marriage": 7, "spouse": 7,
-        "8th house": 8, "eighth house": 8, "longevity": 8,
-        "9th house": 9, "ninth house": 9, "fortune": 9, "father": 9,
-        "10th house": 10, "tenth house": 10, "career": 10, "profession": 10,
-        "11th house": 11, "eleventh house": 11, "gains": 11, "income": 11,
-        "12th house": 12, "twelfth house": 12, "losses": 12, "expenses": 12
-    }
-    
-    for keyword, house_num in house_keywords.items():
+    for keyword, house_num in HOUSE_KEYWORDS.items():
         if keyword in query:
             selected_houses.append(house_num)
             intent = "house_analysis"
@@ -99,8 +177,14 @@ def route_query(state: AgentState) -> AgentState:
     # Check if birth data is needed
     needs_birth_data = intent != "general" and not birth_data
     
+    # Fact questions: the SAV answer covers every house the question names
+    fact_intent = detect_fact_intent(query)
+    if fact_intent == "house_sav":
+        selected_houses = named_houses(query)
+    
     state["query_intent"] = intent
     state["selected_houses"] = selected_houses
+    state["fact_intent"] = fact_intent
     state["current_step"] = "routed"
     
     if needs_birth_data:
@@ -110,7 +194,7 @@ def route_query(state: AgentState) -> AgentState:
     return state
 
 
-def calculate_chart_data(state: AgentState) -> AgentState:
+async def calculate_chart_data(state: AgentState) -> AgentState:
     """Calculator node: Agent decides which APIs to call based on intent"""
     
     calc_start = time.time()
@@ -126,152 +210,65 @@ def calculate_chart_data(state: AgentState) -> AgentState:
     existing_gochara = state.get("gochara_data")
     
     # Agent decision: Which APIs to call?
-    # ALWAYS call BAV/SAV if query mentions houses or is general (might need chart data)
     query_lower = state.get("user_query", "").lower()
-    needs_bav_sav = (
-        intent in ["house_analysis", "full_dashboard", "general"] or
-        any(word in query_lower for word in ["house", "7th", "10th", "career", "marriage", "health", "wealth", "sav", "bav", "ashtakavarga"])
-    )
+    fact_intent = state.get("fact_intent")
+    if fact_intent:
+        # Fact questions need only the data their answer quotes
+        needs_bav_sav = fact_intent == "house_sav"
+        needs_dasha = fact_intent == "current_dasha"
+        needs_gochara = False
+    else:
+        # ALWAYS call BAV/SAV if query mentions houses or is general (might need chart data)
+        needs_bav_sav = (
+            intent in ["house_analysis", "full_dashboard", "general"] or
+            any(word in query_lower for word in ["house", "7th", "10th", "career", "marriage", "health", "wealth", "sav", "bav", "ashtakavarga"])
+        )
+        
+        # ALWAYS call Dasha if query mentions dasha, period, timing, or is general
+        needs_dasha = (
+            intent in ["dasha_analysis", "full_dashboard", "house_analysis"] or
+            any(word in query_lower for word in ["dasha", "dasa", "period", "bhukti", "when", "timing", "current"])
+        )
+        
+        # ALWAYS call Gochara if query mentions transits, gochara, or current influences
+        needs_gochara = (
+            intent in ["gochara_analysis", "full_dashboard", "house_analysis"] or
+            any(word in query_lower for word in ["gochara", "transit", "current", "now", "influence"])
+        )
     
-    # Only call API if we don't have cached data
+    # Fetch everything that isn't cached in one concurrent round (latency = slowest service)
+    services = []
     if needs_bav_sav and not existing_bav_sav:
-        # Need BAV/SAV for house analysis
-        try:
-            import requests
-            import os
-            api_url = os.getenv("BAV_SAV_API_URL", "http://localhost:8000")
-            
-            # Convert birth_data to API format (latitude/longitude instead of lat/lon)
-            # Handle both lat/lon and latitude/longitude formats
-            api_birth_data = {
-                "dob": birth_data.get("dob"),
-                "tob": birth_data.get("tob"),
-                "latitude": birth_data.get("latitude") or birth_data.get("lat"),
-                "longitude": birth_data.get("longitude") or birth_data.get("lon"),
-                "tz_offset": birth_data.get("tz_offset"),
-                "name": birth_data.get("name"),
-                "place": birth_data.get("place")
-            }
-            
-            # Debug: Log API request data
-            logger.info(f"🔍 Calling BAV/SAV API with: dob={api_birth_data.get('dob')}, lat={api_birth_data.get('latitude')}, lon={api_birth_data.get('longitude')}")
-            
-            api_start = time.time()
-            response = requests.post(
-                f"{api_url}/api/v1/calculate/full",
-                json=api_birth_data,
-                timeout=30
-            )
-            api_duration = time.time() - api_start
-            logger.info(f"⏱️ BAV/SAV API call took {api_duration:.2f}s")
-            
-            response.raise_for_status()
-            bav_sav_result = response.json()
-            if isinstance(bav_sav_result, dict) and "error" not in bav_sav_result and "detail" not in bav_sav_result:
-                state["bav_sav_data"] = bav_sav_result
-                logger.info(f"✅ BAV/SAV data retrieved: SAV total={bav_sav_result.get('sav_total', 'N/A')}, Houses={len(bav_sav_result.get('sav_chart', []))}")
-            else:
-                logger.warning(f"⚠️ BAV/SAV API returned error: {bav_sav_result}")
-        except Exception as e:
-            logger.error(f"❌ Error calling BAV/SAV API: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    # ALWAYS call Dasha if query mentions dasha, period, timing, or is general
-    needs_dasha = (
-        intent in ["dasha_analysis", "full_dashboard", "house_analysis"] or
-        any(word in query_lower for word in ["dasha", "dasa", "period", "bhukti", "when", "timing", "current"])
-    )
-    
-    # Only call API if we don't have cached data
+        services.append("bav_sav")
     if needs_dasha and not existing_dasha:
-        # Need Dasha for period analysis
-        try:
-            import requests
-            import os
-            api_url = os.getenv("DASHA_GOCHARA_API_URL", "http://localhost:8001")
-            
-            # Convert birth_data to API format (Dasha API expects lat/lon, not latitude/longitude)
-            api_birth_data = {
-                "dob": birth_data.get("dob"),
-                "tob": birth_data.get("tob"),
-                "lat": birth_data.get("lat") or birth_data.get("latitude"),
-                "lon": birth_data.get("lon") or birth_data.get("longitude"),
-                "tz_offset": birth_data.get("tz_offset"),
-                "name": birth_data.get("name"),
-                "place": birth_data.get("place")
-            }
-            
-            logger.info(f"🔍 Calling Dasha API with: dob={api_birth_data.get('dob')}, lat={api_birth_data.get('lat')}, lon={api_birth_data.get('lon')}")
-            
-            api_start = time.time()
-            response = requests.post(
-                f"{api_url}/api/v1/dasha/current",
-                json=api_birth_data,
-                timeout=30
-            )
-            api_duration = time.time() - api_start
-            logger.info(f"⏱️ Dasha API call took {api_duration:.2f}s")
-            
-            response.raise_for_status()
-            dasha_result = response.json()
-            if isinstance(dasha_result, dict) and "error" not in dasha_result and "detail" not in dasha_result:
-                state["dasha_data"] = dasha_result
-                logger.info(f"✅ Dasha data retrieved: {dasha_result.get('current_dasa', 'N/A')} - {dasha_result.get('current_bhukti', 'N/A')}")
-            else:
-                logger.warning(f"⚠️ Dasha API returned error: {dasha_result}")
-                import traceback
-                traceback.print_exc()
-        except Exception as e:
-            logger.error(f"❌ Error calling Dasha API: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    # ALWAYS call Gochara if query mentions transits, gochara, or current influences
-    needs_gochara = (
-        intent in ["gochara_analysis", "full_dashboard", "house_analysis"] or
-        any(word in query_lower for word in ["gochara", "transit", "current", "now", "influence"])
-    )
-    
-    # Only call API if we don't have cached data
+        services.append("dasha")
     if needs_gochara and not existing_gochara:
-        # Need Gochara for transit analysis
-        try:
-            import requests
-            import os
-            api_url = os.getenv("DASHA_GOCHARA_API_URL", "http://localhost:8001")
-            
-            # Convert birth_data to API format (Gochara API expects lat/lon)
-            api_birth_data = {
-                "dob": birth_data.get("dob"),
-                "tob": birth_data.get("tob"),
-                "lat": birth_data.get("lat") or birth_data.get("latitude"),
-                "lon": birth_data.get("lon") or birth_data.get("longitude"),
-                "tz_offset": birth_data.get("tz_offset"),
-                "name": birth_data.get("name"),
-                "place": birth_data.get("place")
+        services.append("gochara")
+    
+    if services:
+        logger.info(f"🔍 Fetching {', '.join(services)} for dob={birth_data.get('dob')}")
+        fetched = await afetch_chart_data(birth_data, services)
+        
+        bav_sav_result = fetched["data"].get("bav_sav")
+        if bav_sav_result:
+            state["bav_sav_data"] = bav_sav_result
+            logger.info(f"✅ BAV/SAV data retrieved: SAV total={bav_sav_result.get('sav_total', 'N/A')}, Houses={len(bav_sav_result.get('sav_chart', []))}")
+        
+        dasha_result = fetched["data"].get("dasha")
+        if dasha_result:
+            state["dasha_data"] = dasha_result
+            logger.info(f"✅ Dasha data retrieved: {dasha_result.get('current_dasa', 'N/A')} - {dasha_result.get('current_bhukti', 'N/A')}")
+        
+        if fetched["data"].get("gochara"):
+            state["gochara_data"] = fetched["data"]["gochara"]
+            logger.info(f"✅ Gochara data retrieved")
+        
+        # Partial results: continue with whatever succeeded and record what didn't
+        if fetched["errors"]:
+            state["intermediate_results"] = {
+                **(state.get("intermediate_results") or {}),
+                "chart_errors": fetched["errors"]
             }
-            
-            api_start = time.time()
-            response = requests.post(
-                f"{api_url}/api/v1/gochara/current",
-                json=api_birth_data,
-                timeout=30
-            )
-            api_duration = time.time() - api_start
-            logger.info(f"⏱️ Gochara API call took {api_duration:.2f}s")
-            
-            response.raise_for_status()
-            gochara_result = response.json()
-            if isinstance(gochara_result, dict) and "error" not in gochara_result:
-                state["gochara_data"] = gochara_result
-                logger.info(f"✅ Gochara data retrieved")
-            else:
-                logger.warning(f"⚠️ Gochara API returned error: {gochara_result}")
-        except Exception as e:
-            logger.error(f"❌ Error calling Gochara API: {e}")
-            import traceback
-            traceback.print_exc()
     
     # Use cached data if available and API wasn't called
     if needs_bav_sav and existing_bav_sav and not state.get("bav_sav_data"):
@@ -292,7 +289,64 @@ def calculate_chart_data(state: AgentState) -> AgentState:
     return state
 
 
-def retrieve_knowledge(state: AgentState) -> AgentState:
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def render_fact_answer(state: AgentState) -> Optional[str]:
+    """Templated answer to a fact question from the chart data, or None if the data is missing"""
+    fact_intent = state.get("fact_intent")
+    
+    if fact_intent == "current_dasha":
+        dasha = state.get("dasha_data") or {}
+        if not dasha.get("current_dasa"):
+            return None
+        answer = f"You are currently in **{dasha['current_dasa']} Mahadasha**"
+        if dasha.get("current_bhukti"):
+            answer += f" with **{dasha['current_bhukti']} Bhukti**"
+        answer += "."
+        if dasha.get("start_date") and dasha.get("end_date"):
+            answer += f" This Mahadasha runs from {dasha['start_date']} to {dasha['end_date']}"
+            if dasha.get("remaining_years") is not None:
+                answer += f" ({dasha['remaining_years']} years remaining)"
+            answer += "."
+        return answer
+    
+    if fact_intent == "house_sav":
+        bav_sav = state.get("bav_sav_data") or {}
+        sav_chart = bav_sav.get("sav_chart") or []
+        houses = state.get("selected_houses") or []
+        if len(sav_chart) != 12 or not houses:
+            return None
+        lines = []
+        for house in houses:
+            points = sav_chart[house - 1]
+            line = f"Your {_ordinal(house)} house has **{points} SAV points** ({sav_strength(points)})."
+            contributions = [
+                f"{planet.title()} {chart[house - 1]}"
+                for planet, chart in (bav_sav.get("bav_charts") or {}).items()
+                if isinstance(chart, list) and len(chart) == 12
+            ]
+            if contributions:
+                line += f" BAV contributions: {', '.join(contributions)}."
+            lines.append(line)
+        lines.append(f"For reference, the chart's total is {sum(sav_chart)} SAV points "
+                     f"(about 28 per house); 28 or more is good, 30 or more strong, below 22 weak.")
+        return "\n\n".join(lines)
+    
+    return None
+
+
+def answer_from_chart_data(state: AgentState) -> AgentState:
+    """Fast-path node: answer a fact question from the chart data (no retrieval or LLM call)"""
+    state["final_response"] = render_fact_answer(state)
+    logger.info(f"⚡ Answered {state.get('fact_intent')} from chart data, skipping RAG and LLM")
+    state["current_step"] = "answered"
+    return state
+
+
+async def retrieve_knowledge(state: AgentState) -> AgentState:
     """RAG Retrieval node: Retrieve relevant Vedic knowledge from Supabase"""
     
     retrieve_start = time.time()
@@ -313,17 +367,18 @@ def retrieve_knowledge(state: AgentState) -> AgentState:
     context_chunks = []
     
     if selected_houses:
+        # One embedding and one retrieval round trip for all houses
+        chunks_by_house = await rag_system.aretrieve_context_by_house(
+            query=query,
+            house_numbers=selected_houses,
+            top_k=2,  # Reduced from 3 for faster retrieval
+            category=category
+        )
         for house_num in selected_houses:
-            chunks = rag_system.retrieve_context_advanced(
-                query=query,
-                top_k=2,  # Reduced from 3 for faster retrieval
-                category=category,
-                house_number=house_num
-            )
-            context_chunks.extend(chunks)
+            context_chunks.extend(chunks_by_house.get(house_num, []))
     else:
         # General retrieval
-        chunks = rag_system.retrieve_context_advanced(
+        chunks = await rag_system.aretrieve_context_advanced(
             query=query,
             top_k=3,  # Reduced from 5 for faster retrieval
             category=category
@@ -347,32 +402,79 @@ def retrieve_knowledge(state: AgentState) -> AgentState:
     return state
 
 
-def analyze_and_interpret(state: AgentState) -> AgentState:
+def interpretation_inputs(state: AgentState) -> Tuple[str, List[Dict], Dict]:
+    """Query (with any conversation context), RAG context chunks and chart data passed to the interpretation LLM call"""
+    chart_data = {
+        "bav_sav": state.get("bav_sav_data"),
+        "dasha": state.get("dasha_data"),
+        "gochara": state.get("gochara_data")
+    }
+    context_chunks = [{"content": ctx, "category": "general"} for ctx in state.get("rag_context", [])]
+    query = state["user_query"]
+    if state.get("conversation_context"):
+        query = f"Previous conversation:\n{state['conversation_context']}\n\nCurrent question: {query}"
+    return query, context_chunks, chart_data
+
+
+def depends_on_history(state: AgentState) -> bool:
+    """
+    True for chat follow-ups the router couldn't tie to a topic ("tell me more", "why?"):
+    their answer depends on the conversation, so they bypass the response cache.
+    Questions naming a house, Dasha or transits are answered the same way in any conversation.
+    """
+    return bool(state.get("conversation_context")) and state.get("query_intent") in ("", "general")
+
+
+async def lookup_cached_response(state: AgentState) -> Tuple[Optional[str], Optional[Tuple], Optional[List[float]]]:
+    """
+    Earlier answer for a near-identical question on the same chart (see response_cache).
+    
+    Returns (cached answer or None, cache key, query embedding); the key is None when the
+    query can't be embedded or depends on the conversation history, in which case the
+    answer shouldn't be stored either.
+    """
+    if depends_on_history(state):
+        return None, None, None
+    _, _, chart_data = interpretation_inputs(state)
+    try:
+        # Already embedded (and cached) by retrieve_knowledge
+        query_embedding = await rag_system.aembed_text(state["user_query"])
+    except Exception as e:
+        logger.warning(f"⚠️ Response cache skipped: {e}")
+        return None, None, None
+    key = response_cache.group_key(state.get("birth_data"), chart_data,
+                                   state.get("query_intent"), state.get("selected_houses"))
+    return response_cache.get(key, query_embedding), key, query_embedding
+
+
+def store_cached_response(state: AgentState, key: Optional[Tuple], query_embedding: Optional[List[float]],
+                          response: str):
+    """Cache a generated answer until the end of its Gochara date"""
+    if key is not None and response:
+        response_cache.put(key, query_embedding, response, response_cache.expires_at(state.get("gochara_data")))
+
+
+async def analyze_and_interpret(state: AgentState) -> AgentState:
     """Analysis node: Combine data and generate interpretation using OpenAI"""
     
     analyze_start = time.time()
-    query = state["user_query"]
-    intent = state["query_intent"]
     rag_context = state.get("rag_context", [])
     bav_sav_data = state.get("bav_sav_data")
     dasha_data = state.get("dasha_data")
     gochara_data = state.get("gochara_data")
-    selected_houses = state.get("selected_houses", [])
+    query, context_chunks, chart_data = interpretation_inputs(state)
     
-    # Prepare chart data
-    chart_data = {
-        "bav_sav": bav_sav_data,
-        "dasha": dasha_data,
-        "gochara": gochara_data
-    }
-    
-    # Build context chunks for RAG
-    context_chunks = [{"content": ctx, "category": "general"} for ctx in rag_context]
+    cached_response, cache_key, query_embedding = await lookup_cached_response(state)
+    if cached_response is not None:
+        logger.info(f"⚡ Response cache hit, skipping LLM call")
+        state["final_response"] = cached_response
+        state["current_step"] = "analyzed"
+        return state
     
     # Generate interpretation using RAG system
     try:
         llm_start = time.time()
-        interpretation = rag_system.generate_interpretation(
+        interpretation = await rag_system.agenerate_interpretation(
             query=query,
             context_chunks=context_chunks,
             chart_data=chart_data
@@ -380,6 +482,7 @@ def analyze_and_interpret(state: AgentState) -> AgentState:
         llm_duration = time.time() - llm_start
         logger.info(f"⏱️ LLM call took {llm_duration:.2f}s")
         state["final_response"] = interpretation
+        store_cached_response(state, cache_key, query_embedding, interpretation)
     except Exception as e:
         # Fallback: Use LLM directly if RAG fails
         logger.warning(f"RAG generation failed, using LLM directly: {e}")
@@ -387,9 +490,7 @@ def analyze_and_interpret(state: AgentState) -> AgentState:
         traceback.print_exc()
         
         # Format chart data properly for fallback
-        from agent_app.rag.supabase_rag import SupabaseRAGSystem
-        rag_temp = SupabaseRAGSystem()
-        chart_data_formatted = rag_temp._format_chart_data({
+        chart_data_formatted = rag_system._format_chart_data({
             "bav_sav": bav_sav_data,
             "dasha": dasha_data,
             "gochara": gochara_data
@@ -425,7 +526,7 @@ Provide a comprehensive interpretation using the ACTUAL data above."""
         ]
         
         llm_start = time.time()
-        response = llm.invoke(messages)
+        response = await llm.ainvoke(messages)
         llm_duration = time.time() - llm_start
         logger.info(f"⏱️ LLM fallback call took {llm_duration:.2f}s")
         state["final_response"] = response.content
@@ -463,6 +564,13 @@ def should_continue(state: AgentState) -> str:
     return "calculate"
 
 
+def after_calculation(state: AgentState) -> str:
+    """Conditional edge: answer fact questions from chart data, everything else needs retrieval"""
+    if state.get("fact_intent") and render_fact_answer(state) is not None:
+        return "answer"
+    return "retrieve"
+
+
 def create_agent_graph() -> StateGraph:
     """Create and compile the LangGraph agent"""
     
@@ -472,6 +580,7 @@ def create_agent_graph() -> StateGraph:
     # Add nodes
     workflow.add_node("route", route_query)
     workflow.add_node("calculate", calculate_chart_data)
+    workflow.add_node("answer", answer_from_chart_data)
     workflow.add_node("retrieve", retrieve_knowledge)
     workflow.add_node("analyze", analyze_and_interpret)
     workflow.add_node("format", format_response)
@@ -489,7 +598,15 @@ def create_agent_graph() -> StateGraph:
         }
     )
     
-    workflow.add_edge("calculate", "retrieve")
+    workflow.add_conditional_edges(
+        "calculate",
+        after_calculation,
+        {
+            "answer": "answer",
+            "retrieve": "retrieve"
+        }
+    )
+    workflow.add_edge("answer", "format")
     workflow.add_edge("retrieve", "analyze")
     workflow.add_edge("analyze", "format")
     workflow.add_edge("format", END)
@@ -498,6 +615,97 @@ def create_agent_graph() -> StateGraph:
     return workflow.compile()
 
 
+def create_preparation_graph() -> StateGraph:
+    """
+    Graph with the steps before the LLM call (route -> calculate -> retrieve, or the
+    chart-data answer for fact questions).
+    
+    Used by stream_agent, which runs the analysis itself so it can stream tokens.
+    """
+    workflow = StateGraph(AgentState)
+    
+    workflow.add_node("route", route_query)
+    workflow.add_node("calculate", calculate_chart_data)
+    workflow.add_node("answer", answer_from_chart_data)
+    workflow.add_node("retrieve", retrieve_knowledge)
+    
+    workflow.set_entry_point("route")
+    workflow.add_conditional_edges(
+        "route",
+        should_continue,
+        {
+            "calculate": "calculate",
+            "format": END
+        }
+    )
+    workflow.add_conditional_edges(
+        "calculate",
+        after_calculation,
+        {
+            "answer": "answer",
+            "retrieve": "retrieve"
+        }
+    )
+    workflow.add_edge("answer", END)
+    workflow.add_edge("retrieve", END)
+    
+    return workflow.compile()
+
+
+async def stream_agent(initial_state: Dict) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Run the agent, yielding (event, data) as it progresses:
+    - ("progress", {"step": "routed" | "calculated" | "retrieved" | "answered", ...}) after each graph step
+    - ("token", {"text": ...}) for each fragment of the LLM response as it is generated
+      (a single token with the whole answer for fact questions answered from chart data)
+    - ("done", final_state) with the same fields agent_graph.ainvoke returns
+    """
+    state = dict(initial_state)
+    
+    async for update in agent_preparation_graph.astream(initial_state, stream_mode="updates"):
+        for node_name, node_state in update.items():
+            if node_state:
+                state.update(node_state)
+            progress = {"step": state.get("current_step") or node_name}
+            if node_name == "route":
+                progress["query_intent"] = state.get("query_intent")
+            yield "progress", progress
+    
+    if state.get("current_step") == "answered":
+        yield "token", {"text": state["final_response"]}
+    elif not state.get("final_response"):
+        analyze_start = time.time()
+        query, context_chunks, chart_data = interpretation_inputs(state)
+        cached_response, cache_key, query_embedding = await lookup_cached_response(state)
+        fragments = []
+        try:
+            if cached_response is not None:
+                logger.info(f"⚡ Response cache hit, skipping LLM call")
+                fragments.append(cached_response)
+                yield "token", {"text": cached_response}
+            else:
+                async for text in rag_system.astream_interpretation(query, context_chunks, chart_data):
+                    fragments.append(text)
+                    yield "token", {"text": text}
+                store_cached_response(state, cache_key, query_embedding, "".join(fragments).strip())
+            state["final_response"] = "".join(fragments).strip()
+            state["current_step"] = "analyzed"
+        except Exception as e:
+            if fragments:
+                # Keep what was already streamed to the user
+                logger.warning(f"Interpretation stream interrupted: {e}")
+                state["final_response"] = "".join(fragments).strip()
+            else:
+                # Nothing sent yet: fall back to the regular analysis node (incl. its LLM fallback)
+                logger.warning(f"Streaming failed, using non-streaming analysis: {e}")
+                state = await analyze_and_interpret(state)
+                yield "token", {"text": state["final_response"]}
+        logger.info(f"⏱️ Streamed analysis took {time.time() - analyze_start:.2f}s")
+    
+    yield "done", format_response(state)
+
+
 # Initialize agent graph
 agent_graph = create_agent_graph()
+agent_preparation_graph = create_preparation_graph()
 
@@ -0,0 +1,222 @@
+"""
+Dashboard Pipeline
+Builds the full 12-house dashboard without going through the query router:
+- chart data (BAV/SAV, Dasha, Gochara) is fetched once, concurrently
+- knowledge for all 12 houses is retrieved in one batched pass (one embedding, one search)
+- the overall summary (LLM) is generated while the rule-based house section is built
+- the finished dashboard is cached per chart fingerprint and date, since the Gochara
+  part changes daily
+
+Configuration (environment variables):
+- DASHBOARD_CACHE_SIZE: dashboards kept per process (default 256, 0 disables the cache)
+"""
+
+import asyncio
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from agent_app.graphs.astrology_agent_graph import analyze_and_interpret, format_response, retrieve_knowledge
+from agent_app.rag.response_cache import chart_fingerprint
+from agent_app.rag.supabase_rag import sav_strength
+from agent_app.tools.chart_data import afetch_chart_data
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_QUERY = "Analyze all houses with complete interpretations combining BAV/SAV, Dasha, and Gochara data"
+
+# House significations for interpretations
+HOUSE_SIGNIFICATIONS = {
+    1: "Self, personality, physical appearance, and overall life direction",
+    2: "Wealth, family, speech, and material possessions",
+    3: "Siblings, courage, communication, and short journeys",
+    4: "Home, mother, property, and emotional foundation",
+    5: "Children, education, creativity, and intelligence",
+    6: "Health, enemies, service, and daily routines",
+    7: "Marriage, partnerships, spouse, and business relationships",
+    8: "Longevity, transformation, obstacles, and hidden matters",
+    9: "Fortune, father, spirituality, and higher learning",
+    10: "Career, reputation, authority, and public image",
+    11: "Gains, income, friends, and aspirations",
+    12: "Losses, expenses, foreign lands, and spiritual liberation"
+}
+
+STRENGTH_DESCRIPTIONS = {"Strong": "excellent", "Good": "good", "Weak": "challenging", "Moderate": "moderate"}
+
+STRENGTH_GUIDANCE = {
+    "Strong": "This house is very strong and will yield positive results. Transits and Dasha periods affecting this house will be highly beneficial.",
+    "Good": "This house has good strength and will generally yield positive results, though some challenges may arise.",
+    "Weak": "This house has lower strength and may present challenges. Careful attention and remedies may be beneficial.",
+    "Moderate": "This house has moderate strength and will yield mixed results depending on transits and Dasha periods."
+}
+
+
+def build_house_sections(bav_sav_data: Optional[Dict], dasha_data: Optional[Dict]) -> List[Dict]:
+    """Rule-based analysis of the 12 houses from SAV points, BAV contributions and the current Dasha (no LLM)"""
+    sav_chart = (bav_sav_data or {}).get("sav_chart") or []
+    bav_charts = (bav_sav_data or {}).get("bav_charts") or {}
+    dasha_note = ""
+    if dasha_data and dasha_data.get("current_dasa"):
+        dasha_note = f" Current Dasha: {dasha_data['current_dasa']} with {dasha_data.get('current_bhukti', 'N/A')} Bhukti."
+
+    houses = []
+    for house_num in range(1, 13):
+        signification = HOUSE_SIGNIFICATIONS[house_num]
+        sav_points = sav_chart[house_num - 1] if len(sav_chart) >= house_num else None
+        bav_contributions = {
+            planet.title(): chart[house_num - 1]
+            for planet, chart in bav_charts.items()
+            if isinstance(chart, list) and len(chart) >= house_num
+        }
+
+        if sav_points is not None:
+            strength = sav_strength(sav_points)
+            parts = [f"House {house_num} ({signification}) has {sav_points} SAV points, "
+                     f"indicating {STRENGTH_DESCRIPTIONS[strength]} strength. "]
+            if bav_contributions:
+                top_contributors = sorted(bav_contributions.items(), key=lambda x: x[1], reverse=True)[:3]
+                parts.append(f"Key planetary influences: {', '.join(f'{p} ({v} points)' for p, v in top_contributors)}. ")
+            parts.append(STRENGTH_GUIDANCE[strength])
+            parts.append(dasha_note)
+            interpretation = "".join(parts)
+        else:
+            interpretation = f"House {house_num} ({signification}) analysis based on SAV, Dasha, and Gochara data."
+
+        houses.append({
+            "house_number": house_num,
+            "sav_points": sav_points,
+            "bav_contributions": bav_contributions,
+            "interpretation": interpretation
+        })
+    return houses
+
+
+class DashboardCache:
+    """Thread-safe LRU of finished dashboards keyed by (chart fingerprint, date)"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(birth_data: Dict, date: Optional[datetime.date] = None) -> Tuple[str, str]:
+        return chart_fingerprint(birth_data, {}), (date or datetime.date.today()).isoformat()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict]:
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            dashboard = self._entries.get(key)
+            if dashboard is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dashboard
+
+    def put(self, key: Tuple[str, str], dashboard: Dict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            # Earlier days' dashboards quote stale transits
+            for stale_key in [k for k in self._entries if k[1] != key[1]]:
+                del self._entries[stale_key]
+            self._entries[key] = dashboard
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters for monitoring (per process)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+dashboard_cache = DashboardCache(maxsize=int(os.getenv("DASHBOARD_CACHE_SIZE", 256)))
+
+
+async def _overall_summary(state: Dict) -> str:
+    """Batched retrieval for all houses, then the LLM summary (with the agent's fallback and citations)"""
+    state = await retrieve_knowledge(state)
+    state = await analyze_and_interpret(state)
+    return format_response(state)["final_response"]
+
+
+async def build_dashboard(birth_data: Dict) -> Dict:
+    """
+    Full dashboard for a chart: 12 house sections, overall summary and the chart data.
+
+    Served from dashboard_cache when the same chart was built earlier today.
+    """
+    dashboard_start = time.time()
+    cache_key = dashboard_cache.key(birth_data)
+    cached = dashboard_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"⚡ Dashboard cache hit for dob={birth_data.get('dob')}")
+        return cached
+
+    fetched = await afetch_chart_data(birth_data, ["bav_sav", "dasha", "gochara"])
+    chart_data = fetched["data"]
+
+    state = {
+        "user_query": DASHBOARD_QUERY,
+        "conversation_context": "",
+        "birth_data": birth_data,
+        "query_intent": "full_dashboard",
+        "selected_houses": list(range(1, 13)),
+        "bav_sav_data": chart_data.get("bav_sav"),
+        "dasha_data": chart_data.get("dasha"),
+        "gochara_data": chart_data.get("gochara"),
+        "rag_context": [],
+        "current_step": "calculated",
+        "intermediate_results": {"chart_errors": fetched["errors"]} if fetched["errors"] else {},
+        "final_response": None,
+        "citations": [],
+        "needs_more_context": False,
+        "fact_intent": None
+    }
+
+    # The summary waits on retrieval and the LLM; build the rule-based houses meanwhile
+    summary_task = asyncio.create_task(_overall_summary(state))
+    houses = build_house_sections(state["bav_sav_data"], state["dasha_data"])
+    overall_summary = await summary_task
+
+    dashboard = {
+        "houses": houses,
+        "overall_summary": overall_summary or "Dashboard analysis completed",
+        "bav_sav_data": state["bav_sav_data"],
+        "dasha_data": state["dasha_data"],
+        "gochara_data": state["gochara_data"]
+    }
+
+    # Dashboards missing a data source are rebuilt on the next request
+    if not fetched["errors"]:
+        dashboard_cache.put(cache_key, dashboard)
+    else:
+        logger.warning(f"⚠️ Dashboard built without {', '.join(fetched['errors'])}; not cached")
+
+    logger.info(f"📊 Dashboard for dob={birth_data.get('dob')} built in {time.time() - dashboard_start:.2f}s "
+                f"(BAV/SAV {'✅' if state['bav_sav_data'] else '❌'}, "
+                f"Dasha {'✅' if state['dasha_data'] else '❌'}, "
+                f"Gochara {'✅' if state['gochara_data'] else '❌'})")
+    return dashboard
@@ -6,6 +6,7 @@ Run this script to populate the vector database with knowledge
 import os
 import sys
 from pathlib import Path
+from typing import Dict, List
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
@@ -677,99 +678,90 @@ ADVANCED_RULES = [
 ]
 
 
-def populate_knowledge_base():
-    """Populate Supabase with all Vedic astrology knowledge"""
+def build_knowledge_chunks() -> List[Dict]:
+    """All knowledge base content as chunks for SupabaseRAGSystem.store_knowledge_bulk"""
+    chunks = []
     
-    print("Initializing RAG system...")
-    rag_system = SupabaseRAGSystem()
-    
-    print("\nPopulating House Significations...")
     for house_data in HOUSE_SIGNIFICATIONS:
-        try:
-            rag_system.store_knowledge(
-                content=house_data["content"],
-                category=house_data["category"],
-                house_number=house_data["house"],
-                metadata={
-                    "house_name": house_data["name"],
-                    "house_number": house_data["house"]
-                }
-            )
-            print(f"  ✓ Stored House {house_data['house']} ({house_data['name']})")
-        except Exception as e:
-            print(f"  ✗ Error storing House {house_data['house']}: {e}")
+        chunks.append({
+            "content": house_data["content"],
+            "category": house_data["category"],
+            "house_number": house_data["house"],
+            "metadata": {
+                "house_name": house_data["name"],
+                "house_number": house_data["house"]
+            }
+        })
     
-    print("\nPopulating Dasha Interpretations...")
     for dasha_data in DASHA_INTERPRETATIONS:
-        try:
-            rag_system.store_knowledge(
-                content=dasha_data["content"],
-                category=dasha_data["category"],
-                planet=dasha_data["planet"],
-                metadata={
-                    "planet": dasha_data["planet"],
-                    "type": "dasha"
-                }
-            )
-            print(f"  ✓ Stored {dasha_data['planet']} Dasha")
-        except Exception as e:
-            print(f"  ✗ Error storing {dasha_data['planet']} Dasha: {e}")
+        chunks.append({
+            "content": dasha_data["content"],
+            "category": dasha_data["category"],
+            "planet": dasha_data["planet"],
+            "metadata": {
+                "planet": dasha_data["planet"],
+                "type": "dasha"
+            }
+        })
     
-    print("\nPopulating Gochara Interpretations...")
     for gochara_data in GOCHARA_INTERPRETATIONS:
-        try:
-            rag_system.store_knowledge(
-                content=gochara_data["content"],
-                category=gochara_data["category"],
-                metadata={"type": "gochara"}
-            )
-            print(f"  ✓ Stored Gochara content")
-        except Exception as e:
-            print(f"  ✗ Error storing Gochara: {e}")
+        chunks.append({
+            "content": gochara_data["content"],
+            "category": gochara_data["category"],
+            "metadata": {"type": "gochara"}
+        })
     
-    print("\nPopulating BAV/SAV Rules...")
     for bav_sav_data in BAV_SAV_RULES:
-        try:
-            rag_system.store_knowledge(
-                content=bav_sav_data["content"],
-                category=bav_sav_data["category"],
-                metadata={"type": "bav_sav"}
-            )
-            print(f"  ✓ Stored BAV/SAV rule")
-        except Exception as e:
-            print(f"  ✗ Error storing BAV/SAV: {e}")
+        chunks.append({
+            "content": bav_sav_data["content"],
+            "category": bav_sav_data["category"],
+            "metadata": {"type": "bav_sav"}
+        })
     
-    print("\nPopulating Remedies...")
     for remedy_data in REMEDIES:
-        try:
-            rag_system.store_knowledge(
-                content=remedy_data["content"],
-                category=remedy_data["category"],
-                metadata={"type": "remedy"}
-            )
-            print(f"  ✓ Stored Remedy content")
-        except Exception as e:
-            print(f"  ✗ Error storing Remedy: {e}")
+        chunks.append({
+            "content": remedy_data["content"],
+            "category": remedy_data["category"],
+            "metadata": {"type": "remedy"}
+        })
     
-    print("\nPopulating Advanced Ashtakavarga Rules...")
     for rule_data in ADVANCED_RULES:
-        try:
-            metadata = rule_data.get("metadata", {})
-            metadata["type"] = "advanced_rule"
-            metadata["logic"] = rule_data.get("logic", "")
-            
-            rag_system.store_knowledge(
-                content=rule_data["content"],
-                category=rule_data["category"],
-                house_number=rule_data.get("house_number"),
-                planet=rule_data.get("planet"),
-                metadata=metadata
-            )
-            house_info = f" (House {rule_data['house_number']})" if rule_data.get("house_number") else ""
-            planet_info = f" ({rule_data['planet']})" if rule_data.get("planet") else ""
-            print(f"  ✓ Stored Advanced Rule{house_info}{planet_info}")
-        except Exception as e:
-            print(f"  ✗ Error storing Advanced Rule: {e}")
+        metadata = dict(rule_data.get("metadata", {}))
+        metadata["type"] = "advanced_rule"
+        metadata["logic"] = rule_data.get("logic", "")
+        chunks.append({
+            "content": rule_data["content"],
+            "category": rule_data["category"],
+            "house_number": rule_data.get("house_number"),
+            "planet": rule_data.get("planet"),
+            "metadata": metadata
+        })
+    
+    return chunks
+
+
+def populate_knowledge_base(batch_size: int = 100):
+    """
+    Populate Supabase with all Vedic astrology knowledge.
+    
+    Chunks are embedded and inserted in batches; chunks already in the table
+    (same content) are skipped, so re-running only adds new content.
+    """
+    
+    print("Initializing RAG system...")
+    rag_system = SupabaseRAGSystem()
+    
+    chunks = build_knowledge_chunks()
+    print(f"\nStoring {len(chunks)} knowledge chunks (batch size {batch_size})...")
+    summary = rag_system.store_knowledge_bulk(chunks, batch_size=batch_size)
+    
+    print(f"  ✓ Inserted: {summary['inserted']}")
+    print(f"  ✓ Already stored (skipped): {summary['skipped']}")
+    if summary["failed"]:
+        print(f"  ✗ Failed: {summary['failed']} (re-run to retry)")
+    
+    if summary["inserted"] and os.getenv("RAG_BACKEND", "supabase").lower() == "local":
+        print("\nRefresh the local vector index: python -m agent_app.rag.local_index")
     
     print("\n✅ Knowledge base population completed!")
 
@@ -3,20 +3,25 @@ FastAPI Agent Server for Vedic Astrology AI Agent
 Production-ready server with LangGraph agent integration
 """
 
+import asyncio
 import os
 import sys
+import json
 import logging
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, Response
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, validator
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import uvicorn
 from starlette.middleware.base import BaseHTTPMiddleware
 
-from agent_app.graphs.astrology_agent_graph import agent_graph
+from agent_app.graphs.astrology_agent_graph import agent_graph, stream_agent
+from agent_app.graphs.dashboard_pipeline import build_dashboard, dashboard_cache
 from agent_app.conversation.manager import conversation_manager
+from agent_app.rag.embedding_cache import embedding_cache
+from agent_app.rag.response_cache import response_cache
 
 # Configure logging for Railway (ensure logs are visible)
 logging.basicConfig(
@@ -255,6 +260,16 @@ async def health_check():
     }
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the agent's caches (per worker process)"""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "dashboard_cache": dashboard_cache.stats()
+    }
+
+
 @app.get("/api/config")
 async def get_config():
     """Get frontend configuration including API URLs"""
@@ -362,6 +377,61 @@ async def root():
 # AGENT ENDPOINTS
 # ============================================================================
 
+def query_initial_state(request: QueryRequest) -> Dict:
+    """Initial agent state for a one-off query"""
+    return {
+        "user_query": request.query,
+        "conversation_context": "",
+        "birth_data": request.birth_data.dict() if request.birth_data else None,
+        "query_intent": "",
+        "selected_houses": [],
+        "bav_sav_data": None,
+        "dasha_data": None,
+        "gochara_data": None,
+        "rag_context": [],
+        "current_step": "",
+        "intermediate_results": {},
+        "final_response": None,
+        "citations": [],
+        "needs_more_context": False,
+        "fact_intent": None
+    }
+
+
+def query_response(result: Dict) -> QueryResponse:
+    """QueryResponse from the agent's final state"""
+    return QueryResponse(
+        response=result.get("final_response", "I apologize, but I couldn't generate a response."),
+        chart_data={
+            "bav_sav": result.get("bav_sav_data"),
+            "dasha": result.get("dasha_data"),
+            "gochara": result.get("gochara_data")
+        } if result.get("bav_sav_data") or result.get("dasha_data") or result.get("gochara_data") else None,
+        citations=result.get("citations", []),
+        analysis_type=result.get("query_intent", "general"),
+        query_intent=result.get("query_intent", "general")
+    )
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Dict]], error_prefix: str) -> AsyncIterator[str]:
+    """
+    Server-Sent Events from (event, data) pairs: "event: <event>\ndata: <json>\n\n".
+    
+    An exception after the stream has started is sent as an "error" event,
+    since the HTTP status has already been sent.
+    """
+    try:
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+    except Exception as e:
+        logger.error(f"❌ {error_prefix}: {e}")
+        yield f"event: error\ndata: {json.dumps({'detail': f'{error_prefix}: {str(e)}'})}\n\n"
+
+
+# Disable proxy buffering so events reach the browser as they are produced
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
 @app.post("/api/agent/query", response_model=QueryResponse)
 async def query_agent(request: QueryRequest):
     """
@@ -374,166 +444,45 @@ async def query_agent(request: QueryRequest):
     4. Generate comprehensive interpretation
     """
     try:
-        # Prepare initial state
-        initial_state = {
-            "user_query": request.query,
-            "birth_data": request.birth_data.dict() if request.birth_data else None,
-            "query_intent": "",
-            "selected_houses": [],
-            "bav_sav_data": None,
-            "dasha_data": None,
-            "gochara_data": None,
-            "rag_context": [],
-            "current_step": "",
-            "intermediate_results": {},
-            "final_response": None,
-            "citations": [],
-            "needs_more_context": False
-        }
-        
         # Run agent graph
-        result = agent_graph.invoke(initial_state)
+        result = await agent_graph.ainvoke(query_initial_state(request))
         
-        return QueryResponse(
-            response=result.get("final_response", "I apologize, but I couldn't generate a response."),
-            chart_data={
-                "bav_sav": result.get("bav_sav_data"),
-                "dasha": result.get("dasha_data"),
-                "gochara": result.get("gochara_data")
-            } if result.get("bav_sav_data") or result.get("dasha_data") or result.get("gochara_data") else None,
-            citations=result.get("citations", []),
-            analysis_type=result.get("query_intent", "general"),
-            query_intent=result.get("query_intent", "general")
-        )
+        return query_response(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
 
+@app.post("/api/agent/query/stream")
+async def query_agent_stream(request: QueryRequest):
+    """
+    Streaming variant of /api/agent/query (Server-Sent Events).
+    
+    Events:
+    - progress: {"step": "routed" | "calculated" | "retrieved", ...} after each agent step
+    - token: {"text": ...} for each fragment of the interpretation as it is generated
+    - done: the same fields as the /api/agent/query response
+    - error: {"detail": ...} if the agent fails mid-stream
+    """
+    async def events():
+        async for event, data in stream_agent(query_initial_state(request)):
+            if event == "done":
+                data = query_response(data).dict()
+            yield event, data
+    
+    return StreamingResponse(sse_stream(events(), "Agent error"),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.post("/api/agent/dashboard", response_model=DashboardResponse)
 async def get_dashboard(request: DashboardRequest):
     """
     Get complete dashboard data for all 12 houses.
     
-    The agent will analyze all houses and provide comprehensive interpretations.
+    Rule-based house analysis plus an overall AI summary; cached per chart and day.
     """
     try:
-        # Prepare state for full dashboard
-        initial_state = {
-            "user_query": "Analyze all houses with complete interpretations combining BAV/SAV, Dasha, and Gochara data",
-            "birth_data": request.birth_data.dict(),
-            "query_intent": "full_dashboard",
-            "selected_houses": list(range(1, 13)),
-            "bav_sav_data": None,
-            "dasha_data": None,
-            "gochara_data": None,
-            "rag_context": [],
-            "current_step": "",
-            "intermediate_results": {},
-            "final_response": None,
-            "citations": [],
-            "needs_more_context": False
-        }
-        
-        # Run agent graph
-        result = agent_graph.invoke(initial_state)
-        
-        # Process results for dashboard
-        bav_sav_data = result.get("bav_sav_data")
-        dasha_data = result.get("dasha_data")
-        gochara_data = result.get("gochara_data")
-        
-        # Generate house-by-house analysis with fast rule-based interpretations
-        houses = []
-        
-        print(f"📊 Generating dashboard for 12 houses...")
-        print(f"   BAV/SAV data: {'✅' if bav_sav_data else '❌'}")
-        print(f"   Dasha data: {'✅' if dasha_data else '❌'}")
-        print(f"   Gochara data: {'✅' if gochara_data else '❌'}")
-        
-        # House significations for interpretations
-        house_significations = {
-            1: "Self, personality, physical appearance, and overall life direction",
-            2: "Wealth, family, speech, and material possessions",
-            3: "Siblings, courage, communication, and short journeys",
-            4: "Home, mother, property, and emotional foundation",
-            5: "Children, education, creativity, and intelligence",
-            6: "Health, enemies, service, and daily routines",
-            7: "Marriage, partnerships, spouse, and business relationships",
-            8: "Longevity, transformation, obstacles, and hidden matters",
-            9: "Fortune, father, spirituality, and higher learning",
-            10: "Career, reputation, authority, and public image",
-            11: "Gains, income, friends, and aspirations",
-            12: "Losses, expenses, foreign lands, and spiritual liberation"
-        }
-        
-        for house_num in range(1, 13):
-            print(f"   Processing House {house_num}/12...", end=" ", flush=True)
-            
-            # Get SAV points for this house
-            sav_points = None
-            if bav_sav_data and "sav_chart" in bav_sav_data and len(bav_sav_data["sav_chart"]) >= house_num:
-                sav_points = bav_sav_data["sav_chart"][house_num - 1]
-            
-            # Get BAV contributions for this house
-            bav_contributions = {}
-            if bav_sav_data and "bav_charts" in bav_sav_data:
-                for planet, chart in bav_sav_data["bav_charts"].items():
-                    if isinstance(chart, list) and len(chart) >= house_num:
-                        planet_display = planet.title() if planet != "ASCENDANT" else "Ascendant"
-                        bav_contributions[planet_display] = chart[house_num - 1]
-            
-            # Generate fast interpretation based on SAV points and rules (no OpenAI call)
-            interpretation = None
-            try:
-                if sav_points is not None:
-                    strength = "Strong" if sav_points >= 30 else "Good" if sav_points >= 28 else "Weak" if sav_points < 22 else "Moderate"
-                    strength_desc = "excellent" if sav_points >= 30 else "good" if sav_points >= 28 else "challenging" if sav_points < 22 else "moderate"
-                    
-                    interpretation = f"House {house_num} ({house_significations.get(house_num, 'General matters')}) has {sav_points} SAV points, indicating {strength_desc} strength. "
-                    
-                    # Add BAV contributions
-                    if bav_contributions:
-                        top_contributors = sorted(bav_contributions.items(), key=lambda x: x[1], reverse=True)[:3]
-                        interpretation += f"Key planetary influences: {', '.join([f'{p} ({v} points)' for p, v in top_contributors])}. "
-                    
-                    # Add strength-based guidance
-                    if sav_points >= 30:
-                        interpretation += "This house is very strong and will yield positive results. Transits and Dasha periods affecting this house will be highly beneficial."
-                    elif sav_points >= 28:
-                        interpretation += "This house has good strength and will generally yield positive results, though some challenges may arise."
-                    elif sav_points < 22:
-                        interpretation += "This house has lower strength and may present challenges. Careful attention and remedies may be beneficial."
-                    else:
-                        interpretation += "This house has moderate strength and will yield mixed results depending on transits and Dasha periods."
-                    
-                    # Add Dasha context if available
-                    if dasha_data and dasha_data.get("current_dasa"):
-                        interpretation += f" Current Dasha: {dasha_data.get('current_dasa')} with {dasha_data.get('current_bhukti', 'N/A')} Bhukti."
-                else:
-                    interpretation = f"House {house_num} ({house_significations.get(house_num, 'General matters')}) analysis based on SAV, Dasha, and Gochara data."
-                
-                print(f"✅", flush=True)
-                    
-            except Exception as e:
-                print(f"❌ Error: {str(e)[:50]}", flush=True)
-                interpretation = f"House {house_num} analysis based on SAV, Dasha, and Gochara data."
-            
-            house_data = {
-                "house_number": house_num,
-                "sav_points": sav_points,
-                "bav_contributions": bav_contributions,
-                "interpretation": interpretation
-            }
-            houses.append(house_data)
-        
-        return DashboardResponse(
-            houses=houses,
-            overall_summary=result.get("final_response", "Dashboard analysis completed"),
-            bav_sav_data=bav_sav_data,
-            dasha_data=dasha_data,
-            gochara_data=gochara_data
-        )
+        return DashboardResponse(**await build_dashboard(request.birth_data.dict()))
         
     except Exception as e:
         import traceback
@@ -557,7 +506,7 @@ async def start_chat(request: ChatStartRequest):
     """
     try:
         # Start conversation
-        session_id = conversation_manager.start_conversation(request.birth_data.dict())
+        session_id = await conversation_manager.astart_conversation(request.birth_data.dict())
         
         # Generate welcome message and suggestions
         welcome_message = f"Hello! I've initialized your astrological analysis. " \
@@ -593,7 +542,7 @@ async def send_chat_message(request: ChatMessageRequest):
     5. Generate intelligent response
     """
     try:
-        result = conversation_manager.process_message(
+        result = await conversation_manager.process_message(
             request.session_id,
             request.message
         )
@@ -610,11 +559,37 @@ async def send_chat_message(request: ChatMessageRequest):
         raise HTTPException(status_code=500, detail=f"Failed to process message: {str(e)}")
 
 
+@app.post("/api/chat/message/stream")
+async def send_chat_message_stream(request: ChatMessageRequest):
+    """
+    Streaming variant of /api/chat/message (Server-Sent Events).
+    
+    Emits progress and token events as the agent works, then a done event with
+    the same fields as the /api/chat/message response (see /api/agent/query/stream).
+    """
+    if not await conversation_manager.aget_conversation(request.session_id):
+        raise HTTPException(status_code=404, detail=f"Session {request.session_id} not found")
+    
+    async def events():
+        async for event, data in conversation_manager.stream_message(request.session_id, request.message):
+            if event == "done":
+                data = ChatMessageResponse(
+                    response=data["response"],
+                    citations=data.get("citations", []),
+                    suggestions=data.get("suggestions", []),
+                    chart_data=data.get("chart_data")
+                ).dict()
+            yield event, data
+    
+    return StreamingResponse(sse_stream(events(), "Failed to process message"),
+                             media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.get("/api/chat/history/{session_id}")
 async def get_chat_history(session_id: str):
     """Get conversation history for a session"""
     try:
-        conversation = conversation_manager.get_conversation(session_id)
+        conversation = await conversation_manager.aget_conversation(session_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -629,11 +604,17 @@ async def get_chat_history(session_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get history: {str(e)}")
 
 
+@app.get("/api/chat/stats")
+async def chat_stats():
+    """Active chat sessions and their memory use (per worker process)"""
+    return await asyncio.to_thread(conversation_manager.stats)
+
+
 @app.post("/api/chat/reset/{session_id}")
 async def reset_chat(session_id: str):
     """Reset conversation history but keep birth data and chart cache"""
     try:
-        conversation_manager.reset_conversation(session_id)
+        await conversation_manager.areset_conversation(session_id)
         return {"message": "Conversation reset successfully", "session_id": session_id}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,136 @@
+"""
+Embedding Cache for RAG Queries
+Content-hash keyed cache of OpenAI embeddings with two tiers:
+- in-memory LRU (per process)
+- optional SQLite file (shared by workers on one host, survives restarts)
+
+Vectors are stored as float32 (6 KB per 1536-dim embedding instead of ~50 KB as a list).
+
+Configuration (environment variables):
+- EMBEDDING_CACHE_SIZE: max embeddings kept in memory (default 2048, 0 disables the memory tier)
+- EMBEDDING_CACHE_PATH: SQLite file for the disk tier (default: unset, disk tier disabled)
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """SHA-256 of model and text; identical text always maps to the same key"""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU of float32 vectors with an optional SQLite backing store"""
+
+    def __init__(self, maxsize: int = 2048, db_path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.db_path = db_path
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+                    "vector BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Embedding disk cache unavailable ({db_path}): {e}")
+                self._db = None
+
+    def _remember(self, key: str, vector: array):
+        """Insert into the memory tier (caller holds the lock)"""
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Cached embedding for text, or None on a miss"""
+        key = embedding_cache_key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return vector.tolist()
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Embedding disk cache read failed: {e}")
+                    row = None
+                if row is not None:
+                    vector = array("f")
+                    vector.frombytes(row[0])
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector.tolist()
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, embedding: List[float]) -> List[float]:
+        """Store an embedding and return it as cached (float32-rounded), so hits and misses agree"""
+        key = embedding_cache_key(model, text)
+        vector = array("f", embedding)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, model, len(vector), vector.tobytes(), time.time())
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Embedding disk cache write failed: {e}")
+        return vector.tolist()
+
+    def clear(self):
+        """Empty the memory tier and reset counters (the disk tier is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "disk_path": self.db_path if self._db is not None else None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+            }
+
+
+embedding_cache = EmbeddingCache(
+    maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", 2048)),
+    db_path=os.getenv("EMBEDDING_CACHE_PATH") or None
+)
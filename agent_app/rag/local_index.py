@@ -0,0 +1,191 @@
+"""
+Local Vector Index for the Vedic Knowledge Base
+In-process alternative to the Supabase match_vedic_knowledge RPC: all embeddings and metadata
+are held in a NumPy matrix and searched with exact cosine similarity, with the same
+category/house/planet filters and the same result fields.
+
+The knowledge base is a few hundred chunks, so an exact search is a single small
+matrix-vector product - faster than a network round trip and usable offline.
+
+Snapshot Supabase to a file once (and after re-populating the knowledge base):
+    python -m agent_app.rag.local_index [path]
+
+Configuration (environment variables):
+- RAG_BACKEND: "supabase" (default) or "local"
+- RAG_INDEX_PATH: snapshot file (default: agent_app/rag/vedic_knowledge_index.npz); when it
+  doesn't exist the index is built from Supabase at startup and saved there
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "RAG_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "vedic_knowledge_index.npz")
+)
+
+# Columns kept per chunk (the match_vedic_knowledge result fields, minus similarity)
+RECORD_FIELDS = ("id", "category", "content", "metadata", "house_number", "planet")
+
+
+def _parse_embedding(value) -> List[float]:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+class LocalVectorIndex:
+    """Exact cosine top-k over unit-normalized float32 embeddings, with metadata filters"""
+
+    def __init__(self, records: List[Dict], embeddings: np.ndarray):
+        if len(records) != len(embeddings):
+            raise ValueError(f"{len(records)} records but {len(embeddings)} embeddings")
+        self.records = records
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(records), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.embeddings = matrix / norms
+
+        # Filter columns as arrays so masks are vectorized
+        self._categories = np.array([record.get("category") for record in records], dtype=object)
+        self._houses = np.array([record.get("house_number") or 0 for record in records], dtype=np.int64)
+        self._planets = np.array([record.get("planet") for record in records], dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "LocalVectorIndex":
+        """Build from vedic_knowledge rows that include an 'embedding' column"""
+        rows = [row for row in rows if row.get("embedding") is not None]
+        records = [{field: row.get(field) for field in RECORD_FIELDS} for row in rows]
+        embeddings = np.array([_parse_embedding(row["embedding"]) for row in rows], dtype=np.float32)
+        return cls(records, embeddings)
+
+    @classmethod
+    def from_supabase(cls, supabase, table: str = "vedic_knowledge", page_size: int = 500) -> "LocalVectorIndex":
+        """Snapshot every row of the knowledge table, paging through PostgREST"""
+        rows = []
+        columns = ", ".join(RECORD_FIELDS + ("embedding",))
+        while True:
+            result = supabase.table(table).select(columns).order("id") \
+                .range(len(rows), len(rows) + page_size - 1).execute()
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+        return cls.from_rows(rows)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        with np.load(path, allow_pickle=False) as data:
+            records = json.loads(str(data["records"]))
+            embeddings = data["embeddings"]
+        return cls(records, embeddings)
+
+    def save(self, path: str):
+        """Write the index as .npz (float32 matrix + JSON metadata); atomic replace"""
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, embeddings=self.embeddings, records=np.array(json.dumps(self.records)))
+        os.replace(tmp_path, path)
+
+    def _filter_mask(self, category: str = None, house_number: int = None, planet: str = None) -> np.ndarray:
+        mask = np.ones(len(self.records), dtype=bool)
+        if category:
+            mask &= self._categories == category
+        if house_number:
+            mask &= self._houses == house_number
+        if planet:
+            mask &= self._planets == planet
+        return mask
+
+    def _top_k(self, scores: np.ndarray, mask: np.ndarray, top_k: int, match_threshold: float) -> List[Dict]:
+        candidates = np.flatnonzero(mask & (scores >= match_threshold))
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            {**self.records[i], "similarity": float(scores[i])}
+            for i in candidates
+        ]
+
+    def search(self, query_embedding: List[float], top_k: int = 5, category: str = None,
+               house_number: int = None, planet: str = None, match_threshold: float = 0.0) -> List[Dict]:
+        """
+        Chunks most similar to the query embedding, best first.
+
+        Same semantics and result fields as the match_vedic_knowledge RPC
+        (id, category, content, metadata, house_number, planet, similarity).
+        """
+        filters = [{"category": category, "house_number": house_number, "planet": planet}]
+        return self.search_many(query_embedding, filters, top_k, match_threshold)[0]
+
+    def search_many(self, query_embedding: List[float], filters: List[Dict], top_k: int = 5,
+                    match_threshold: float = 0.0) -> List[List[Dict]]:
+        """
+        search() for several filter combinations with one similarity pass.
+
+        filters is a list of dicts with optional category/house_number/planet keys;
+        returns one result list per filter, in the same order.
+        """
+        if not len(self.records) or top_k <= 0:
+            return [[] for _ in filters]
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self.embeddings @ (query / norm if norm else query)
+        return [
+            self._top_k(scores, self._filter_mask(**filter_kwargs), top_k, match_threshold)
+            for filter_kwargs in filters
+        ]
+
+
+_index: Optional[LocalVectorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_local_index(supabase=None, path: str = DEFAULT_INDEX_PATH) -> LocalVectorIndex:
+    """
+    Process-wide index: loaded from path, or snapshotted from Supabase (and saved to path)
+    when the file doesn't exist yet.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if os.path.exists(path):
+                    _index = LocalVectorIndex.load(path)
+                    logger.info(f"✅ Local vector index loaded: {len(_index)} chunks from {path}")
+                elif supabase is not None:
+                    _index = LocalVectorIndex.from_supabase(supabase)
+                    logger.info(f"✅ Local vector index built from Supabase: {len(_index)} chunks")
+                    try:
+                        _index.save(path)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Could not save local vector index to {path}: {e}")
+                else:
+                    raise ValueError(f"No local vector index at {path} and no Supabase client to build one")
+    return _index
+
+
+if __name__ == "__main__":
+    from supabase import create_client
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    index_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INDEX_PATH
+    index = LocalVectorIndex.from_supabase(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")))
+    index.save(index_path)
+    print(f"Wrote {len(index)} chunks to {index_path}")
@@ -0,0 +1,172 @@
+"""
+Semantic Response Cache for Agent Answers
+Reuses an earlier interpretation when the same chart is asked a near-identical question
+("What Dasha am I in?" vs "what dasha am i in"), skipping the LLM call.
+
+Entries are grouped by (chart fingerprint, intent, selected houses); within a group a cached
+answer is returned when the cosine similarity of the query embeddings reaches the threshold.
+The agent's user_query is embedded; it holds only the current question (chat history travels
+separately in conversation_context and is not part of the match). Chat questions that
+name their topic (house, Dasha, transits - e.g. the suggestion buttons) share entries with
+one-off queries; follow-ups that only make sense with the history ("tell me more") are not
+cached (see astrology_agent_graph.depends_on_history).
+Answers quote the day's transits, so an entry expires at midnight after its Gochara date
+(and never later than RESPONSE_CACHE_TTL).
+
+Configuration (environment variables):
+- RESPONSE_CACHE_SIZE: max cached answers per process (default 1024, 0 disables the cache)
+- RESPONSE_CACHE_THRESHOLD: minimum query similarity for a hit (default 0.95)
+- RESPONSE_CACHE_TTL: maximum age of an answer in seconds (default 86400)
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Decimal places lat/lon are rounded to in fingerprints (~11 m, as in the natal cache)
+LATLON_PRECISION = 4
+
+# Answers kept per (chart, intent, houses) group; older ones are dropped first
+MAX_ENTRIES_PER_GROUP = 32
+
+
+def chart_fingerprint(birth_data: Optional[Dict], chart_data: Dict) -> str:
+    """
+    SHA-256 of the normalized birth data and which chart data sources are present.
+
+    Equal fingerprints mean the interpretation prompt was built from the same chart.
+    """
+    birth_data = birth_data or {}
+    lat = birth_data.get("latitude") or birth_data.get("lat")
+    lon = birth_data.get("longitude") or birth_data.get("lon")
+    fingerprint = {
+        "dob": birth_data.get("dob"),
+        "tob": birth_data.get("tob"),
+        "lat": round(float(lat), LATLON_PRECISION) if lat is not None else None,
+        "lon": round(float(lon), LATLON_PRECISION) if lon is not None else None,
+        "tz_offset": birth_data.get("tz_offset"),
+        "sources": sorted(source for source, data in chart_data.items() if data)
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SemanticResponseCache:
+    """Thread-safe LRU of answers, matched by chart group and query-embedding similarity"""
+
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.95, ttl: float = 86400):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        # group key -> [(unit query embedding, response, expires_at)], least recently used group first
+        self._groups: "OrderedDict[Tuple, List[Tuple[np.ndarray, str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def group_key(birth_data: Optional[Dict], chart_data: Dict, intent: str,
+                  selected_houses: List[int]) -> Tuple:
+        return (chart_fingerprint(birth_data, chart_data), intent or "", tuple(sorted(set(selected_houses or []))))
+
+    def expires_at(self, gochara_data: Optional[Dict], now: Optional[float] = None) -> float:
+        """Midnight after the Gochara date (today without Gochara data), capped at now + ttl"""
+        now = time.time() if now is None else now
+        transit_date = None
+        if gochara_data and gochara_data.get("transit_date"):
+            try:
+                transit_date = datetime.datetime.strptime(gochara_data["transit_date"], "%Y-%m-%d").date()
+            except ValueError:
+                pass
+        if transit_date is None:
+            transit_date = datetime.date.fromtimestamp(now)
+        midnight = datetime.datetime.combine(transit_date + datetime.timedelta(days=1), datetime.time.min)
+        return min(now + self.ttl, midnight.timestamp())
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, key: Tuple, query_embedding: List[float]) -> Optional[str]:
+        """Most similar unexpired answer in the group, or None below the threshold"""
+        if self.maxsize <= 0:
+            return None
+        query = self._unit(query_embedding)
+        now = time.time()
+        with self._lock:
+            entries = self._groups.get(key)
+            if entries:
+                live = [entry for entry in entries if entry[2] > now]
+                self._size -= len(entries) - len(live)
+                if live:
+                    self._groups[key] = live
+                    scores = np.stack([entry[0] for entry in live]) @ query
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        self._groups.move_to_end(key)
+                        self.hits += 1
+                        return live[best][1]
+                else:
+                    del self._groups[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, query_embedding: List[float], response: str, expires_at: float):
+        if self.maxsize <= 0 or expires_at <= time.time():
+            return
+        entry = (self._unit(query_embedding), response, expires_at)
+        with self._lock:
+            entries = self._groups.setdefault(key, [])
+            entries.append(entry)
+            self._size += 1
+            if len(entries) > MAX_ENTRIES_PER_GROUP:
+                del entries[0]
+                self._size -= 1
+            self._groups.move_to_end(key)
+            while self._size > self.maxsize:
+                oldest_key, oldest = next(iter(self._groups.items()))
+                del oldest[0]
+                self._size -= 1
+                if not oldest:
+                    del self._groups[oldest_key]
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters for monitoring (per process)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "groups": len(self._groups),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+response_cache = SemanticResponseCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 1024)),
+    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.95)),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", 86400))
+)
@@ -5,10 +5,14 @@ Uses Supabase PG Vector with OpenAI embeddings
 
 import os
 import sys
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
 from supabase import create_client, Client
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from agent_app.rag.embedding_cache import EmbeddingCache, embedding_cache as shared_embedding_cache
 
 # Configure logger for this module
 logger = logging.getLogger(__name__)
@@ -21,10 +25,16 @@ except ImportError:
     pass
 
 
+def sav_strength(points: int) -> str:
+    """Strength label for a house's SAV points (>=30 Strong, >=28 Good, <22 Weak)"""
+    return "Strong" if points >= 30 else "Good" if points >= 28 else "Weak" if points < 22 else "Moderate"
+
+
 class SupabaseRAGSystem:
     """RAG system using Supabase PG Vector and OpenAI embeddings"""
     
-    def __init__(self, supabase_url: str = None, supabase_key: str = None, openai_key: str = None):
+    def __init__(self, supabase_url: str = None, supabase_key: str = None, openai_key: str = None,
+                 embedding_cache: EmbeddingCache = None):
         """
         Initialize RAG system with Supabase and OpenAI clients.
         
@@ -32,66 +42,104 @@ class SupabaseRAGSystem:
             supabase_url: Supabase project URL (or from env)
             supabase_key: Supabase service role key (or from env)
             openai_key: OpenAI API key (or from env)
+            embedding_cache: Cache for query embeddings (defaults to the process-wide cache)
         """
         # Get from environment if not provided
         self.supabase_url = supabase_url or os.getenv("SUPABASE_URL")
         self.supabase_key = supabase_key or os.getenv("SUPABASE_KEY")
         self.openai_key = openai_key or os.getenv("OPENAI_API_KEY")
         
-        if not self.supabase_url or not self.supabase_key:
+        # Retrieval backend: Supabase RPC, or the in-process index (agent_app/rag/local_index.py)
+        self.retrieval_backend = os.getenv("RAG_BACKEND", "supabase").lower()
+        local_index_path = None
+        if self.retrieval_backend == "local":
+            from agent_app.rag.local_index import DEFAULT_INDEX_PATH
+            local_index_path = DEFAULT_INDEX_PATH
+        
+        # A saved local index is enough to run retrieval without Supabase (e.g. offline tests)
+        has_local_snapshot = local_index_path is not None and os.path.exists(local_index_path)
+        if (not self.supabase_url or not self.supabase_key) and not has_local_snapshot:
             raise ValueError("Supabase URL and key must be provided or set in environment variables")
         
         if not self.openai_key:
             raise ValueError("OpenAI API key must be provided or set in environment variables")
         
         # Validate Supabase key format (should be JWT token)
-        if not self.supabase_key.startswith('eyJ'):
+        if not self.supabase_key:
+            logger.info(f"Supabase not configured, using local vector index only")
+        elif not self.supabase_key.startswith('eyJ'):
             logger.warning(f"⚠️ WARNING: Supabase key doesn't look like a JWT token. Make sure you're using service_role key, not anon key.")
             logger.warning(f"⚠️ Current key starts with: {self.supabase_key[:10] if len(self.supabase_key) > 10 else 'too short'}...")
         
         # Log key status (first 10 chars only for security)
-        key_preview = self.supabase_key[:10] + "..." if len(self.supabase_key) > 10 else "INVALID"
-        logger.info(f"🔑 Supabase key configured: {key_preview} (length: {len(self.supabase_key)})")
-        logger.info(f"🔗 Supabase URL: {self.supabase_url}")
+        if self.supabase_key:
+            key_preview = self.supabase_key[:10] + "..." if len(self.supabase_key) > 10 else "INVALID"
+            logger.info(f"🔑 Supabase key configured: {key_preview} (length: {len(self.supabase_key)})")
+            logger.info(f"🔗 Supabase URL: {self.supabase_url}")
         
         # Initialize clients with connection test (non-blocking - don't fail startup if Supabase is down)
-        try:
-            self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
-            # Test connection (non-blocking - warn but don't fail)
-            try:
-                test_result = self.supabase.table("vedic_knowledge").select("id").limit(1).execute()
-                logger.info(f"✅ Supabase connection successful!")
-            except Exception as test_error:
-                # Don't fail startup - just warn (RAG will fail gracefully later)
-                logger.warning(f"⚠️ Supabase connection test failed: {str(test_error)}")
-                logger.warning(f"⚠️ Service will start but RAG may not work. Check SUPABASE_URL and SUPABASE_KEY.")
-        except Exception as e:
-            # Only fail if we can't even create the client
-            logger.error(f"❌ Failed to create Supabase client: {str(e)}")
-            logger.error(f"❌ Please check SUPABASE_URL and SUPABASE_KEY in Railway environment variables")
-            # Don't raise - allow service to start (RAG will fail gracefully)
+        if not self.supabase_url or not self.supabase_key:
             self.supabase = None
+        else:
+            try:
+                self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+                # Test connection (non-blocking - warn but don't fail)
+                try:
+                    test_result = self.supabase.table("vedic_knowledge").select("id").limit(1).execute()
+                    logger.info(f"✅ Supabase connection successful!")
+                except Exception as test_error:
+                    # Don't fail startup - just warn (RAG will fail gracefully later)
+                    logger.warning(f"⚠️ Supabase connection test failed: {str(test_error)}")
+                    logger.warning(f"⚠️ Service will start but RAG may not work. Check SUPABASE_URL and SUPABASE_KEY.")
+            except Exception as e:
+                # Only fail if we can't even create the client
+                logger.error(f"❌ Failed to create Supabase client: {str(e)}")
+                logger.error(f"❌ Please check SUPABASE_URL and SUPABASE_KEY in Railway environment variables")
+                # Don't raise - allow service to start (RAG will fail gracefully)
+                self.supabase = None
         # Initialize OpenAI with timeout configuration
         self.openai = OpenAI(
             api_key=self.openai_key,
             timeout=30.0,  # Increased to 30s for production (network latency can be higher)
             max_retries=2  # Retry up to 2 times on failure
         )
+        # Async client for the agent graph (same configuration)
+        self.async_openai = AsyncOpenAI(
+            api_key=self.openai_key,
+            timeout=30.0,
+            max_retries=2
+        )
         
         # Embedding model
         self.embedding_model = "text-embedding-3-small"
         self.embedding_dimension = 1536
+        self.embedding_cache = embedding_cache or shared_embedding_cache
+        
+        # In-process vector index (RAG_BACKEND=local), shared by all instances in the process
+        self.local_index = None
+        if self.retrieval_backend == "local":
+            try:
+                from agent_app.rag.local_index import get_local_index
+                self.local_index = get_local_index(self.supabase, local_index_path)
+            except Exception as e:
+                logger.error(f"❌ Local vector index unavailable, falling back to Supabase: {str(e)}")
     
     def embed_text(self, text: str) -> List[float]:
         """
         Generate embedding for text using OpenAI.
         
+        Repeated texts are served from the embedding cache without calling the API.
+        
         Args:
             text: Text to embed
         
         Returns:
             List of floats representing the embedding vector
         """
+        cached = self.embedding_cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+        
         import time
         start_time = time.time()
         try:
@@ -104,12 +152,39 @@ class SupabaseRAGSystem:
             duration = time.time() - start_time
             if duration > 2.0:  # Log if embedding takes > 2s
                 logger.warning(f"⚠️ Embedding took {duration:.2f}s (slower than expected)")
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
         except Exception as e:
             duration = time.time() - start_time
             logger.error(f"❌ Embedding failed after {duration:.2f}s: {str(e)}")
             # Re-raise with more context
             raise Exception(f"Error generating embedding after {duration:.2f}s: {str(e)}")
+        
+        return self.embedding_cache.put(self.embedding_model, text, embedding)
+    
+    async def aembed_text(self, text: str) -> List[float]:
+        """Async embed_text (same cache), awaiting the OpenAI call instead of blocking"""
+        cached = self.embedding_cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+        
+        import time
+        start_time = time.time()
+        try:
+            response = await self.async_openai.embeddings.create(
+                model=self.embedding_model,
+                input=text,
+                timeout=30.0
+            )
+            duration = time.time() - start_time
+            if duration > 2.0:  # Log if embedding takes > 2s
+                logger.warning(f"⚠️ Embedding took {duration:.2f}s (slower than expected)")
+            embedding = response.data[0].embedding
+        except Exception as e:
+            duration = time.time() - start_time
+            logger.error(f"❌ Embedding failed after {duration:.2f}s: {str(e)}")
+            raise Exception(f"Error generating embedding after {duration:.2f}s: {str(e)}")
+        
+        return self.embedding_cache.put(self.embedding_model, text, embedding)
     
     def store_knowledge(self, content: str, metadata: Dict = None, 
                        category: str = None, house_number: int = None, 
@@ -151,9 +226,119 @@ class SupabaseRAGSystem:
         except Exception as e:
             raise Exception(f"Error storing knowledge: {str(e)}")
     
+    def embed_texts(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+        """
+        Generate embeddings for many texts, batch_size texts per OpenAI request.
+        
+        Cached texts are not re-embedded; new embeddings are added to the cache.
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Texts per embeddings API call
+        
+        Returns:
+            Embedding vectors in the same order as texts
+        """
+        embeddings = [self.embedding_cache.get(self.embedding_model, text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        import time
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            start_time = time.time()
+            try:
+                response = self.openai.embeddings.create(
+                    model=self.embedding_model,
+                    input=[texts[i] for i in batch],
+                    timeout=60.0
+                )
+            except Exception as e:
+                raise Exception(f"Error generating embeddings for {len(batch)} texts: {str(e)}")
+            logger.info(f"⏱️ Embedded {len(batch)} texts in {time.time() - start_time:.2f}s")
+            
+            # The API returns one item per input, tagged with its position
+            for item in response.data:
+                i = batch[item.index]
+                embeddings[i] = self.embedding_cache.put(self.embedding_model, texts[i], item.embedding)
+        
+        return embeddings
+    
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """SHA-256 of a knowledge chunk's content, used to detect already-stored chunks"""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def _stored_content_hashes(self, hashes: List[str], page_size: int = 100) -> set:
+        """Which of the given content hashes are already in vedic_knowledge"""
+        stored = set()
+        for start in range(0, len(hashes), page_size):
+            result = self.supabase.table("vedic_knowledge").select("content_hash") \
+                .in_("content_hash", hashes[start:start + page_size]).execute()
+            stored.update(row["content_hash"] for row in result.data or [])
+        return stored
+    
+    def store_knowledge_bulk(self, chunks: List[Dict], batch_size: int = 100) -> Dict:
+        """
+        Store many knowledge chunks, skipping any whose content is already stored.
+        
+        Safe to re-run, also concurrently: chunks are identified by content hash (kept in
+        metadata.content_hash and the unique content_hash column, see supabase_rpc_setup.sql)
+        and upserted with ON CONFLICT DO NOTHING. Hashes already stored are looked up per
+        batch so their content isn't embedded again.
+        
+        Args:
+            chunks: Dicts with content and optional metadata, category, house_number, planet
+            batch_size: Texts per embeddings call and rows per upsert
+        
+        Returns:
+            Dict with counts: total, skipped (already stored or duplicate), inserted, failed
+        """
+        if not self.supabase:
+            raise Exception("Supabase client not initialized")
+        
+        unique_chunks = {}
+        for chunk in chunks:
+            # Drops duplicates within this run
+            unique_chunks.setdefault(self.content_hash(chunk["content"]), chunk)
+        unique_chunks = list(unique_chunks.items())
+        
+        summary = {"total": len(chunks), "skipped": len(chunks) - len(unique_chunks), "inserted": 0, "failed": 0}
+        
+        for start in range(0, len(unique_chunks), batch_size):
+            batch = unique_chunks[start:start + batch_size]
+            try:
+                stored = self._stored_content_hashes([chunk_hash for chunk_hash, _ in batch])
+                batch = [(chunk_hash, chunk) for chunk_hash, chunk in batch if chunk_hash not in stored]
+                summary["skipped"] += len(stored)
+                if not batch:
+                    continue
+                embeddings = self.embed_texts([chunk["content"] for _, chunk in batch], batch_size)
+                rows = [
+                    {
+                        "content": chunk["content"],
+                        "embedding": embedding,
+                        "metadata": {**(chunk.get("metadata") or {}), "content_hash": chunk_hash},
+                        "category": chunk.get("category"),
+                        "house_number": chunk.get("house_number"),
+                        "planet": chunk.get("planet")
+                    }
+                    for (chunk_hash, chunk), embedding in zip(batch, embeddings)
+                ]
+                # Rows another run stored since the lookup are ignored, not duplicated
+                result = self.supabase.table("vedic_knowledge") \
+                    .upsert(rows, on_conflict="content_hash", ignore_duplicates=True).execute()
+                inserted = len(result.data or [])
+                summary["inserted"] += inserted
+                summary["skipped"] += len(rows) - inserted
+            except Exception as e:
+                logger.error(f"❌ Failed to store {len(batch)} knowledge chunks: {str(e)}")
+                summary["failed"] += len(batch)
+        
+        return summary
+    
     def retrieve_context(self, query: str, top_k: int = 5, 
                         category: str = None, house_number: int = None,
-                        planet: str = None) -> List[Dict]:
+                        planet: str = None, query_embedding: List[float] = None) -> List[Dict]:
         """
         Retrieve relevant context from Supabase using vector similarity search.
         
@@ -163,11 +348,16 @@ class SupabaseRAGSystem:
             category: Filter by category
             house_number: Filter by house number
             planet: Filter by planet
+            query_embedding: Embedding of query, if already computed
         
         Returns:
             List of relevant knowledge chunks with content and metadata
         """
         try:
+            if self.local_index is not None:
+                return self._search_local_index(query, top_k, category, house_number, planet,
+                                                query_embedding=query_embedding)
+            
             # Check if Supabase is initialized
             if not self.supabase:
                 logger.warning(f"⚠️ Supabase client not initialized, returning empty context")
@@ -177,7 +367,7 @@ class SupabaseRAGSystem:
             import time
             embed_start = time.time()
             try:
-                query_embedding = self.embed_text(query)
+                query_embedding = query_embedding or self.embed_text(query)
             except Exception as embed_error:
                 # If embedding fails, try to continue with empty context (graceful degradation)
                 logger.warning(f"⚠️ Embedding generation failed: {embed_error}")
@@ -231,7 +421,7 @@ class SupabaseRAGSystem:
     
     def retrieve_context_advanced(self, query: str, top_k: int = 5,
                                   category: str = None, house_number: int = None,
-                                  planet: str = None) -> List[Dict]:
+                                  planet: str = None, query_embedding: List[float] = None) -> List[Dict]:
         """
         Advanced retrieval using Supabase RPC function for vector similarity.
         Requires creating a custom function in Supabase.
@@ -239,8 +429,12 @@ class SupabaseRAGSystem:
         This is the recommended approach for production.
         """
         try:
+            if self.local_index is not None:
+                return self._search_local_index(query, top_k, category, house_number, planet,
+                                                match_threshold=0.7, query_embedding=query_embedding)
+            
             # Generate query embedding
-            query_embedding = self.embed_text(query)
+            query_embedding = query_embedding or self.embed_text(query)
             
             # Call Supabase RPC function for vector search
             # Note: You need to create this function in Supabase first
@@ -261,126 +455,233 @@ class SupabaseRAGSystem:
         except Exception as e:
             # Fallback to basic retrieval
             logger.warning(f"Advanced retrieval failed, using basic: {str(e)}")
-            return self.retrieve_context(query, top_k, category, house_number, planet)
+            return self.retrieve_context(query, top_k, category, house_number, planet, query_embedding)
     
-    def generate_interpretation(self, query: str, context_chunks: List[Dict], 
-                                chart_data: Dict = None) -> str:
+    def retrieve_context_by_house(self, query: str, house_numbers: List[int], top_k: int = 2,
+                                  category: str = None, planet: str = None,
+                                  match_threshold: float = 0.7,
+                                  query_embedding: List[float] = None) -> Dict[int, List[Dict]]:
         """
-        Generate interpretation using OpenAI with RAG context.
+        Top-k chunks for each of several houses with a single query embedding and a single
+        retrieval round trip (match_vedic_knowledge_by_house RPC, or one local index pass).
         
         Args:
-            query: User query
-            context_chunks: Retrieved context from vector store
-            chart_data: Optional chart data (BAV/SAV, Dasha, Gochara)
+            query: Search query text (embedded once)
+            house_numbers: Houses to retrieve for
+            top_k: Number of results per house
+            category: Filter by category
+            planet: Filter by planet
+            query_embedding: Embedding of query, if already computed
         
         Returns:
-            Generated interpretation text
+            Dict of house number -> results (same fields as retrieve_context_advanced), best first
         """
+        grouped = {house_number: [] for house_number in house_numbers}
+        if not house_numbers:
+            return grouped
+        
         try:
-            # Handle None or empty context_chunks
-            if not context_chunks:
-                context_chunks = []
-            
-            # Build context string
-            context_text = "\n\n".join([
-                f"[Source: {chunk.get('category', 'general')}] {chunk.get('content', '')}"
-                for chunk in context_chunks if chunk and isinstance(chunk, dict)
-            ])
-            
-            # Build prompt (condensed for faster processing)
-            system_prompt = """Expert Vedic astrologer. Use ACTUAL chart data provided. 
-            Reference specific SAV points, BAV contributions, Dasha periods, and transit data. 
-            DO NOT give generic interpretations."""
-            
-            # Format chart data with specific details
-            chart_data_text = self._format_chart_data(chart_data) if chart_data else "No chart data provided"
-            
-            # Extract specific house information if query mentions a house
-            house_specific_info = ""
-            house_num = None
-            
-            # Extract Dasha-specific information if query mentions Dasha
-            dasha_specific_info = ""
-            query_lower = query.lower()
-            
-            # Check if query is about Dasha
-            dasha_keywords = ["dasha", "dasa", "period", "bhukti", "current", "planetary period", "maha dasa"]
-            is_dasha_query = any(keyword in query_lower for keyword in dasha_keywords)
+            query_embedding = query_embedding or self.embed_text(query)
+            
+            if self.local_index is not None:
+                filters = [
+                    {"category": category, "house_number": house_number, "planet": planet}
+                    for house_number in house_numbers
+                ]
+                results = self.local_index.search_many(query_embedding, filters, top_k, match_threshold)
+                for house_number, house_results in zip(house_numbers, results):
+                    for result in house_results:
+                        result["score"] = result["similarity"]
+                    grouped[house_number] = house_results
+                return grouped
+            
+            # Requires match_vedic_knowledge_by_house (see supabase_rpc_setup.sql)
+            result = self.supabase.rpc(
+                "match_vedic_knowledge_by_house",
+                {
+                    "query_embedding": query_embedding,
+                    "filter_houses": list(house_numbers),
+                    "match_threshold": match_threshold,
+                    "match_count": top_k,
+                    "filter_category": category,
+                    "filter_planet": planet
+                }
+            ).execute()
             
-            if is_dasha_query and chart_data and chart_data.get("dasha"):
-                dasha = chart_data["dasha"]
-                if dasha and isinstance(dasha, dict):
-                    dasha_specific_info = f"\n\nCURRENT DASHA DATA (YOU MUST USE THIS - DO NOT SAY IT'S NOT AVAILABLE):\n"
-                    dasha_specific_info += f"- Current Dasha: {dasha.get('current_dasa', 'N/A')}\n"
-                    dasha_specific_info += f"- Current Bhukti: {dasha.get('current_bhukti', 'N/A')}\n"
-                    if dasha.get('start_date'):
-                        dasha_specific_info += f"- Dasha Start Date: {dasha.get('start_date', 'N/A')}\n"
-                    if dasha.get('end_date'):
-                        dasha_specific_info += f"- Dasha End Date: {dasha.get('end_date', 'N/A')}\n"
-                    if dasha.get('age'):
-                        dasha_specific_info += f"- Age: {dasha.get('age', 'N/A')} years\n"
-                    if dasha.get('remaining_years'):
-                        dasha_specific_info += f"- Remaining Years in Current Dasha: {dasha.get('remaining_years', 'N/A')} years\n"
-                    dasha_specific_info += f"\nCRITICAL: The Dasha data above is REAL and CALCULATED. You MUST state it explicitly in your response."
-                    dasha_specific_info += f" DO NOT say 'Dasha is not mentioned' or 'I need your birth details' - the data is provided above."
+            for row in result.data or []:
+                grouped.setdefault(row.get("house_number"), []).append(row)
+            return grouped
             
-            # Detect house number from query
-            house_keywords = {
-                "1st": 1, "first": 1, "lagna": 1, "ascendant": 1,
-                "2nd": 2, "second": 2, "wealth": 2,
-                "3rd": 3, "third": 3, "siblings": 3,
-                "4th": 4, "fourth": 4, "home": 4, "mother": 4,
-                "5th": 5, "fifth": 5, "children": 5, "education": 5,
-                "6th": 6, "sixth": 6, "enemies": 6, "health": 6,
-                "7th": 7, "seventh": 7, "marriage": 7, "spouse": 7,
-                "8th": 8, "eighth": 8, "longevity": 8,
-                "9th": 9, "ninth": 9, "fortune": 9, "father": 9,
-                "10th": 10, "tenth": 10, "career": 10, "profession": 10,
-                "11th": 11, "eleventh": 11, "gains": 11, "income": 11,
-                "12th": 12, "twelfth": 12, "losses": 12, "expenses": 12
+        except Exception as e:
+            # Fallback: one RPC per house (the query embedding is cached, so still embedded once)
+            logger.warning(f"Batched retrieval failed, retrieving per house: {str(e)}")
+            return {
+                house_number: self.retrieve_context_advanced(query, top_k, category, house_number, planet,
+                                                             query_embedding)
+                for house_number in house_numbers
             }
-            
-            for keyword, num in house_keywords.items():
-                if keyword in query_lower:
-                    house_num = num
-                    break
-            
-            if house_num and chart_data and chart_data.get("bav_sav") and chart_data["bav_sav"].get("sav_chart"):
-                sav_chart = chart_data["bav_sav"]["sav_chart"]
-                if len(sav_chart) >= house_num:
-                    house_points = sav_chart[house_num - 1]  # 0-indexed
-                    house_specific_info = f"\n\nSPECIFIC HOUSE {house_num} DATA:\n"
-                    house_specific_info += f"- SAV Points: {house_points} (This is the CORRECT total for House {house_num})\n"
-                    house_specific_info += f"- Strength: Strong if >=30, Good if >=28, Weak if <22\n\n"
-                    house_specific_info += f"Individual BAV Contributions to House {house_num}:\n"
-                    house_specific_info += f"IMPORTANT: SAV is the sum of 7 planets ONLY (excluding Ascendant).\n"
-                    house_specific_info += f"Individual BAV values show each planet's contribution:\n"
-                    
-                    if chart_data["bav_sav"].get("bav_charts"):
-                        bav_list = []
-                        # API returns planet names in UPPERCASE, convert to title case for display
-                        planet_display_map = {
-                            'SUN': 'Sun', 'MOON': 'Moon', 'MARS': 'Mars', 
-                            'MERCURY': 'Mercury', 'JUPITER': 'Jupiter', 
-                            'VENUS': 'Venus', 'SATURN': 'Saturn', 'ASCENDANT': 'Ascendant'
-                        }
-                        # Order planets for consistent display (7 planets first, then Ascendant)
-                        planet_order = ['SUN', 'MOON', 'MARS', 'MERCURY', 'JUPITER', 'VENUS', 'SATURN', 'ASCENDANT']
-                        seven_planets_sum = 0
-                        for planet_key in planet_order:
-                            if planet_key in chart_data["bav_sav"]["bav_charts"]:
-                                bav = chart_data["bav_sav"]["bav_charts"][planet_key]
-                                if isinstance(bav, list) and len(bav) >= house_num:
-                                    planet_points = bav[house_num - 1]
-                                    planet_display = planet_display_map.get(planet_key, planet_key.title())
-                                    bav_list.append(f"  - {planet_display}: {planet_points} points")
-                                    if planet_key != 'ASCENDANT':
-                                        seven_planets_sum += planet_points
-                        house_specific_info += "\n".join(bav_list)
-                        house_specific_info += f"\n\nCRITICAL: SAV of {house_points} = Sum of 7 planets ({seven_planets_sum}), NOT including Ascendant."
-                        house_specific_info += f" The Ascendant BAV is shown separately for reference but is NOT included in SAV calculation."
-            
-            user_prompt = f"""Query: {query}
+    
+    async def aretrieve_context_advanced(self, query: str, top_k: int = 5,
+                                         category: str = None, house_number: int = None,
+                                         planet: str = None) -> List[Dict]:
+        """
+        Async retrieve_context_advanced: the query is embedded with the async OpenAI client;
+        the local index is searched inline, the Supabase RPC runs in a worker thread.
+        """
+        try:
+            query_embedding = await self.aembed_text(query)
+        except Exception as embed_error:
+            logger.warning(f"⚠️ Embedding generation failed: {embed_error}")
+            logger.warning(f"⚠️ Continuing with empty context (RAG will be limited)")
+            return []
+        
+        if self.local_index is not None:
+            return self.retrieve_context_advanced(query, top_k, category, house_number, planet, query_embedding)
+        return await asyncio.to_thread(self.retrieve_context_advanced, query, top_k, category,
+                                       house_number, planet, query_embedding)
+    
+    async def aretrieve_context_by_house(self, query: str, house_numbers: List[int], top_k: int = 2,
+                                         category: str = None, planet: str = None,
+                                         match_threshold: float = 0.7) -> Dict[int, List[Dict]]:
+        """Async retrieve_context_by_house (see aretrieve_context_advanced)"""
+        if not house_numbers:
+            return {}
+        try:
+            query_embedding = await self.aembed_text(query)
+        except Exception as embed_error:
+            logger.warning(f"⚠️ Embedding generation failed: {embed_error}")
+            logger.warning(f"⚠️ Continuing with empty context (RAG will be limited)")
+            return {house_number: [] for house_number in house_numbers}
+        
+        if self.local_index is not None:
+            return self.retrieve_context_by_house(query, house_numbers, top_k, category, planet,
+                                                  match_threshold, query_embedding)
+        return await asyncio.to_thread(self.retrieve_context_by_house, query, house_numbers, top_k,
+                                       category, planet, match_threshold, query_embedding)
+    
+    def _search_local_index(self, query: str, top_k: int, category: str = None,
+                            house_number: int = None, planet: str = None,
+                            match_threshold: float = 0.0, query_embedding: List[float] = None) -> List[Dict]:
+        """Exact cosine search over the in-process index; 'score' mirrors 'similarity'"""
+        results = self.local_index.search(
+            query_embedding or self.embed_text(query),
+            top_k=top_k,
+            category=category,
+            house_number=house_number,
+            planet=planet,
+            match_threshold=match_threshold
+        )
+        for result in results:
+            result["score"] = result["similarity"]
+        return results
+    
+    def _build_interpretation_prompts(self, query: str, context_chunks: List[Dict],
+                                      chart_data: Dict = None) -> List[Dict]:
+        """Chat messages (system + user prompt) for an interpretation of query"""
+        # Handle None or empty context_chunks
+        if not context_chunks:
+            context_chunks = []
+        
+        # Build context string
+        context_text = "\n\n".join([
+            f"[Source: {chunk.get('category', 'general')}] {chunk.get('content', '')}"
+            for chunk in context_chunks if chunk and isinstance(chunk, dict)
+        ])
+        
+        # Build prompt (condensed for faster processing)
+        system_prompt = """Expert Vedic astrologer. Use ACTUAL chart data provided. 
+        Reference specific SAV points, BAV contributions, Dasha periods, and transit data. 
+        DO NOT give generic interpretations."""
+        
+        # Format chart data with specific details
+        chart_data_text = self._format_chart_data(chart_data) if chart_data else "No chart data provided"
+        
+        # Extract specific house information if query mentions a house
+        house_specific_info = ""
+        house_num = None
+        
+        # Extract Dasha-specific information if query mentions Dasha
+        dasha_specific_info = ""
+        query_lower = query.lower()
+        
+        # Check if query is about Dasha
+        dasha_keywords = ["dasha", "dasa", "period", "bhukti", "current", "planetary period", "maha dasa"]
+        is_dasha_query = any(keyword in query_lower for keyword in dasha_keywords)
+        
+        if is_dasha_query and chart_data and chart_data.get("dasha"):
+            dasha = chart_data["dasha"]
+            if dasha and isinstance(dasha, dict):
+                dasha_specific_info = f"\n\nCURRENT DASHA DATA (YOU MUST USE THIS - DO NOT SAY IT'S NOT AVAILABLE):\n"
+                dasha_specific_info += f"- Current Dasha: {dasha.get('current_dasa', 'N/A')}\n"
+                dasha_specific_info += f"- Current Bhukti: {dasha.get('current_bhukti', 'N/A')}\n"
+                if dasha.get('start_date'):
+                    dasha_specific_info += f"- Dasha Start Date: {dasha.get('start_date', 'N/A')}\n"
+                if dasha.get('end_date'):
+                    dasha_specific_info += f"- Dasha End Date: {dasha.get('end_date', 'N/A')}\n"
+                if dasha.get('age'):
+                    dasha_specific_info += f"- Age: {dasha.get('age', 'N/A')} years\n"
+                if dasha.get('remaining_years'):
+                    dasha_specific_info += f"- Remaining Years in Current Dasha: {dasha.get('remaining_years', 'N/A')} years\n"
+                dasha_specific_info += f"\nCRITICAL: The Dasha data above is REAL and CALCULATED. You MUST state it explicitly in your response."
+                dasha_specific_info += f" DO NOT say 'Dasha is not mentioned' or 'I need your birth details' - the data is provided above."
+        
+        # Detect house number from query
+        house_keywords = {
+            "1st": 1, "first": 1, "lagna": 1, "ascendant": 1,
+            "2nd": 2, "second": 2, "wealth": 2,
+            "3rd": 3, "third": 3, "siblings": 3,
+            "4th": 4, "fourth": 4, "home": 4, "mother": 4,
+            "5th": 5, "fifth": 5, "children": 5, "education": 5,
+            "6th": 6, "sixth": 6, "enemies": 6, "health": 6,
+            "7th": 7, "seventh": 7, "marriage": 7, "spouse": 7,
+            "8th": 8, "eighth": 8, "longevity": 8,
+            "9th": 9, "ninth": 9, "fortune": 9, "father": 9,
+            "10th": 10, "tenth": 10, "career": 10, "profession": 10,
+            "11th": 11, "eleventh": 11, "gains": 11, "income": 11,
+            "12th": 12, "twelfth": 12, "losses": 12, "expenses": 12
+        }
+        
+        for keyword, num in house_keywords.items():
+            if keyword in query_lower:
+                house_num = num
+                break
+        
+        if house_num and chart_data and chart_data.get("bav_sav") and chart_data["bav_sav"].get("sav_chart"):
+            sav_chart = chart_data["bav_sav"]["sav_chart"]
+            if len(sav_chart) >= house_num:
+                house_points = sav_chart[house_num - 1]  # 0-indexed
+                house_specific_info = f"\n\nSPECIFIC HOUSE {house_num} DATA:\n"
+                house_specific_info += f"- SAV Points: {house_points} (This is the CORRECT total for House {house_num})\n"
+                house_specific_info += f"- Strength: Strong if >=30, Good if >=28, Weak if <22\n\n"
+                house_specific_info += f"Individual BAV Contributions to House {house_num}:\n"
+                house_specific_info += f"IMPORTANT: SAV is the sum of 7 planets ONLY (excluding Ascendant).\n"
+                house_specific_info += f"Individual BAV values show each planet's contribution:\n"
+                
+                if chart_data["bav_sav"].get("bav_charts"):
+                    bav_list = []
+                    # API returns planet names in UPPERCASE, convert to title case for display
+                    planet_display_map = {
+                        'SUN': 'Sun', 'MOON': 'Moon', 'MARS': 'Mars', 
+                        'MERCURY': 'Mercury', 'JUPITER': 'Jupiter', 
+                        'VENUS': 'Venus', 'SATURN': 'Saturn', 'ASCENDANT': 'Ascendant'
+                    }
+                    # Order planets for consistent display (7 planets first, then Ascendant)
+                    planet_order = ['SUN', 'MOON', 'MARS', 'MERCURY', 'JUPITER', 'VENUS', 'SATURN', 'ASCENDANT']
+                    seven_planets_sum = 0
+                    for planet_key in planet_order:
+                        if planet_key in chart_data["bav_sav"]["bav_charts"]:
+                            bav = chart_data["bav_sav"]["bav_charts"][planet_key]
+                            if isinstance(bav, list) and len(bav) >= house_num:
+                                planet_points = bav[house_num - 1]
+                                planet_display = planet_display_map.get(planet_key, planet_key.title())
+                                bav_list.append(f"  - {planet_display}: {planet_points} points")
+                                if planet_key != 'ASCENDANT':
+                                    seven_planets_sum += planet_points
+                    house_specific_info += "\n".join(bav_list)
+                    house_specific_info += f"\n\nCRITICAL: SAV of {house_points} = Sum of 7 planets ({seven_planets_sum}), NOT including Ascendant."
+                    house_specific_info += f" The Ascendant BAV is shown separately for reference but is NOT included in SAV calculation."
+        
+        user_prompt = f"""Query: {query}
 
 Context from Vedic Astrology Knowledge Base:
 {context_text}
@@ -399,14 +700,32 @@ RULES:
 6. SAV strength: >=30 Strong, >=28 Good, <22 Weak
 7. DO NOT add all 8 BAV points - only 7 planets make SAV
 8. DO NOT ask for birth details if chart data is provided"""
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def generate_interpretation(self, query: str, context_chunks: List[Dict], 
+                                chart_data: Dict = None) -> str:
+        """
+        Generate interpretation using OpenAI with RAG context.
+        
+        Args:
+            query: User query
+            context_chunks: Retrieved context from vector store
+            chart_data: Optional chart data (BAV/SAV, Dasha, Gochara)
+        
+        Returns:
+            Generated interpretation text
+        """
+        try:
+            messages = self._build_interpretation_prompts(query, context_chunks, chart_data)
             
             # Call OpenAI with shorter response for dashboard
             response = self.openai.chat.completions.create(
                 model="gpt-4o-mini",  # Using gpt-4o-mini for cost efficiency
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=messages,
                 temperature=0.7,
                 max_tokens=800,  # Reduced from 1500 for faster generation
                 timeout=30  # Increased to 30s for production (network latency can be higher)
@@ -417,6 +736,85 @@ RULES:
         except Exception as e:
             raise Exception(f"Error generating interpretation: {str(e)}")
     
+    async def agenerate_interpretation(self, query: str, context_chunks: List[Dict],
+                                       chart_data: Dict = None) -> str:
+        """Async generate_interpretation (async OpenAI client)"""
+        try:
+            messages = self._build_interpretation_prompts(query, context_chunks, chart_data)
+            response = await self.async_openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                timeout=30
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            raise Exception(f"Error generating interpretation: {str(e)}")
+    
+    async def astream_interpretation(self, query: str, context_chunks: List[Dict],
+                                     chart_data: Dict = None) -> AsyncIterator[str]:
+        """
+        Same as agenerate_interpretation, but yields the text as it is generated
+        (OpenAI streaming API), so callers can forward tokens to the user immediately.
+        
+        Yields:
+            Text fragments; joined they form the full interpretation
+        """
+        try:
+            messages = self._build_interpretation_prompts(query, context_chunks, chart_data)
+            stream = await self.async_openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                timeout=30,
+                stream=True
+            )
+        except Exception as e:
+            raise Exception(f"Error generating interpretation: {str(e)}")
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def asummarize_conversation(self, previous_summary: Optional[str], messages: List[Dict]) -> str:
+        """
+        Fold chat messages into a running conversation summary.
+        
+        Args:
+            previous_summary: Summary of the turns before messages (None for the first one)
+            messages: Messages to add, oldest first (role/content dicts)
+        
+        Returns:
+            Updated summary text
+        """
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+        user_prompt = f"""Existing summary:
+{previous_summary or "(none)"}
+
+New conversation turns:
+{transcript}
+
+Update the summary to cover the new turns. Keep the houses, Dasha periods, transits and life areas
+discussed, the specific numbers quoted (SAV points, dates) and what the user wants to know.
+At most 150 words."""
+        
+        try:
+            response = await self.async_openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You summarize Vedic astrology consultations concisely."},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.3,
+                max_tokens=300,
+                timeout=30
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            raise Exception(f"Error summarizing conversation: {str(e)}")
+    
     def _format_chart_data(self, chart_data: Dict) -> str:
         """Format chart data for prompt with detailed house-specific information"""
         if not chart_data:
@@ -432,8 +830,7 @@ RULES:
             if sav_chart and len(sav_chart) == 12:
                 formatted.append("SAV (Sarvashtakavarga) Points by House:")
                 for i, points in enumerate(sav_chart, 1):
-                    strength = "Strong" if points >= 30 else "Good" if points >= 28 else "Weak" if points < 22 else "Moderate"
-                    formatted.append(f"  House {i}: {points} points ({strength})")
+                    formatted.append(f"  House {i}: {points} points ({sav_strength(points)})")
                 formatted.append(f"Total SAV: {sum(sav_chart)} points (should be 337)")
             
             # BAV Charts for each planet
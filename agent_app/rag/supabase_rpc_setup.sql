@@ -41,9 +41,83 @@ BEGIN
 END;
 $$;
 
+-- Top matches for several houses in one call (used for multi-house and dashboard queries)
+-- Returns up to match_count rows per house in filter_houses, best first within each house
+CREATE OR REPLACE FUNCTION match_vedic_knowledge_by_house(
+    query_embedding vector(1536),
+    filter_houses int[],
+    match_threshold float DEFAULT 0.7,
+    match_count int DEFAULT 2,
+    filter_category text DEFAULT NULL,
+    filter_planet text DEFAULT NULL
+)
+RETURNS TABLE (
+    id bigint,
+    category text,
+    content text,
+    metadata jsonb,
+    house_number int,
+    planet text,
+    similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        ranked.id,
+        ranked.category,
+        ranked.content,
+        ranked.metadata,
+        ranked.house_number,
+        ranked.planet,
+        ranked.similarity
+    FROM (
+        SELECT
+            vk.id,
+            vk.category::text AS category,
+            vk.content,
+            vk.metadata,
+            vk.house_number,
+            vk.planet::text AS planet,
+            1 - (vk.embedding <=> query_embedding) AS similarity,
+            ROW_NUMBER() OVER (
+                PARTITION BY vk.house_number
+                ORDER BY vk.embedding <=> query_embedding
+            ) AS house_rank
+        FROM vedic_knowledge vk
+        WHERE
+            vk.house_number = ANY(filter_houses)
+            AND (filter_category IS NULL OR vk.category = filter_category)
+            AND (filter_planet IS NULL OR vk.planet = filter_planet)
+            AND (1 - (vk.embedding <=> query_embedding)) >= match_threshold
+    ) ranked
+    WHERE ranked.house_rank <= match_count
+    ORDER BY ranked.house_number, ranked.similarity DESC;
+END;
+$$;
+
 -- Create index for better performance
 CREATE INDEX IF NOT EXISTS vedic_knowledge_embedding_idx 
 ON vedic_knowledge 
 USING ivfflat (embedding vector_cosine_ops)
 WITH (lists = 100);
 
+
+-- Content hash for idempotent bulk ingestion (store_knowledge_bulk upserts on it)
+-- 1. Hash rows stored before bulk ingestion (same SHA-256 of the content as the Python code)
+UPDATE vedic_knowledge
+SET metadata = COALESCE(metadata, '{}'::jsonb)
+    || jsonb_build_object('content_hash', encode(sha256(convert_to(content, 'UTF8')), 'hex'))
+WHERE metadata->>'content_hash' IS NULL;
+
+-- 2. Expose the hash as a column
+ALTER TABLE vedic_knowledge
+ADD COLUMN IF NOT EXISTS content_hash TEXT GENERATED ALWAYS AS (metadata->>'content_hash') STORED;
+
+-- 3. Remove duplicates left by earlier runs (keeps the oldest row), then enforce uniqueness
+DELETE FROM vedic_knowledge a
+USING vedic_knowledge b
+WHERE a.content_hash = b.content_hash AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS vedic_knowledge_content_hash_idx ON vedic_knowledge (content_hash);
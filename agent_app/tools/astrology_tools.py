@@ -1,18 +1,14 @@
 """
 LangChain Tools for Vedic Astrology API Integration
 Tools that the agent can use to call BAV/SAV, Dasha, and Gochara APIs
+(through the configured chart data provider - HTTP or in-process)
 """
 
-import os
-import requests
 from typing import Dict, List, Optional
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
-
-# Get API URLs from environment or use defaults
-BAV_SAV_API_URL = os.getenv("BAV_SAV_API_URL", "http://localhost:8000")
-DASHA_GOCHARA_API_URL = os.getenv("DASHA_GOCHARA_API_URL", "http://localhost:8001")
+from agent_app.tools.chart_data import get_chart_data_provider
 
 
 class BirthDataModel(BaseModel):
@@ -42,14 +38,8 @@ def calculate_bav_sav(birth_data: Dict) -> Dict:
         Dictionary containing BAV charts, SAV chart, totals, and planetary positions
     """
     try:
-        response = requests.post(
-            f"{BAV_SAV_API_URL}/api/v1/calculate/full",
-            json=birth_data,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_chart_data_provider().bav_sav(birth_data)
+    except Exception as e:
         return {"error": f"Failed to calculate BAV/SAV: {str(e)}"}
 
 
@@ -71,14 +61,8 @@ def get_current_dasha(birth_data: Dict) -> Dict:
         Dictionary containing current_dasa, current_bhukti, start_date, end_date, remaining_years, age
     """
     try:
-        response = requests.post(
-            f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/current",
-            json=birth_data,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_chart_data_provider().current_dasha(birth_data)
+    except Exception as e:
         return {"error": f"Failed to get Dasha data: {str(e)}"}
 
 
@@ -100,15 +84,8 @@ def get_dasha_periods(birth_data: Dict, total_years: int = 120) -> Dict:
         Dictionary containing birth_nakshatra, birth_pada, and dasa_periods list
     """
     try:
-        response = requests.post(
-            f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/calculate",
-            json=birth_data,
-            params={"total_years": total_years},
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_chart_data_provider().dasha_periods(birth_data, total_years)
+    except Exception as e:
         return {"error": f"Failed to get Dasha periods: {str(e)}"}
 
 
@@ -130,14 +107,8 @@ def get_current_gochara(birth_data: Dict) -> Dict:
         Dictionary containing transit_date, overall_health, transit_analysis, house_rankings
     """
     try:
-        response = requests.post(
-            f"{DASHA_GOCHARA_API_URL}/api/v1/gochara/current",
-            json=birth_data,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_chart_data_provider().gochara(birth_data)
+    except Exception as e:
         return {"error": f"Failed to get Gochara data: {str(e)}"}
 
 
@@ -159,15 +130,8 @@ def get_gochara_for_date(birth_data: Dict, transit_date: str) -> Dict:
         Dictionary containing transit analysis for the specified date
     """
     try:
-        response = requests.post(
-            f"{DASHA_GOCHARA_API_URL}/api/v1/gochara/calculate",
-            json=birth_data,
-            params={"transit_date": transit_date},
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_chart_data_provider().gochara(birth_data, transit_date)
+    except Exception as e:
         return {"error": f"Failed to get Gochara for date: {str(e)}"}
 
 
@@ -188,14 +152,8 @@ def get_dasha_bhukti_table(birth_data: Dict) -> Dict:
         Dictionary containing birth_nakshatra, birth_pada, and dasa_bhukti_table
     """
     try:
-        response = requests.post(
-            f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/bhukti",
-            json=birth_data,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_chart_data_provider().dasha_bhukti_table(birth_data)
+    except Exception as e:
         return {"error": f"Failed to get Dasha-Bhukti table: {str(e)}"}
 
 
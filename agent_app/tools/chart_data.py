@@ -0,0 +1,317 @@
+"""
+Chart Data Providers for the Agent
+BAV/SAV, Dasha and Gochara data for the agent graph and tools, from one of two backends:
+- "http" (default): the calculator APIs, called concurrently over a shared, keep-alive
+  httpx connection pool (split deployments)
+- "inprocess": the calculators imported directly and run in the calculation worker pool
+  (everything on one box, no HTTP hop)
+
+Select with CHART_DATA_BACKEND=http|inprocess.
+
+Every provider has a blocking per-service API (bav_sav, current_dasha, ...) for tools and
+scripts and an async one (afetch, abav_sav, ...) for the agent graph and the dashboard, which
+run on the server's event loop.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+# Get API URLs from environment or use defaults
+BAV_SAV_API_URL = os.getenv("BAV_SAV_API_URL", "http://localhost:8000")
+DASHA_GOCHARA_API_URL = os.getenv("DASHA_GOCHARA_API_URL", "http://localhost:8001")
+
+# Per-service timeouts in seconds (CHART_API_TIMEOUT is the default for all three)
+DEFAULT_TIMEOUT = float(os.getenv("CHART_API_TIMEOUT", 30))
+SERVICE_TIMEOUTS = {
+    "bav_sav": float(os.getenv("BAV_SAV_API_TIMEOUT", DEFAULT_TIMEOUT)),
+    "dasha": float(os.getenv("DASHA_API_TIMEOUT", DEFAULT_TIMEOUT)),
+    "gochara": float(os.getenv("GOCHARA_API_TIMEOUT", DEFAULT_TIMEOUT))
+}
+CONNECT_TIMEOUT = 5.0
+
+CHART_DATA_BACKEND = os.getenv("CHART_DATA_BACKEND", "http").lower()
+
+CHART_SERVICES = ("bav_sav", "dasha", "gochara")
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide httpx client; connections to the calculator APIs are kept alive and reused"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+                    timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT)
+                )
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    httpx async client for the running event loop, with the same pooling as get_http_client.
+    
+    Async connections belong to one event loop, so a new client is created if the loop changes
+    (only happens outside the server, e.g. successive asyncio.run calls).
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[0] is not loop:
+        _async_client = (loop, httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT)
+        ))
+    return _async_client[1]
+
+
+def bav_sav_payload(birth_data: Dict) -> Dict:
+    """Birth data in BAV/SAV API format (latitude/longitude instead of lat/lon)"""
+    return {
+        "dob": birth_data.get("dob"),
+        "tob": birth_data.get("tob"),
+        "latitude": birth_data.get("latitude") or birth_data.get("lat"),
+        "longitude": birth_data.get("longitude") or birth_data.get("lon"),
+        "tz_offset": birth_data.get("tz_offset"),
+        "name": birth_data.get("name"),
+        "place": birth_data.get("place")
+    }
+
+
+def dasha_gochara_payload(birth_data: Dict) -> Dict:
+    """Birth data in Dasha/Gochara API format (lat/lon)"""
+    return {
+        "dob": birth_data.get("dob"),
+        "tob": birth_data.get("tob"),
+        "lat": birth_data.get("lat") or birth_data.get("latitude"),
+        "lon": birth_data.get("lon") or birth_data.get("longitude"),
+        "tz_offset": birth_data.get("tz_offset"),
+        "name": birth_data.get("name"),
+        "place": birth_data.get("place")
+    }
+
+
+def _post(service: str, url: str, payload: Dict, params: Optional[Dict] = None) -> Dict:
+    """POST to a calculator API with the service's timeout and return the JSON body"""
+    timeout = SERVICE_TIMEOUTS[service]
+    api_start = time.time()
+    response = get_http_client().post(
+        url,
+        json=payload,
+        params=params,
+        timeout=httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout))
+    )
+    logger.info(f"⏱️ {service} API call took {time.time() - api_start:.2f}s")
+    response.raise_for_status()
+    result = response.json()
+    if not isinstance(result, dict) or "error" in result or "detail" in result:
+        raise ValueError(f"{service} API returned error: {result}")
+    return result
+
+
+async def _apost(service: str, url: str, payload: Dict, params: Optional[Dict] = None) -> Dict:
+    """Async _post: awaits the response instead of blocking a thread"""
+    timeout = SERVICE_TIMEOUTS[service]
+    api_start = time.time()
+    response = await get_async_http_client().post(
+        url,
+        json=payload,
+        params=params,
+        timeout=httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout))
+    )
+    logger.info(f"⏱️ {service} API call took {time.time() - api_start:.2f}s")
+    response.raise_for_status()
+    result = response.json()
+    if not isinstance(result, dict) or "error" in result or "detail" in result:
+        raise ValueError(f"{service} API returned error: {result}")
+    return result
+
+
+class ChartDataProvider(ABC):
+    """
+    Source of chart data for the agent. Subclasses implement the calculations;
+    afetch() runs several services concurrently with partial-result handling.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def bav_sav(self, birth_data: Dict) -> Dict:
+        """BAV/SAV charts (same fields as /api/v1/calculate/full)"""
+
+    @abstractmethod
+    def current_dasha(self, birth_data: Dict) -> Dict:
+        """Current Dasha/Bhukti (same fields as /api/v1/dasha/current)"""
+
+    @abstractmethod
+    def dasha_periods(self, birth_data: Dict, total_years: int = 120) -> Dict:
+        """Maha Dasa periods (same fields as /api/v1/dasha/calculate)"""
+
+    @abstractmethod
+    def dasha_bhukti_table(self, birth_data: Dict) -> Dict:
+        """Dasha-Bhukti table (same fields as /api/v1/dasha/bhukti)"""
+
+    @abstractmethod
+    def gochara(self, birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+        """Transits for a date, today when None (same fields as /api/v1/gochara/calculate)"""
+
+    async def abav_sav(self, birth_data: Dict) -> Dict:
+        return await asyncio.to_thread(self.bav_sav, birth_data)
+
+    async def acurrent_dasha(self, birth_data: Dict) -> Dict:
+        return await asyncio.to_thread(self.current_dasha, birth_data)
+
+    async def agochara(self, birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+        return await asyncio.to_thread(self.gochara, birth_data, transit_date)
+
+    async def afetch(self, birth_data: Dict, services: Iterable[str]) -> Dict:
+        """
+        Fetch the requested services ("bav_sav", "dasha", "gochara") concurrently.
+
+        Returns {"data": {service: result}, "errors": {service: message}}; a failed or
+        timed-out service only appears in "errors", so callers can use partial results.
+        The services are awaited together with asyncio.gather, so total latency is that
+        of the slowest service rather than the sum.
+        """
+        fetchers: Dict[str, Callable[[Dict], Awaitable[Dict]]] = {
+            "bav_sav": self.abav_sav,
+            "dasha": self.acurrent_dasha,
+            "gochara": self.agochara
+        }
+        services = [service for service in CHART_SERVICES if service in set(services)]
+        results = await asyncio.gather(
+            *(fetchers[service](birth_data) for service in services),
+            return_exceptions=True
+        )
+
+        data, errors = {}, {}
+        for service, result in zip(services, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Error fetching {service} ({self.name}): {result}")
+                errors[service] = str(result)
+            else:
+                data[service] = result
+        return {"data": data, "errors": errors}
+
+
+class HTTPChartDataProvider(ChartDataProvider):
+    """Calculator APIs over HTTP (BAV_SAV_API_URL, DASHA_GOCHARA_API_URL)"""
+
+    name = "http"
+
+    def bav_sav(self, birth_data: Dict) -> Dict:
+        return _post("bav_sav", f"{BAV_SAV_API_URL}/api/v1/calculate/full", bav_sav_payload(birth_data))
+
+    def current_dasha(self, birth_data: Dict) -> Dict:
+        return _post("dasha", f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/current", dasha_gochara_payload(birth_data))
+
+    def dasha_periods(self, birth_data: Dict, total_years: int = 120) -> Dict:
+        return _post("dasha", f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/calculate",
+                     dasha_gochara_payload(birth_data), params={"total_years": total_years})
+
+    def dasha_bhukti_table(self, birth_data: Dict) -> Dict:
+        return _post("dasha", f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/bhukti", dasha_gochara_payload(birth_data))
+
+    def gochara(self, birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+        if transit_date is None:
+            return _post("gochara", f"{DASHA_GOCHARA_API_URL}/api/v1/gochara/current",
+                         dasha_gochara_payload(birth_data))
+        return _post("gochara", f"{DASHA_GOCHARA_API_URL}/api/v1/gochara/calculate",
+                     dasha_gochara_payload(birth_data), params={"transit_date": transit_date})
+
+    async def abav_sav(self, birth_data: Dict) -> Dict:
+        return await _apost("bav_sav", f"{BAV_SAV_API_URL}/api/v1/calculate/full", bav_sav_payload(birth_data))
+
+    async def acurrent_dasha(self, birth_data: Dict) -> Dict:
+        return await _apost("dasha", f"{DASHA_GOCHARA_API_URL}/api/v1/dasha/current",
+                            dasha_gochara_payload(birth_data))
+
+    async def agochara(self, birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+        if transit_date is None:
+            return await _apost("gochara", f"{DASHA_GOCHARA_API_URL}/api/v1/gochara/current",
+                                dasha_gochara_payload(birth_data))
+        return await _apost("gochara", f"{DASHA_GOCHARA_API_URL}/api/v1/gochara/calculate",
+                            dasha_gochara_payload(birth_data), params={"transit_date": transit_date})
+
+
+class InProcessChartDataProvider(ChartDataProvider):
+    """
+    Calculators imported directly and run in the calculation worker pool
+    (CALC_EXECUTOR / CALC_WORKERS, as for the API servers).
+    """
+
+    name = "inprocess"
+
+    def __init__(self):
+        # Imported here so HTTP-only deployments don't need the calculator modules
+        from agent_app.tools import local_calculators
+        from calculation_executor import get_executor
+        self._calculators = local_calculators
+        self._executor = get_executor()
+
+    def _run(self, func: Callable, *args) -> Dict:
+        return self._executor.submit(func, *args).result()
+
+    def bav_sav(self, birth_data: Dict) -> Dict:
+        return self._run(self._calculators.compute_bav_sav, bav_sav_payload(birth_data))
+
+    def current_dasha(self, birth_data: Dict) -> Dict:
+        return self._run(self._calculators.compute_current_dasha, dasha_gochara_payload(birth_data))
+
+    def dasha_periods(self, birth_data: Dict, total_years: int = 120) -> Dict:
+        return self._run(self._calculators.compute_dasha_periods, dasha_gochara_payload(birth_data), total_years)
+
+    def dasha_bhukti_table(self, birth_data: Dict) -> Dict:
+        return self._run(self._calculators.compute_dasha_bhukti_table, dasha_gochara_payload(birth_data))
+
+    def gochara(self, birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+        return self._run(self._calculators.compute_gochara, dasha_gochara_payload(birth_data), transit_date)
+
+    async def abav_sav(self, birth_data: Dict) -> Dict:
+        return await self._executor.run(self._calculators.compute_bav_sav, bav_sav_payload(birth_data))
+
+    async def acurrent_dasha(self, birth_data: Dict) -> Dict:
+        return await self._executor.run(self._calculators.compute_current_dasha, dasha_gochara_payload(birth_data))
+
+    async def agochara(self, birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+        return await self._executor.run(self._calculators.compute_gochara,
+                                        dasha_gochara_payload(birth_data), transit_date)
+
+
+CHART_DATA_PROVIDERS = {
+    "http": HTTPChartDataProvider,
+    "inprocess": InProcessChartDataProvider
+}
+
+_provider: Optional[ChartDataProvider] = None
+
+
+def get_chart_data_provider() -> ChartDataProvider:
+    """Process-wide provider selected by CHART_DATA_BACKEND"""
+    global _provider
+    if _provider is None:
+        with _client_lock:
+            if _provider is None:
+                if CHART_DATA_BACKEND not in CHART_DATA_PROVIDERS:
+                    raise ValueError(f"Unknown CHART_DATA_BACKEND: {CHART_DATA_BACKEND} (use 'http' or 'inprocess')")
+                _provider = CHART_DATA_PROVIDERS[CHART_DATA_BACKEND]()
+                logger.info(f"Chart data backend: {_provider.name}")
+    return _provider
+
+
+async def afetch_chart_data(birth_data: Dict, services: Iterable[str]) -> Dict:
+    """Fetch services concurrently from the configured provider (see ChartDataProvider.afetch)"""
+    return await get_chart_data_provider().afetch(birth_data, services)
@@ -0,0 +1,96 @@
+"""
+In-Process Calculator Functions for the Agent
+Same results as the BAV/SAV and Dasha/Gochara APIs, computed by importing the calculators
+directly (no HTTP hop). Module-level functions with plain data arguments, so they can run
+in a thread or process pool.
+"""
+
+import datetime
+from typing import Dict, Optional
+
+from ashtakavarga_calculator_final import AshtakavargaCalculatorFinal
+from calculators.dasha_calculator import (
+    calculate_julian_day,
+    generate_dasa_table,
+    generate_dasa_bhukti_table,
+    get_current_dasa_bhukti,
+    get_moon_longitude
+)
+from calculators.transit_calculator import calculate_transits
+
+# Fields of the API response models, so in-process results have the same shape as the JSON
+CURRENT_DASHA_FIELDS = ("current_dasa", "current_bhukti", "start_date", "end_date", "remaining_years", "age")
+TRANSIT_ANALYSIS_FIELDS = ("planet", "natal_house", "transit_house", "transit_sign", "transit_degree",
+                           "nakshatra", "pada", "pada_lord", "activated_houses", "score", "rag", "interpretation")
+
+
+def compute_bav_sav(birth_data: Dict) -> Dict:
+    """Same fields as POST /api/v1/calculate/full"""
+    calculator = AshtakavargaCalculatorFinal(birth_data)
+    calculator.calculate_all_charts()
+    display_data = calculator.get_display_data()
+    return {
+        "birth_data": birth_data,
+        "planetary_positions": display_data['planetary_positions'],
+        "planet_house_positions": display_data['planet_house_positions'],
+        "bav_charts": display_data['ashtakavarga_charts'],
+        "bav_totals": display_data['totals'],
+        "sav_chart": display_data['sarvashtakavarga'],
+        "sav_total": display_data['sarva_total'],
+        "matrix_8x8": display_data['matrix_8x8'],
+        "calculation_timestamp": datetime.datetime.now().isoformat()
+    }
+
+
+def compute_current_dasha(birth_data: Dict, current_date: Optional[str] = None) -> Dict:
+    """Same fields as POST /api/v1/dasha/current"""
+    jd = calculate_julian_day(birth_data["dob"], birth_data["tob"], birth_data["tz_offset"])
+    if current_date:
+        current_dt = datetime.datetime.strptime(current_date, '%Y-%m-%d')
+    else:
+        current_dt = datetime.datetime.now()
+    current_info = get_current_dasa_bhukti(jd, get_moon_longitude(jd), current_dt)
+    return {field: current_info.get(field) for field in CURRENT_DASHA_FIELDS}
+
+
+def compute_dasha_periods(birth_data: Dict, total_years: int = 120) -> Dict:
+    """Same fields as POST /api/v1/dasha/calculate"""
+    jd = calculate_julian_day(birth_data["dob"], birth_data["tob"], birth_data["tz_offset"])
+    birth_nakshatra, birth_pada, dasa_table = generate_dasa_table(jd, get_moon_longitude(jd), total_years)
+    return {
+        "birth_nakshatra": birth_nakshatra,
+        "birth_pada": birth_pada,
+        "dasa_periods": dasa_table
+    }
+
+
+def compute_dasha_bhukti_table(birth_data: Dict) -> Dict:
+    """Same fields as POST /api/v1/dasha/bhukti"""
+    jd = calculate_julian_day(birth_data["dob"], birth_data["tob"], birth_data["tz_offset"])
+    birth_nakshatra, birth_pada, bhukti_table = generate_dasa_bhukti_table(jd, get_moon_longitude(jd))
+    return {
+        "birth_nakshatra": birth_nakshatra,
+        "birth_pada": birth_pada,
+        "dasa_bhukti_table": bhukti_table
+    }
+
+
+def compute_gochara(birth_data: Dict, transit_date: Optional[str] = None) -> Dict:
+    """Same fields as POST /api/v1/gochara/calculate (today when transit_date is None)"""
+    result = calculate_transits(
+        birth_data["dob"],
+        birth_data["tob"],
+        birth_data["lat"],
+        birth_data["lon"],
+        birth_data["tz_offset"],
+        transit_date
+    )
+    return {
+        "transit_date": result["transit_date"],
+        "overall_health": result["overall_health"],
+        "transit_analysis": [
+            {field: analysis[field] for field in TRANSIT_ANALYSIS_FIELDS}
+            for analysis in result["transit_analysis"]
+        ],
+        "house_rankings": result["house_rankings"]
+    }
@@ -11,11 +11,25 @@ from fastapi.responses import Response
 from pydantic import BaseModel, Field, validator
 from typing import Dict, List, Optional
 from datetime import datetime
+from contextlib import asynccontextmanager
 import os
-from ashtakavarga_calculator_final import AshtakavargaCalculatorFinal
+from ashtakavarga_calculator_final import AshtakavargaCalculatorFinal, calculate_batch
+from calculation_executor import CalculationOverloaded, get_executor
+from calculators.natal_cache import natal_cache
+
+# Upper bound on records per /api/v1/calculate/batch request
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 10000))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Shut down the calculation pool with the server"""
+    yield
+    get_executor().shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Ashtakavarga Calculator API",
     description="RESTful API for Bhinnashtakavarga (BAV) and Sarvashtakavarga (SAV) calculations based on Parasara rules",
     version="1.0.0",
@@ -138,6 +152,24 @@ class FullCalculationResponse(BaseModel):
     calculation_timestamp: str
 
 
+class BatchCalculationRequest(BaseModel):
+    """Request model for batch calculation"""
+    records: List[BirthData] = Field(..., description="Birth data records to calculate")
+
+
+class BatchCalculationResponse(BaseModel):
+    """Response model for batch calculation - columnar arrays, one entry per record"""
+    count: int
+    names: List[Optional[str]]
+    errors: List[Optional[str]] = Field(..., description="Error message per record (null on success)")
+    planetary_positions: Dict[str, List[Optional[int]]]
+    bav_charts: Dict[str, List[Optional[List[int]]]]
+    bav_totals: Dict[str, List[Optional[int]]]
+    sav_chart: List[Optional[List[int]]]
+    sav_total: List[Optional[int]]
+    calculation_timestamp: str
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -145,6 +177,27 @@ class HealthResponse(BaseModel):
     calculator_available: bool
 
 
+# Calculation helpers - run in the calculation executor, off the event loop
+
+def compute_display_data(birth_dict: Dict) -> Dict:
+    """Run the full calculator and return its display data"""
+    calculator = AshtakavargaCalculatorFinal(birth_dict)
+    calculator.calculate_all_charts()
+    return calculator.get_display_data()
+
+
+async def run_calculation(func, *args, **kwargs):
+    """Await func on the calculation executor, answering 503 when it is overloaded"""
+    try:
+        return await get_executor().run(func, *args, **kwargs)
+    except CalculationOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy, retry shortly: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+
+
 # API Endpoints
 # IMPORTANT: OPTIONS handlers must come BEFORE POST routes for proper CORS handling
 
@@ -198,9 +251,7 @@ async def calculate_full(birth_data: BirthData):
     """
     try:
         birth_dict = birth_data.dict()
-        calculator = AshtakavargaCalculatorFinal(birth_dict)
-        calculator.calculate_all_charts()
-        display_data = calculator.get_display_data()
+        display_data = await run_calculation(compute_display_data, birth_dict)
         
         # Classify house strengths for SAV
         house_strengths = {}
@@ -225,6 +276,8 @@ async def calculate_full(birth_data: BirthData):
             matrix_8x8=display_data['matrix_8x8'],
             calculation_timestamp=datetime.now().isoformat()
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
@@ -249,9 +302,7 @@ async def calculate_bav(planet: str, birth_data: BirthData):
     
     try:
         birth_dict = birth_data.dict()
-        calculator = AshtakavargaCalculatorFinal(birth_dict)
-        calculator.calculate_all_charts()
-        display_data = calculator.get_display_data()
+        display_data = await run_calculation(compute_display_data, birth_dict)
         
         if planet not in display_data['ashtakavarga_charts']:
             raise HTTPException(status_code=500, detail=f"BAV calculation failed for {planet}")
@@ -286,9 +337,7 @@ async def calculate_sav(birth_data: BirthData):
     """
     try:
         birth_dict = birth_data.dict()
-        calculator = AshtakavargaCalculatorFinal(birth_dict)
-        calculator.calculate_all_charts()
-        display_data = calculator.get_display_data()
+        display_data = await run_calculation(compute_display_data, birth_dict)
         
         sav_chart = display_data['sarvashtakavarga']
         sav_total = sum(sav_chart)
@@ -310,10 +359,51 @@ async def calculate_sav(birth_data: BirthData):
             total=sav_total,
             house_strengths=house_strengths
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
 
+@app.post("/api/v1/calculate/batch", response_model=BatchCalculationResponse)
+async def calculate_batch_endpoint(request: BatchCalculationRequest):
+    """
+    Calculate BAV and SAV for many charts in one request
+    
+    Returns columnar arrays: every field holds one entry per input record, in
+    request order. Records that fail are reported in `errors` with null results.
+    Only BAV/SAV are computed (no 8x8 matrix or planet details).
+    
+    **Limit:** MAX_BATCH_SIZE records per request (default 10000)
+    """
+    if len(request.records) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many records. Maximum batch size is {MAX_BATCH_SIZE}"
+        )
+    
+    try:
+        result = await run_calculation(calculate_batch, [record.dict() for record in request.records])
+        return BatchCalculationResponse(
+            **result,
+            calculation_timestamp=datetime.now().isoformat()
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    """
+    Natal chart cache size and hit/miss counters for monitoring.
+    
+    Counters are per process: with CALC_EXECUTOR=process each worker keeps its own cache.
+    """
+    return {"natal_cache": natal_cache.stats()}
+
+
 @app.get("/api/v1/planets")
 async def list_planets():
     """List all supported planets for BAV calculation"""
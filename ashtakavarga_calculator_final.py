@@ -8,6 +8,8 @@ import swisseph as swe
 import datetime
 from typing import Dict, List, Tuple, Optional
 
+from calculators.natal_cache import natal_cache, natal_cache_key
+
 # Tamil/South Indian Ashtakavarga Benefic Position Rules
 # Complete rules for all 8 planets including Ascendant
 TAMIL_ASHTAKAVARGA_RULES = {
@@ -93,6 +95,203 @@ TAMIL_ASHTAKAVARGA_RULES = {
     }
 }
 
+# Fixed planet order for the rule tensor (targets and contributors)
+ASHTAKAVARGA_PLANETS = ['SUN', 'MOON', 'MARS', 'MERCURY', 'JUPITER', 'VENUS', 'SATURN', 'ASCENDANT']
+# 7 planets for SAV calculation (excluding Ascendant)
+SAV_PLANETS = ASHTAKAVARGA_PLANETS[:7]
+
+
+def _compile_benefic_tensor(rules: Dict[str, Dict[str, List[int]]]) -> List[List[List[int]]]:
+    """Compile the rule dict into an 8x8x12 tensor [target][contributor][offset]
+    
+    Offset 0 is the contributor's own Rasi (benefic house 1), offset 11 is house 12.
+    A cell is 1 when the contributor gives a bindu at that offset, 0 otherwise.
+    """
+    tensor = []
+    for target in ASHTAKAVARGA_PLANETS:
+        target_rules = rules.get(target, {})
+        rows = []
+        for contributor in ASHTAKAVARGA_PLANETS:
+            row = [0] * 12
+            for benefic_house_num in target_rules.get(contributor, []):
+                row[benefic_house_num - 1] = 1
+            rows.append(row)
+        tensor.append(rows)
+    return tensor
+
+
+def _roll(row: List[int], shift: int) -> List[int]:
+    """Rotate a 12-element row right by shift places (index i moves to i + shift)"""
+    shift %= 12
+    return row[-shift:] + row[:-shift] if shift else list(row)
+
+
+# Compiled once at import - the rules never change at runtime
+BENEFIC_TENSOR = _compile_benefic_tensor(TAMIL_ASHTAKAVARGA_RULES)
+
+# Every tensor row pre-rolled for each of the 12 contributor Rasis:
+# ROLLED_BENEFIC_TENSOR[target][contributor][contributor_rasi - 1][rasi - 1]
+ROLLED_BENEFIC_TENSOR = [
+    [[_roll(row, shift) for shift in range(12)] for row in target_rows]
+    for target_rows in BENEFIC_TENSOR
+]
+
+
+def calculate_bav_rasi_charts(planet_positions: Dict[str, int]) -> List[List[int]]:
+    """Calculate BAV per RASI for all 8 targets from contributor Rasi positions (1-12)
+    
+    Each chart is the column sum of the contributors' benefic rows, each rolled to
+    start at the contributor's Rasi. Contributors missing from planet_positions are skipped.
+    Returns 8 charts in ASHTAKAVARGA_PLANETS order.
+    """
+    shifts = [
+        (index, planet_positions[contributor] - 1)
+        for index, contributor in enumerate(ASHTAKAVARGA_PLANETS)
+        if contributor in planet_positions
+    ]
+    if not shifts:
+        return [[0] * 12 for _ in ASHTAKAVARGA_PLANETS]
+    
+    return [
+        # At most 8 contributors add 0/1 each, so BAV never exceeds 8 per Rasi
+        [sum(column) for column in zip(*[target_rows[index][shift] for index, shift in shifts])]
+        for target_rows in ROLLED_BENEFIC_TENSOR
+    ]
+
+
+def calculate_bav_house_charts(planet_positions: Dict[str, int]) -> Dict[str, List[int]]:
+    """Calculate BAV per HOUSE for all 8 targets (house 1 = Ascendant's Rasi)"""
+    ascendant_shift = planet_positions.get('ASCENDANT', 1) - 1
+    return {
+        target: _roll(rasi_chart, -ascendant_shift)
+        for target, rasi_chart in zip(ASHTAKAVARGA_PLANETS, calculate_bav_rasi_charts(planet_positions))
+    }
+
+
+def calculate_sav_chart(bav_charts: Dict[str, List[int]]) -> List[int]:
+    """Sum the BAV charts of the 7 SAV planets, capped at 54 points per house"""
+    charts = [bav_charts[planet] for planet in SAV_PLANETS if planet in bav_charts]
+    if not charts:
+        return [0] * 12
+    return [min(sum(column), 54) for column in zip(*charts)]
+
+
+def calculate_contribution_matrix(planet_positions: Dict[str, int]) -> Dict[str, List[List[int]]]:
+    """Calculate the 8x8 contribution matrix (8 contributors x 12 houses per target)
+    
+    House columns follow calculate_relative_position, which maps the house Rasi
+    through the Ascendant once more, so the rows are rolled by twice the Ascendant offset.
+    """
+    column_shift = -2 * (planet_positions.get('ASCENDANT', 1) - 1)
+    matrix = {}
+    for target, target_rows in zip(ASHTAKAVARGA_PLANETS, ROLLED_BENEFIC_TENSOR):
+        matrix[target] = [
+            _roll(target_rows[index][planet_positions[contributor] - 1], column_shift)
+            if contributor in planet_positions else [0] * 12
+            for index, contributor in enumerate(ASHTAKAVARGA_PLANETS)
+        ]
+    return matrix
+
+
+# Swiss Ephemeris ids of the 7 planets that contribute to BAV
+SWE_PLANET_IDS = {
+    'SUN': swe.SUN,
+    'MOON': swe.MOON,
+    'MARS': swe.MARS,
+    'MERCURY': swe.MERCURY,
+    'JUPITER': swe.JUPITER,
+    'VENUS': swe.VENUS,
+    'SATURN': swe.SATURN
+}
+
+
+def birth_julian_day(birth_data: Dict) -> float:
+    """Julian Day (UT) of a birth record with dob (YYYY-MM-DD or DD-MM-YYYY), tob (HH:MM) and tz_offset"""
+    dob = birth_data['dob']
+    if '-' in dob:
+        parts = dob.split('-')
+        if len(parts[0]) == 4:  # YYYY-MM-DD format
+            year, month, day = map(int, parts)
+        else:  # DD-MM-YYYY format
+            day, month, year = map(int, parts)
+    else:
+        raise ValueError("Invalid date format")
+    
+    hour, minute = map(int, birth_data['tob'].split(':'))
+    
+    # Create datetime and convert to UTC
+    local_dt = datetime.datetime(year, month, day, hour, minute)
+    utc_dt = local_dt - datetime.timedelta(hours=birth_data['tz_offset'])
+    
+    return swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
+                      utc_dt.hour + utc_dt.minute/60.0)
+
+
+def calculate_rasi_positions(birth_data: Dict) -> Dict[str, int]:
+    """Rasi positions (1-12) of the 7 planets and Ascendant - only the BAV inputs
+    
+    Expects the sidereal mode to be set already (Lahiri). Errors are raised, not defaulted.
+    """
+    jd = birth_julian_day(birth_data)
+    positions = {}
+    for planet_name, planet_id in SWE_PLANET_IDS.items():
+        planet_pos, _ = swe.calc_ut(jd, planet_id, swe.FLG_SIDEREAL)
+        positions[planet_name] = int(planet_pos[0] // 30) % 12 + 1
+    
+    _, ascmc = swe.houses_ex(jd, birth_data['latitude'], birth_data['longitude'],
+                             b'P', flags=swe.FLG_SIDEREAL)
+    positions['ASCENDANT'] = int(ascmc[0] // 30) % 12 + 1
+    return positions
+
+
+def calculate_batch(birth_records: List[Dict]) -> Dict:
+    """Calculate BAV/SAV for many birth records in one call, returned as columnar arrays
+    
+    Skips the per-chart display data (details, nakshatras, matrix) and logging of
+    AshtakavargaCalculatorFinal. Every column has one entry per input record, in order;
+    a record that fails gets its message in 'errors' and None in the other columns.
+    """
+    swe.set_sid_mode(swe.SIDM_LAHIRI)
+    
+    result = {
+        'count': len(birth_records),
+        'names': [],
+        'errors': [],
+        'planetary_positions': {planet: [] for planet in ASHTAKAVARGA_PLANETS},
+        'bav_charts': {planet: [] for planet in ASHTAKAVARGA_PLANETS},
+        'bav_totals': {planet: [] for planet in ASHTAKAVARGA_PLANETS},
+        'sav_chart': [],
+        'sav_total': []
+    }
+    
+    for record in birth_records:
+        result['names'].append(record.get('name'))
+        try:
+            positions = calculate_rasi_positions(record)
+        except Exception as e:
+            result['errors'].append(str(e))
+            for planet in ASHTAKAVARGA_PLANETS:
+                result['planetary_positions'][planet].append(None)
+                result['bav_charts'][planet].append(None)
+                result['bav_totals'][planet].append(None)
+            result['sav_chart'].append(None)
+            result['sav_total'].append(None)
+            continue
+        
+        bav_charts = calculate_bav_house_charts(positions)
+        sav_chart = calculate_sav_chart(bav_charts)
+        
+        result['errors'].append(None)
+        for planet in ASHTAKAVARGA_PLANETS:
+            result['planetary_positions'][planet].append(positions[planet])
+            result['bav_charts'][planet].append(bav_charts[planet])
+            result['bav_totals'][planet].append(sum(bav_charts[planet]))
+        result['sav_chart'].append(sav_chart)
+        result['sav_total'].append(sum(sav_chart))
+    
+    return result
+
+
 class AshtakavargaCalculatorFinal:
     """Final Correct Ashtakavarga calculator - All 8 planets including Ascendant"""
     
@@ -100,6 +299,7 @@ class AshtakavargaCalculatorFinal:
         self.birth_data = birth_data
         self.planet_positions = {}
         self.planet_details = {}  # Store detailed planetary data (longitude, sign, house)
+        self.position_errors: List[str] = []  # Bodies that fell back to placeholder positions
         self.ashtakavarga_charts = {}  # BAV for all 8 planets
         self.sarvashtakavarga = [0] * 12  # SAV (sum of 7 planets only, not Ascendant)
         
@@ -163,49 +363,51 @@ class AshtakavargaCalculatorFinal:
         }
         
         # All 8 planets for BAV calculation
-        self.all_planets = ['SUN', 'MOON', 'MARS', 'MERCURY', 'JUPITER', 'VENUS', 'SATURN', 'ASCENDANT']
+        self.all_planets = list(ASHTAKAVARGA_PLANETS)
         # 7 planets for SAV calculation (excluding Ascendant)
-        self.sav_planets = ['SUN', 'MOON', 'MARS', 'MERCURY', 'JUPITER', 'VENUS', 'SATURN']
+        self.sav_planets = list(SAV_PLANETS)
     
     def calculate_positions(self) -> Dict:
-        """Calculate planetary positions with proper error handling"""
+        """Calculate planetary positions, served from the natal cache when the birth data repeats"""
         try:
-            # Parse birth data (format: YYYY-MM-DD or DD-MM-YYYY)
-            dob = self.birth_data['dob']
-            if '-' in dob:
-                parts = dob.split('-')
-                if len(parts[0]) == 4:  # YYYY-MM-DD format
-                    year, month, day = map(int, parts)
-                else:  # DD-MM-YYYY format
-                    day, month, year = map(int, parts)
-            else:
-                raise ValueError("Invalid date format")
-            
-            hour, minute = map(int, self.birth_data['tob'].split(':'))
-            
-            # Create datetime and convert to UTC
-            local_dt = datetime.datetime(year, month, day, hour, minute)
-            utc_dt = local_dt - datetime.timedelta(hours=self.birth_data['tz_offset'])
-            
-            # Calculate Julian Day
-            jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
-                           utc_dt.hour + utc_dt.minute/60.0)
+            cache_key = natal_cache_key(
+                'ashtakavarga',
+                self.birth_data['dob'],
+                self.birth_data['tob'],
+                self.birth_data['latitude'],
+                self.birth_data['longitude'],
+                self.birth_data['tz_offset']
+            )
+        except (KeyError, TypeError, ValueError):
+            return self._calculate_positions_uncached()
+        
+        cached = natal_cache.get(cache_key)
+        if cached is not None:
+            self.planet_positions, self.planet_details = cached
+            return self.planet_positions
+        
+        positions = self._calculate_positions_uncached()
+        # Failed calculations return {} and partial failures use placeholder positions;
+        # neither is cached
+        if positions and not self.position_errors:
+            natal_cache.put(cache_key, (self.planet_positions, self.planet_details))
+        return positions
+    
+    def _calculate_positions_uncached(self) -> Dict:
+        """Calculate planetary positions with proper error handling
+        
+        Bodies that can't be calculated get placeholder positions and are listed in position_errors.
+        """
+        self.position_errors = []
+        try:
+            # Parse birth data (format: YYYY-MM-DD or DD-MM-YYYY) and calculate Julian Day
+            jd = birth_julian_day(self.birth_data)
             
             # Set sidereal mode (Lahiri Ayanamsa)
             swe.set_sid_mode(swe.SIDM_LAHIRI)
             
             # Calculate planetary positions
-            planet_ids = {
-                'SUN': swe.SUN,
-                'MOON': swe.MOON,
-                'MARS': swe.MARS,
-                'MERCURY': swe.MERCURY,
-                'JUPITER': swe.JUPITER,
-                'VENUS': swe.VENUS,
-                'SATURN': swe.SATURN
-            }
-            
-            for planet_name, planet_id in planet_ids.items():
+            for planet_name, planet_id in SWE_PLANET_IDS.items():
                 try:
                     planet_pos, _ = swe.calc_ut(jd, planet_id, swe.FLG_SIDEREAL)
                     longitude = planet_pos[0]
@@ -247,6 +449,7 @@ class AshtakavargaCalculatorFinal:
                     
                 except Exception as e:
                     print(f"Error calculating {planet_name}: {e}")
+                    self.position_errors.append(planet_name)
                     self.planet_positions[planet_name] = 1
                     self.planet_details[planet_name] = {
                         'longitude': 0.0,
@@ -333,6 +536,7 @@ class AshtakavargaCalculatorFinal:
                 }
             except Exception as e:
                 print(f"Error calculating Rahu/Ketu: {e}")
+                self.position_errors.extend(['RAHU', 'KETU'])
                 self.planet_positions['RAHU'] = 1
                 self.planet_positions['KETU'] = 7
                 self.planet_details['RAHU'] = {
@@ -392,6 +596,7 @@ class AshtakavargaCalculatorFinal:
                 
             except Exception as e:
                 print(f"Error calculating Ascendant: {e}")
+                self.position_errors.append('ASCENDANT')
                 self.planet_positions['ASCENDANT'] = 1
                 self.planet_details['ASCENDANT'] = {
                     'longitude': 0.0,
@@ -481,49 +686,7 @@ class AshtakavargaCalculatorFinal:
         if target_planet not in TAMIL_ASHTAKAVARGA_RULES:
             return [0] * 12
         
-        rules = TAMIL_ASHTAKAVARGA_RULES[target_planet]
-        
-        # Step 1: Calculate BAV per RASI (12 Rasis)
-        rasi_chart = [0] * 12  # Rasi 1-12
-        
-        # For each of the 8 contributors (7 planets + ascendant)
-        for contributing_planet, benefic_houses in rules.items():
-            if contributing_planet not in self.planet_positions:
-                continue
-            
-            # Get the contributor's RASI position (1-12)
-            contributor_rasi = self.planet_positions[contributing_planet]
-            
-            # For each benefic house number in the list
-            for benefic_house_num in benefic_houses:
-                # Calculate target RASI = (contributor RASI + benefic house - 1)
-                target_rasi = contributor_rasi + benefic_house_num - 1
-                
-                # If target RASI > 12, subtract 12 (wraparound)
-                if target_rasi > 12:
-                    target_rasi -= 12
-                
-                # Add 1 bindu to that RASI (0-indexed array)
-                if 1 <= target_rasi <= 12:
-                    rasi_chart[target_rasi - 1] += 1
-        
-        # Validation: BAV Maximum is 8 points per planet per RASI
-        for i in range(12):
-            if rasi_chart[i] > 8:
-                rasi_chart[i] = 8
-        
-        # Step 2: Map RASI values to houses based on Ascendant
-        house_chart = [0] * 12
-        ascendant_rasi = self.planet_positions.get('ASCENDANT', 1)
-        
-        for house_num in range(1, 13):
-            # Calculate which RASI this house represents
-            # House 1 = Ascendant RASI
-            house_rasi = ((ascendant_rasi - 1 + house_num - 1) % 12) + 1
-            # Map the RASI value to the house
-            house_chart[house_num - 1] = rasi_chart[house_rasi - 1]
-        
-        return house_chart
+        return calculate_bav_house_charts(self.planet_positions)[target_planet]
     
     def calculate_all_charts(self) -> Dict:
         """Calculate all Ashtakavarga charts - BAV for all 8 planets including Ascendant"""
@@ -534,23 +697,14 @@ class AshtakavargaCalculatorFinal:
         self.calculate_house_positions()
         
         # Calculate Bhinnashtakavarga (BAV) for ALL 8 planets including Ascendant
+        # in one pass over the compiled rule tensor
+        self.ashtakavarga_charts.update(calculate_bav_house_charts(self.planet_positions))
         for planet in self.all_planets:
-            chart = self.calculate_binnashtakavarga(planet)
-            self.ashtakavarga_charts[planet] = chart
-            total = sum(chart)
-            print(f"{planet:10}: {total:2d} points (BAV)")
+            print(f"{planet:10}: {sum(self.ashtakavarga_charts[planet]):2d} points (BAV)")
         
         # Calculate Sarvashtakavarga (SAV) - sum of 7 planets only (excluding Ascendant)
-        self.sarvashtakavarga = [0] * 12
-        for planet in self.sav_planets:
-            if planet in self.ashtakavarga_charts:
-                for i in range(12):
-                    self.sarvashtakavarga[i] += self.ashtakavarga_charts[planet][i]
-        
         # Validation: SAV Maximum is 54 points per house
-        for i in range(12):
-            if self.sarvashtakavarga[i] > 54:
-                self.sarvashtakavarga[i] = 54
+        self.sarvashtakavarga = calculate_sav_chart(self.ashtakavarga_charts)
         
         sarva_total = sum(self.sarvashtakavarga)
         print(f"\nSarvashtakavarga (SAV) Total: {sarva_total} points")
@@ -565,40 +719,7 @@ class AshtakavargaCalculatorFinal:
         an 8x12 matrix (8 contributing planets x 12 houses) showing 1 if that
         planet contributes a point, 0 otherwise.
         """
-        matrix = {}
-        contributing_planets = ['SUN', 'MOON', 'MARS', 'MERCURY', 'JUPITER', 'VENUS', 'SATURN', 'ASCENDANT']
-        
-        for target_planet in self.all_planets:
-            if target_planet not in TAMIL_ASHTAKAVARGA_RULES:
-                continue
-            
-            planet_matrix = []
-            rules = TAMIL_ASHTAKAVARGA_RULES[target_planet]
-            
-            ascendant_rasi = self.planet_positions.get('ASCENDANT', 1)
-            
-            for contributing_planet in contributing_planets:
-                row = []
-                if contributing_planet in self.planet_positions:
-                    reference_rasi = self.planet_positions[contributing_planet]
-                    benefic_positions = rules.get(contributing_planet, [])
-                    
-                    for house_num in range(1, 13):
-                        # Calculate which Rasi this house represents
-                        house_rasi = ((ascendant_rasi - 1 + house_num - 1) % 12) + 1
-                        relative_pos = self.calculate_relative_position(house_rasi, reference_rasi)
-                        if relative_pos in benefic_positions:
-                            row.append(1)
-                        else:
-                            row.append(0)
-                else:
-                    row = [0] * 12
-                
-                planet_matrix.append(row)
-            
-            matrix[target_planet] = planet_matrix
-        
-        return matrix
+        return calculate_contribution_matrix(self.planet_positions)
     
     def get_native_chart(self) -> List[Dict]:
         """Get native chart data for display - maps planets to houses based on Ascendant"""
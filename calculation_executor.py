@@ -0,0 +1,118 @@
+"""
+Execution backend for CPU-bound chart calculations
+Runs Swiss Ephemeris work off the FastAPI event loop in a thread or process pool
+Shared by api_server.py and dasha_gochara_api.py
+
+Configuration (environment variables):
+- CALC_EXECUTOR: "thread" (default) or "process"
+- CALC_WORKERS: pool size (default: CPU count)
+- CALC_MAX_PENDING: max calculations queued or running before new ones are rejected (default 64)
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import swisseph as swe
+
+
+class CalculationOverloaded(Exception):
+    """Raised when the executor already has max_pending calculations in flight"""
+
+
+def _init_worker():
+    """Per-worker Swiss Ephemeris initialization (Lahiri Ayanamsa)"""
+    swe.set_sid_mode(swe.SIDM_LAHIRI)
+
+
+class CalculationExecutor:
+    """Bounded thread/process pool that async handlers await calculations on"""
+
+    def __init__(self, backend: str = "thread", max_workers: Optional[int] = None, max_pending: int = 64):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown executor backend: {backend} (use 'thread' or 'process')")
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.backend == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="calc",
+                                                    initializer=_init_worker)
+        return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) in the pool and await its result
+
+        For the process backend, func and its arguments must be picklable
+        (module-level functions with plain data arguments).
+        Raises CalculationOverloaded instead of queueing past max_pending.
+        """
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self.pending >= self.max_pending:
+            raise CalculationOverloaded(
+                f"{self.pending} calculations in progress (limit {self.max_pending})"
+            )
+        loop = asyncio.get_running_loop()
+        future = self._get_executor().submit(functools.partial(func, *args, **kwargs))
+        self.pending += 1
+        # Released when the pool job finishes, not when the awaiting request goes away:
+        # a cancelled await (client disconnect) leaves a started job running in the pool
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        """Done-callback of a pool job (runs in a worker thread): decrement pending on the event loop"""
+        try:
+            loop.call_soon_threadsafe(self._decrement_pending)
+        except RuntimeError:
+            # Event loop already closed (shutdown); nothing left to count
+            pass
+
+    def _decrement_pending(self):
+        self.pending -= 1
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Submit func(*args, **kwargs) to the pool from synchronous code
+
+        Same pickling rules as run(); not counted against max_pending.
+        """
+        return self._get_executor().submit(func, *args, **kwargs)
+
+    def stats(self) -> dict:
+        """Current backend configuration and load, for health checks"""
+        return {
+            "backend": self.backend,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_executor: Optional[CalculationExecutor] = None
+
+
+def get_executor() -> CalculationExecutor:
+    """Process-wide executor configured from environment variables"""
+    global _executor
+    if _executor is None:
+        workers = os.environ.get("CALC_WORKERS")
+        _executor = CalculationExecutor(
+            backend=os.environ.get("CALC_EXECUTOR", "thread").lower(),
+            max_workers=int(workers) if workers else None,
+            max_pending=int(os.environ.get("CALC_MAX_PENDING", 64))
+        )
+    return _executor
@@ -6,8 +6,11 @@ Removed OpenAI dependencies, made standalone for FastAPI integration
 
 import swisseph as swe
 import datetime
+from array import array
+from bisect import bisect_right
 from collections import OrderedDict
-from typing import Tuple, List, Dict
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple, List, Dict
 
 # --- CONSTANTS ---
 NAKSHATRAS = [
@@ -27,10 +30,28 @@ DASA_DURATIONS = OrderedDict([
     ("Mars", 7), ("Rahu", 18), ("Jupiter", 16), ("Saturn", 19), ("Mercury", 17)
 ])
 
+DASA_LORDS = list(DASA_DURATIONS.keys())
+
+# date.toordinal() + JDN_OFFSET = Julian Day Number of that civil date
+JDN_OFFSET = 1721425
+
 # Initialize Swiss Ephemeris (will be set properly in functions)
 swe.set_sid_mode(swe.SIDM_LAHIRI)
 
 
+def calculate_julian_day(dob: str, tob: str, tz_offset: float) -> float:
+    """Julian Day (UT) from local birth date (YYYY-MM-DD) and time (HH:MM)"""
+    local_dt = datetime.datetime.strptime(f"{dob} {tob}", '%Y-%m-%d %H:%M')
+    utc_dt = local_dt - datetime.timedelta(hours=tz_offset)
+    return swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, utc_dt.hour + utc_dt.minute/60.0)
+
+
+def get_moon_longitude(jd: float) -> float:
+    """Sidereal (Lahiri) Moon longitude for Dasha calculations"""
+    swe.set_sid_mode(swe.SIDM_LAHIRI)
+    return swe.calc_ut(jd, swe.MOON, swe.FLG_SIDEREAL)[0][0]
+
+
 def get_nakshatra(longitude: float) -> Tuple[str, int, int]:
     """
     Return nakshatra, pada, and index for a given longitude.
@@ -81,17 +102,40 @@ def generate_dasa_table(jd: float, moon_longitude: float, total_years: int = 120
         Tuple of (birth_nakshatra, birth_pada, dasa_table)
         dasa_table is a list of dicts with keys: planet, start_age, end_age, start_date, end_date, duration
     """
-    nakshatra, pada, current_dasa_lord, remaining_years = calculate_dasa_start(moon_longitude)
+    nakshatra, pada, _, _ = calculate_dasa_start(moon_longitude)
+
+    dasa_table = []
+    for planet, start_age, end_age, start_date, end_date, duration in iter_dasa_periods(jd, moon_longitude, total_years):
+        dasa_table.append({
+            "planet": planet,
+            "start_age": round(start_age, 2),
+            "end_age": round(end_age, 2),
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "duration": round(duration, 2)
+        })
+
+    return nakshatra, pada, dasa_table
+
+
+def iter_dasa_periods(jd: float, moon_longitude: float,
+                      total_years: int = 120) -> Iterator[Tuple[str, float, float, datetime.datetime, datetime.datetime, float]]:
+    """
+    Yield Maha Dasa periods from birth as unrounded numbers.
+    
+    Yields:
+        Tuples of (planet, start_age, end_age, start_date, end_date, duration)
+    """
+    _, _, current_dasa_lord, remaining_years = calculate_dasa_start(moon_longitude)
     start_year, start_month, start_day = swe.revjul(jd)[:3]
     start_date = datetime.datetime(start_year, start_month, start_day)
 
-    dasa_table = []
     current_year = 0
-    current_index = list(DASA_DURATIONS.keys()).index(current_dasa_lord)
+    current_index = DASA_LORDS.index(current_dasa_lord)
 
     while current_year < total_years:
         for i in range(current_index, current_index + len(DASA_DURATIONS)):
-            planet = list(DASA_DURATIONS.keys())[i % len(DASA_DURATIONS)]
+            planet = DASA_LORDS[i % len(DASA_DURATIONS)]
             duration = DASA_DURATIONS[planet]
             if i == current_index:
                 duration = remaining_years
@@ -101,20 +145,45 @@ def generate_dasa_table(jd: float, moon_longitude: float, total_years: int = 120
                 break
 
             end_date = start_date + datetime.timedelta(days=duration * 365.25)
-            dasa_table.append({
-                "planet": planet,
-                "start_age": round(current_year, 2),
-                "end_age": round(end_year, 2),
-                "start_date": start_date.strftime("%Y-%m-%d"),
-                "end_date": end_date.strftime("%Y-%m-%d"),
-                "duration": round(duration, 2)
-            })
+            yield planet, current_year, end_year, start_date, end_date, duration
 
             current_year = end_year
             start_date = end_date
         current_index = 0  # Reset after completing the cycle
 
-    return nakshatra, pada, dasa_table
+
+def iter_bhukti_periods(maha_dasa_planet: str, maha_dasa_duration: float,
+                        start_date: datetime.datetime) -> Iterator[Tuple[str, datetime.datetime, datetime.datetime, float]]:
+    """
+    Yield Bhukti (sub-periods) of one Maha Dasa.
+    
+    Yields:
+        Tuples of (bhukti_planet, start_date, end_date, duration)
+    """
+    current_bhukti_index = DASA_LORDS.index(maha_dasa_planet)
+    total_dasa_years = sum(DASA_DURATIONS.values())  # Should be 120
+
+    current_date = start_date
+    remaining_duration = maha_dasa_duration
+
+    for i in range(len(DASA_DURATIONS)):
+        bhukti_planet = DASA_LORDS[(current_bhukti_index + i) % len(DASA_DURATIONS)]
+        bhukti_duration = DASA_DURATIONS[bhukti_planet]
+
+        # Calculate proportional duration within maha dasa
+        proportional_duration = (bhukti_duration / total_dasa_years) * maha_dasa_duration
+
+        if remaining_duration <= 0:
+            break
+
+        if proportional_duration > remaining_duration:
+            proportional_duration = remaining_duration
+
+        end_date = current_date + datetime.timedelta(days=proportional_duration * 365.25)
+        yield bhukti_planet, current_date, end_date, proportional_duration
+
+        current_date = end_date
+        remaining_duration -= proportional_duration
 
 
 def generate_dasa_bhukti_table(jd: float, moon_longitude: float) -> Tuple[str, int, List[Dict]]:
@@ -136,46 +205,99 @@ def generate_dasa_bhukti_table(jd: float, moon_longitude: float) -> Tuple[str, i
     bhukti_table = []
 
     for main_period in main_dasa_table:
-        maha_dasa_planet = main_period['planet']
-        maha_dasa_duration = main_period['duration']
-        
-        # Calculate bhukti periods within this maha dasa
-        bhukti_durations = DASA_DURATIONS.copy()
-        current_bhukti_index = list(bhukti_durations.keys()).index(maha_dasa_planet)
-        
-        current_date = datetime.datetime.strptime(main_period['start_date'], "%Y-%m-%d")
-        remaining_duration = maha_dasa_duration
-        
-        for i in range(len(bhukti_durations)):
-            bhukti_planet = list(bhukti_durations.keys())[(current_bhukti_index + i) % len(bhukti_durations)]
-            bhukti_duration = bhukti_durations[bhukti_planet]
-            
-            # Calculate proportional duration within maha dasa
-            total_dasa_years = sum(bhukti_durations.values())  # Should be 120
-            proportional_duration = (bhukti_duration / total_dasa_years) * maha_dasa_duration
-            
-            if remaining_duration <= 0:
-                break
-                
-            if proportional_duration > remaining_duration:
-                proportional_duration = remaining_duration
-            
-            end_date = current_date + datetime.timedelta(days=proportional_duration * 365.25)
-            
+        # Bhukti periods start from the Maha Dasa's (day-precision) start date
+        dasa_start = datetime.datetime.strptime(main_period['start_date'], "%Y-%m-%d")
+        for bhukti_planet, start_date, end_date, duration in iter_bhukti_periods(
+                main_period['planet'], main_period['duration'], dasa_start):
             bhukti_table.append({
-                "maha_dasa": maha_dasa_planet,
+                "maha_dasa": main_period['planet'],
                 "bhukti": bhukti_planet,
-                "start_date": current_date.strftime("%Y-%m-%d"),
+                "start_date": start_date.strftime("%Y-%m-%d"),
                 "end_date": end_date.strftime("%Y-%m-%d"),
-                "duration": round(proportional_duration, 2)
+                "duration": round(duration, 2)
             })
-            
-            current_date = end_date
-            remaining_duration -= proportional_duration
     
     return birth_nakshatra, birth_pada, bhukti_table
 
 
+class DasaTimeline:
+    """
+    Compact Dasa/Bhukti timeline index for one birth chart.
+    
+    Stores the 120-year Maha Dasa and Bhukti boundaries as arrays (ages and Julian Day
+    Numbers of the period start/end dates) so the period at any date is a binary search.
+    Day-precision boundaries match generate_dasa_table / generate_dasa_bhukti_table.
+    """
+    
+    def __init__(self, jd: float, moon_longitude: float):
+        self.birth_date = datetime.datetime(*swe.revjul(jd)[:3])
+        
+        self.dasa_planets: List[str] = []
+        self.dasa_start_ages = array('d')
+        self.dasa_end_ages = array('d')
+        self.dasa_start_days = array('l')
+        self.dasa_end_days = array('l')
+        
+        # Bhukti periods of Maha Dasa i are bhukti_offsets[i]:bhukti_offsets[i + 1]
+        self.bhukti_offsets = array('l', [0])
+        self.bhukti_planets: List[str] = []
+        self.bhukti_start_days = array('l')
+        self.bhukti_end_days = array('l')
+        
+        for planet, start_age, end_age, start_date, end_date, duration in iter_dasa_periods(jd, moon_longitude):
+            self.dasa_planets.append(planet)
+            self.dasa_start_ages.append(round(start_age, 2))
+            self.dasa_end_ages.append(round(end_age, 2))
+            self.dasa_start_days.append(start_date.toordinal() + JDN_OFFSET)
+            self.dasa_end_days.append(end_date.toordinal() + JDN_OFFSET)
+            
+            dasa_start = datetime.datetime(start_date.year, start_date.month, start_date.day)
+            for bhukti_planet, bhukti_start, bhukti_end, _ in iter_bhukti_periods(
+                    planet, round(duration, 2), dasa_start):
+                self.bhukti_planets.append(bhukti_planet)
+                self.bhukti_start_days.append(bhukti_start.toordinal() + JDN_OFFSET)
+                self.bhukti_end_days.append(bhukti_end.toordinal() + JDN_OFFSET)
+            self.bhukti_offsets.append(len(self.bhukti_planets))
+    
+    def find_dasa(self, age: float) -> int:
+        """Index of the Maha Dasa running at age (years); the last one if age is outside the table"""
+        index = bisect_right(self.dasa_end_ages, age)
+        if index < len(self.dasa_planets) and self.dasa_start_ages[index] <= age:
+            return index
+        return len(self.dasa_planets) - 1
+    
+    def find_bhukti(self, dasa_index: int, day: int) -> Optional[int]:
+        """
+        Index of the Bhukti running on Julian Day Number day, among the Bhuktis of
+        every Maha Dasa of the same planet (a lord can recur within 120 years).
+        Falls back to the last Bhukti of that planet; None if it has none.
+        """
+        planet = self.dasa_planets[dasa_index]
+        fallback = None
+        for i, dasa_planet in enumerate(self.dasa_planets):
+            if dasa_planet != planet:
+                continue
+            lo, hi = self.bhukti_offsets[i], self.bhukti_offsets[i + 1]
+            if lo == hi:
+                continue
+            index = bisect_right(self.bhukti_start_days, day, lo, hi) - 1
+            if index >= lo and day < self.bhukti_end_days[index]:
+                return index
+            fallback = hi - 1
+        return fallback
+
+
+def format_day_number(day: int) -> str:
+    """YYYY-MM-DD string for a Julian Day Number"""
+    return datetime.date.fromordinal(day - JDN_OFFSET).strftime("%Y-%m-%d")
+
+
+@lru_cache(maxsize=1024)
+def get_dasa_timeline(jd: float, moon_longitude: float) -> DasaTimeline:
+    """Timeline index for a birth chart, built once per (birth Julian Day, Moon longitude)"""
+    return DasaTimeline(jd, moon_longitude)
+
+
 def get_current_dasa_bhukti(jd: float, moon_longitude: float, current_date: datetime.datetime = None) -> Dict:
     """
     Get current Dasha and Bhukti for a given date.
@@ -191,56 +313,137 @@ def get_current_dasa_bhukti(jd: float, moon_longitude: float, current_date: date
     if current_date is None:
         current_date = datetime.datetime.now()
     
-    # Get birth date
-    birth_date = datetime.datetime(*swe.revjul(jd)[:3])
+    timeline = get_dasa_timeline(jd, moon_longitude)
     
     # Calculate age
-    age = (current_date - birth_date).days / 365.25
-    
-    # Get all dasa periods
-    _, _, dasa_table = generate_dasa_table(jd, moon_longitude, total_years=120)
+    age = (current_date - timeline.birth_date).days / 365.25
     
-    # Find current dasa
-    current_dasa = None
-    for period in dasa_table:
-        if period['start_age'] <= age < period['end_age']:
-            current_dasa = period
-            break
-    
-    if not current_dasa:
-        # If age exceeds all periods, return the last one
-        current_dasa = dasa_table[-1]
-    
-    # Get bhukti table for current dasa period
-    _, _, bhukti_table = generate_dasa_bhukti_table(jd, moon_longitude)
-    
-    # Find current bhukti
-    current_bhukti = None
-    for bhukti_period in bhukti_table:
-        if bhukti_period['maha_dasa'] == current_dasa['planet']:
-            bhukti_start = datetime.datetime.strptime(bhukti_period['start_date'], "%Y-%m-%d")
-            bhukti_end = datetime.datetime.strptime(bhukti_period['end_date'], "%Y-%m-%d")
-            if bhukti_start <= current_date < bhukti_end:
-                current_bhukti = bhukti_period
-                break
-    
-    if not current_bhukti:
-        # Find the last bhukti for this dasa
-        for bhukti_period in reversed(bhukti_table):
-            if bhukti_period['maha_dasa'] == current_dasa['planet']:
-                current_bhukti = bhukti_period
-                break
+    # Find current dasa and bhukti
+    dasa_index = timeline.find_dasa(age)
+    bhukti_index = timeline.find_bhukti(dasa_index, current_date.toordinal() + JDN_OFFSET)
     
     # Calculate remaining years in current dasa
-    dasa_end_date = datetime.datetime.strptime(current_dasa['end_date'], "%Y-%m-%d")
+    dasa_end_day = timeline.dasa_end_days[dasa_index]
+    dasa_end_date = datetime.datetime.fromordinal(dasa_end_day - JDN_OFFSET)
     remaining_years = (dasa_end_date - current_date).days / 365.25
     
     return {
-        "current_dasa": current_dasa['planet'],
-        "current_bhukti": current_bhukti['bhukti'] if current_bhukti else None,
-        "start_date": current_dasa['start_date'],
-        "end_date": current_dasa['end_date'],
+        "current_dasa": timeline.dasa_planets[dasa_index],
+        "current_bhukti": timeline.bhukti_planets[bhukti_index] if bhukti_index is not None else None,
+        "start_date": format_day_number(timeline.dasa_start_days[dasa_index]),
+        "end_date": format_day_number(dasa_end_day),
         "remaining_years": round(remaining_years, 2),
         "age": round(age, 2)
     }
 
+
+# Names of the Vimshottari levels (level 2 Bhukti is also called Antara)
+DASA_LEVEL_NAMES = {1: "maha_dasa", 2: "bhukti", 3: "pratyantara", 4: "sookshma"}
+
+
+class VimshottariPeriod:
+    """
+    One node of the lazy Vimshottari period tree, with numeric Julian Day (UT) boundaries.
+    
+    Sub-periods are only generated when sub_periods() is iterated. As in
+    generate_dasa_bhukti_table, each period is divided among the 9 lords in Vimshottari
+    order starting from its own lord, in proportion to their Dasa years.
+    """
+    
+    def __init__(self, lords: Tuple[str, ...], start_jd: float, end_jd: float):
+        self.lords = lords
+        self.start_jd = start_jd
+        self.end_jd = end_jd
+    
+    @property
+    def level(self) -> int:
+        return len(self.lords)
+    
+    @property
+    def planet(self) -> str:
+        return self.lords[-1]
+    
+    @property
+    def duration_days(self) -> float:
+        return self.end_jd - self.start_jd
+    
+    def overlaps(self, start_jd: Optional[float], end_jd: Optional[float]) -> bool:
+        """True if the period overlaps [start_jd, end_jd) (None = unbounded)"""
+        return ((start_jd is None or self.end_jd > start_jd) and
+                (end_jd is None or self.start_jd < end_jd))
+    
+    def sub_periods(self) -> Iterator['VimshottariPeriod']:
+        total_dasa_years = sum(DASA_DURATIONS.values())
+        first_index = DASA_LORDS.index(self.planet)
+        start_jd = self.start_jd
+        for i in range(len(DASA_LORDS)):
+            lord = DASA_LORDS[(first_index + i) % len(DASA_LORDS)]
+            if i == len(DASA_LORDS) - 1:
+                end_jd = self.end_jd  # Avoid floating point drift at the parent boundary
+            else:
+                end_jd = start_jd + self.duration_days * DASA_DURATIONS[lord] / total_dasa_years
+            yield VimshottariPeriod(self.lords + (lord,), start_jd, end_jd)
+            start_jd = end_jd
+    
+    def __repr__(self):
+        return f"VimshottariPeriod({'/'.join(self.lords)}, {self.start_jd:.4f}, {self.end_jd:.4f})"
+
+
+def dasa_start_jd(jd: float, tz_offset: float = 0.0) -> float:
+    """
+    Julian Day (UT) the Dasa sequence starts from: midnight (local, at tz_offset) of the date
+    iter_dasa_periods starts from, so period dates agree with generate_dasa_table
+    """
+    year, month, day = swe.revjul(jd)[:3]
+    return swe.julday(year, month, day, 0.0) - tz_offset / 24.0
+
+
+def iter_maha_dasas(jd: float, moon_longitude: float, total_years: int = 120,
+                    tz_offset: float = 0.0) -> Iterator[VimshottariPeriod]:
+    """Yield Maha Dasa periods from the birth date (balance of the birth Dasa first)"""
+    _, _, current_dasa_lord, remaining_years = calculate_dasa_start(moon_longitude)
+    first_index = DASA_LORDS.index(current_dasa_lord)
+    
+    current_year = 0
+    start_jd = dasa_start_jd(jd, tz_offset)
+    i = first_index
+    while current_year < total_years:
+        lord = DASA_LORDS[i % len(DASA_LORDS)]
+        duration = remaining_years if i == first_index else DASA_DURATIONS[lord]
+        end_jd = start_jd + duration * 365.25
+        yield VimshottariPeriod((lord,), start_jd, end_jd)
+        current_year += duration
+        start_jd = end_jd
+        i += 1
+
+
+def iter_vimshottari_periods(jd: float, moon_longitude: float, level: int = 2,
+                             start_jd: float = None, end_jd: float = None,
+                             tz_offset: float = 0.0) -> Iterator[VimshottariPeriod]:
+    """
+    Yield all periods at a level (1 Maha Dasa .. 4 Sookshma) overlapping [start_jd, end_jd).
+    
+    tz_offset is the offset the period boundaries are displayed in; the sequence starts at
+    local midnight of the birth date, as in generate_dasa_table.
+    
+    Only periods overlapping the window are expanded, so e.g. the Sookshma periods of one
+    year cost a few hundred nodes instead of the full 9^4 tree.
+    """
+    if level not in DASA_LEVEL_NAMES:
+        raise ValueError(f"level must be between 1 and {len(DASA_LEVEL_NAMES)}")
+    
+    def expand(period: VimshottariPeriod) -> Iterator[VimshottariPeriod]:
+        if period.level == level:
+            yield period
+            return
+        for sub_period in period.sub_periods():
+            if end_jd is not None and sub_period.start_jd >= end_jd:
+                break
+            if sub_period.overlaps(start_jd, end_jd):
+                yield from expand(sub_period)
+    
+    for maha_dasa in iter_maha_dasas(jd, moon_longitude, tz_offset=tz_offset):
+        if end_jd is not None and maha_dasa.start_jd >= end_jd:
+            break
+        if maha_dasa.overlaps(start_jd, end_jd):
+            yield from expand(maha_dasa)
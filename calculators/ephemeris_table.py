@@ -0,0 +1,127 @@
+"""
+Precomputed Daily Ephemeris Table
+Sidereal (Lahiri) longitudes of Sun through Saturn and the true node at noon UTC for every day
+in a year range, stored as a fixed-size binary table and memory-mapped for transit lookups.
+
+Build once per deployment (default 1900-2100, ~5 MB):
+    python -m calculators.ephemeris_table [start_year end_year [path]]
+
+The table path defaults to calculators/ephemeris_daily.bin and can be set with
+EPHEMERIS_TABLE_PATH. When no table exists, transit lookups fall back to Swiss Ephemeris.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Optional, Tuple
+
+import swisseph as swe
+
+# Bodies stored per day, in record order (names match swe.get_planet_name)
+TABLE_PLANETS = [
+    ('Sun', swe.SUN),
+    ('Moon', swe.MOON),
+    ('Mercury', swe.MERCURY),
+    ('Venus', swe.VENUS),
+    ('Mars', swe.MARS),
+    ('Jupiter', swe.JUPITER),
+    ('Saturn', swe.SATURN),
+    ('Rahu', swe.TRUE_NODE)
+]
+
+TABLE_MAGIC = b'EPHT'
+TABLE_VERSION = 1
+
+# magic, version, planet count, Julian Day of the first record (noon UTC), number of days
+HEADER = struct.Struct('<4sHHdI')
+# one longitude per planet, retrograde bitmask (bit i = TABLE_PLANETS[i] has negative speed), padding
+RECORD = struct.Struct(f'<{len(TABLE_PLANETS)}dB7x')
+
+DEFAULT_TABLE_PATH = os.environ.get(
+    'EPHEMERIS_TABLE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ephemeris_daily.bin')
+)
+
+
+def build_ephemeris_table(path: str = DEFAULT_TABLE_PATH, start_year: int = 1900, end_year: int = 2100) -> int:
+    """Write the daily table for 1 Jan start_year .. 31 Dec end_year and return the number of days"""
+    swe.set_sid_mode(swe.SIDM_LAHIRI)
+    FLAGS = swe.FLG_SIDEREAL | swe.FLG_SPEED
+
+    first_jd = swe.julday(start_year, 1, 1, 12.0)
+    num_days = int(swe.julday(end_year, 12, 31, 12.0) - first_jd) + 1
+
+    # Write to a temporary file and swap it in, so running workers never map a partial table
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(TABLE_PLANETS), first_jd, num_days))
+        for day in range(num_days):
+            jd = first_jd + day
+            longitudes = []
+            retrograde_mask = 0
+            for bit, (_, planet_id) in enumerate(TABLE_PLANETS):
+                position = swe.calc_ut(jd, planet_id, FLAGS)[0]
+                longitudes.append(position[0])
+                if position[3] < 0:
+                    retrograde_mask |= 1 << bit
+            f.write(RECORD.pack(*longitudes, retrograde_mask))
+    os.replace(tmp_path, path)
+    return num_days
+
+
+class EphemerisTable:
+    """Read-only, memory-mapped view of a daily ephemeris table (pages shared between processes)"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, planet_count, first_jd, num_days = HEADER.unpack_from(self._mmap, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION or planet_count != len(TABLE_PLANETS):
+            raise ValueError(f"{path} is not a version {TABLE_VERSION} ephemeris table")
+        if len(self._mmap) != HEADER.size + num_days * RECORD.size:
+            raise ValueError(f"{path} is truncated")
+
+        self.path = path
+        self.first_jd = first_jd
+        self.num_days = num_days
+
+    def lookup(self, jd: float) -> Optional[Dict[str, Tuple[float, bool]]]:
+        """(longitude, retrograde) per planet for a noon-UTC Julian Day, or None if not in the table"""
+        day = jd - self.first_jd
+        if day != int(day) or not 0 <= day < self.num_days:
+            return None
+
+        values = RECORD.unpack_from(self._mmap, HEADER.size + int(day) * RECORD.size)
+        retrograde_mask = values[-1]
+        return {
+            name: (values[bit], bool(retrograde_mask >> bit & 1))
+            for bit, (name, _) in enumerate(TABLE_PLANETS)
+        }
+
+
+_table: Optional[EphemerisTable] = None
+_table_checked = False
+
+
+def get_ephemeris_table() -> Optional[EphemerisTable]:
+    """The process-wide table, opened on first use; None when no valid table file exists"""
+    global _table, _table_checked
+    if not _table_checked:
+        _table_checked = True
+        if os.path.exists(DEFAULT_TABLE_PATH):
+            try:
+                _table = EphemerisTable(DEFAULT_TABLE_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Ephemeris table unavailable, using Swiss Ephemeris: {e}")
+    return _table
+
+
+if __name__ == "__main__":
+    start_year = int(sys.argv[1]) if len(sys.argv) > 1 else 1900
+    end_year = int(sys.argv[2]) if len(sys.argv) > 2 else 2100
+    path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_TABLE_PATH
+
+    days = build_ephemeris_table(path, start_year, end_year)
+    print(f"Wrote {days} days ({start_year}-{end_year}) to {path}")
@@ -0,0 +1,116 @@
+"""
+Natal Chart Cache
+Bounded, thread-safe LRU cache (with TTL) of natal calculation results, keyed by normalized birth data.
+Shared by AshtakavargaCalculatorFinal.calculate_positions and transit_calculator.calculate_natal_chart.
+
+Configuration (environment variables):
+- NATAL_CACHE_SIZE: max cached charts per process (default 1024, 0 disables caching)
+- NATAL_CACHE_TTL: seconds before an entry expires (default 86400)
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import swisseph as swe
+
+# Decimal places lat/lon are rounded to in cache keys (~11 m)
+LATLON_PRECISION = 4
+
+
+def natal_cache_key(kind: str, dob: str, tob: str, lat: float, lon: float, tz_offset: float,
+                    ayanamsa: int = swe.SIDM_LAHIRI) -> Tuple:
+    """
+    Normalized cache key for one kind of natal result.
+
+    dob may be YYYY-MM-DD or DD-MM-YYYY and tob H:MM or HH:MM; equivalent inputs give equal keys.
+    Raises ValueError for unparseable dates/times.
+    """
+    parts = [int(part) for part in dob.split('-')]
+    if len(parts) != 3:
+        raise ValueError("Invalid date format")
+    if len(dob.split('-')[0]) != 4:  # DD-MM-YYYY format
+        parts.reverse()
+    hour, minute = (int(part) for part in tob.split(':'))
+    return (
+        kind,
+        tuple(parts),
+        (hour, minute),
+        round(float(lat), LATLON_PRECISION),
+        round(float(lon), LATLON_PRECISION),
+        float(tz_offset),
+        ayanamsa
+    )
+
+
+class NatalCache:
+    """LRU cache with per-entry TTL and hit/miss counters; values are copied in and out"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key (a private copy), or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, computing and storing it on a miss (computed outside the lock)"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters for monitoring (per process)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+natal_cache = NatalCache(
+    maxsize=int(os.environ.get('NATAL_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('NATAL_CACHE_TTL', 86400))
+)
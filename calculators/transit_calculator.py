@@ -6,8 +6,12 @@ Removed Flask/Gradio dependencies, kept only calculation logic for FastAPI integ
 
 import swisseph as swe
 import datetime
+import heapq
 from collections import defaultdict
-from typing import Dict, List, Tuple, Set
+from typing import Dict, Iterable, List, Tuple, Set
+
+from calculators.ephemeris_table import get_ephemeris_table
+from calculators.natal_cache import natal_cache, natal_cache_key
 
 # ============================================================================
 # VEDIC ASTROLOGY CONSTANTS
@@ -133,6 +137,34 @@ def get_planet_positions(jd: float, lat: float, lon: float) -> Tuple[Dict, float
     return results, ascmc[0], cusps_result[1:]
 
 
+def get_transit_planet_positions(jd: float, lat: float, lon: float) -> Dict:
+    """
+    Transit positions (Sun through Saturn, Rahu, Ketu) for a noon-UTC Julian Day.
+    
+    Read from the precomputed daily ephemeris table when it covers the date,
+    otherwise calculated with Swiss Ephemeris via get_planet_positions.
+    """
+    table = get_ephemeris_table()
+    positions = table.lookup(jd) if table else None
+    if positions is None:
+        transit_data, _, _ = get_planet_positions(jd, lat, lon)
+        return transit_data
+    
+    results = {}
+    for name in ['Sun', 'Moon', 'Mercury', 'Venus', 'Mars', 'Jupiter', 'Saturn']:
+        longitude, retrograde = positions[name]
+        results[name] = get_chart_info(longitude, -1.0 if retrograde else 1.0)
+    
+    # Rahu/Ketu are always treated as retrograde
+    rahu_lon, _ = positions['Rahu']
+    results['Rahu'] = get_chart_info(rahu_lon)
+    results['Rahu']['retrograde'] = True
+    results['Ketu'] = get_chart_info((rahu_lon + 180.0) % 360.0)
+    results['Ketu']['retrograde'] = True
+    
+    return results
+
+
 def get_house_from_longitude(longitude: float, asc_deg: float) -> int:
     """Get house number from longitude"""
     lagna_rasi = int(asc_deg // 30)
@@ -277,6 +309,17 @@ def analyze_complete_connections(data: Dict, asc_deg: float) -> List[Dict]:
 
 
 def calculate_natal_chart(dob: str, tob: str, lat: float, lon: float, tz_offset: float) -> Tuple[Dict, List[Dict], float]:
+    """Calculate complete natal chart (served from the natal cache when the birth data repeats)"""
+    try:
+        cache_key = natal_cache_key('transit_natal', dob, tob, lat, lon, tz_offset)
+    except ValueError:
+        return _calculate_natal_chart(dob, tob, lat, lon, tz_offset)
+    return natal_cache.get_or_compute(
+        cache_key, lambda: _calculate_natal_chart(dob, tob, lat, lon, tz_offset)
+    )
+
+
+def _calculate_natal_chart(dob: str, tob: str, lat: float, lon: float, tz_offset: float) -> Tuple[Dict, List[Dict], float]:
     """Calculate complete natal chart"""
     dob_date = datetime.datetime.strptime(dob, '%Y-%m-%d').date()
     tob_time = datetime.datetime.strptime(tob, '%H:%M').time()
@@ -434,6 +477,25 @@ def rank_house_activations(house_activation_data: Dict) -> List[Dict]:
     return ranked
 
 
+def prepare_natal_context(dob: str, tob: str, lat: float, lon: float, tz_offset: float) -> Dict:
+    """
+    Calculate the natal chart once so transits for any number of dates can reuse it.
+    
+    Returns:
+        Dict with natal_data, planet_connections, natal_asc_deg, natal_dict
+        (planet_connections keyed by planet) and the birth lat/lon
+    """
+    natal_data, planet_connections, natal_asc_deg = calculate_natal_chart(dob, tob, lat, lon, tz_offset)
+    return {
+        'natal_data': natal_data,
+        'planet_connections': planet_connections,
+        'natal_asc_deg': natal_asc_deg,
+        'natal_dict': {pc['Planet']: pc for pc in planet_connections},
+        'lat': lat,
+        'lon': lon
+    }
+
+
 def calculate_transits(dob: str, tob: str, lat: float, lon: float, tz_offset: float, 
                        transit_date: str = None) -> Dict:
     """
@@ -447,22 +509,36 @@ def calculate_transits(dob: str, tob: str, lat: float, lon: float, tz_offset: fl
         tz_offset: Timezone offset
         transit_date: Date for transit analysis (YYYY-MM-DD), defaults to today
     
+    Returns:
+        Dict with transit analysis, overall health, and house rankings
+    """
+    natal_context = prepare_natal_context(dob, tob, lat, lon, tz_offset)
+    return calculate_transits_for_natal(natal_context, transit_date)
+
+
+def calculate_transits_for_natal(natal_context: Dict, transit_date: str = None) -> Dict:
+    """
+    Calculate transit analysis for a given date against a precomputed natal chart.
+    
+    Args:
+        natal_context: Result of prepare_natal_context()
+        transit_date: Date for transit analysis (YYYY-MM-DD), defaults to today
+    
     Returns:
         Dict with transit analysis, overall health, and house rankings
     """
     if transit_date is None:
         transit_date = datetime.datetime.now().strftime('%Y-%m-%d')
     
-    # Calculate natal chart
-    natal_data, planet_connections, natal_asc_deg = calculate_natal_chart(dob, tob, lat, lon, tz_offset)
-    
-    # Convert planet_connections to dict for easy lookup
-    natal_dict = {pc['Planet']: pc for pc in planet_connections}
+    natal_dict = natal_context['natal_dict']
+    natal_asc_deg = natal_context['natal_asc_deg']
+    lat = natal_context['lat']
+    lon = natal_context['lon']
     
     # Calculate transit positions
     transit_date_obj = datetime.datetime.strptime(transit_date, '%Y-%m-%d')
     jd = swe.julday(transit_date_obj.year, transit_date_obj.month, transit_date_obj.day, 12.0)
-    transit_data, _, _ = get_planet_positions(jd, lat, lon)
+    transit_data = get_transit_planet_positions(jd, lat, lon)
     
     # Analyze transits
     detailed_analysis = []
@@ -544,6 +620,192 @@ def calculate_transits(dob: str, tob: str, lat: float, lon: float, tz_offset: fl
     }
 
 
+# Longest range accepted by calculate_auspicious_dates_range (about 5 years)
+MAX_AUSPICIOUS_RANGE_DAYS = 5 * 366
+
+
+def score_auspicious_date(natal_context: Dict, date_str: str, sav_chart: List[int] = None) -> Dict:
+    """
+    Score one date for auspiciousness from its transits and optional SAV chart.
+    
+    Args:
+        natal_context: Result of prepare_natal_context()
+        date_str: Date to score (YYYY-MM-DD)
+        sav_chart: SAV chart (12 houses) to factor into scoring, optional
+    
+    Returns:
+        Dict with score, RAG status, reasons and planetary details for the date
+    """
+    # Calculate transits for this date
+    transit_result = calculate_transits_for_natal(natal_context, date_str)
+    
+    overall_health = transit_result.get('overall_health', {})
+    transit_analysis = transit_result.get('transit_analysis', [])
+    
+    base_score = overall_health.get('average_score', 50.0)
+    sav_modifier = 0.0
+    sav_reasons = []
+    
+    # Factor in BAV/SAV if provided
+    if sav_chart and len(sav_chart) == 12:
+        # Check SAV for transit houses
+        for transit in transit_analysis:
+            transit_house = transit.get('transit_house', 0)
+            if 1 <= transit_house <= 12:
+                sav_points = sav_chart[transit_house - 1]
+                
+                # High SAV (>30) boosts score
+                if sav_points >= 30:
+                    sav_modifier += 5.0
+                    sav_reasons.append(f"H{transit_house} (SAV {sav_points})")
+                # Low SAV (<22) reduces score
+                elif sav_points < 22:
+                    sav_modifier -= 3.0
+                    sav_reasons.append(f"H{transit_house} (SAV {sav_points})")
+    
+    # Apply modifier (cap at ±15 points)
+    final_score = max(0, min(100, base_score + sav_modifier))
+    
+    # Get RAG status
+    rag = get_rag_status(final_score)
+    
+    # Extract detailed explanations
+    top_planets = sorted(
+        transit_analysis,
+        key=lambda x: x.get('score', 0),
+        reverse=True
+    )[:5]  # Top 5 planets for detailed explanation
+    
+    reasons = []
+    detailed_explanations = []
+    planetary_details = []
+    
+    for planet_data in top_planets:
+        planet = planet_data.get('planet', '')
+        score = planet_data.get('score', 0)
+        transit_house = planet_data.get('transit_house', 0)
+        natal_house = planet_data.get('natal_house', 0)
+        rag_status = planet_data.get('rag', {}).get('status', '')
+        transit_sign = planet_data.get('transit_sign', '')
+        nakshatra = planet_data.get('nakshatra', '')
+        
+        # Short reason for display
+        if score >= 70:
+            reasons.append(f"{planet} in H{transit_house} ({rag_status})")
+        
+        # Detailed explanation
+        explanation = f"{planet} transiting {transit_sign} in House {transit_house}"
+        if natal_house:
+            explanation += f" (natal position: House {natal_house})"
+        explanation += f" with score {score:.1f}/100 ({rag_status})"
+        if nakshatra:
+            explanation += f" in {nakshatra} Nakshatra"
+        
+        detailed_explanations.append(explanation)
+        
+        # Store planetary details
+        planetary_details.append({
+            'planet': planet,
+            'transit_house': transit_house,
+            'natal_house': natal_house,
+            'transit_sign': transit_sign,
+            'score': round(score, 1),
+            'rag': rag_status,
+            'nakshatra': nakshatra
+        })
+    
+    # Add SAV explanation
+    sav_explanation = ""
+    if sav_reasons:
+        reasons.append(f"SAV: {', '.join(sav_reasons[:2])}")
+        if len(sav_reasons) > 0:
+            sav_explanation = f"Strong SAV houses ({', '.join(sav_reasons[:3])}) enhance planetary transits, boosting overall auspiciousness."
+    
+    # Create comprehensive explanation
+    comprehensive_explanation = ""
+    if detailed_explanations:
+        comprehensive_explanation = "This date is auspicious because: "
+        comprehensive_explanation += "; ".join(detailed_explanations[:3])
+        if sav_explanation:
+            comprehensive_explanation += f" Additionally, {sav_explanation}"
+    
+    return {
+        'date': date_str,
+        'score': round(final_score, 1),
+        'base_score': round(base_score, 1),
+        'sav_modifier': round(sav_modifier, 2) if sav_chart else 0.0,
+        'rag': rag,
+        'reasons': reasons[:5],  # Top 5 short reasons
+        'detailed_explanation': comprehensive_explanation,
+        'planetary_details': planetary_details,
+        'sav_explanation': sav_explanation,
+        'overall_health': overall_health,
+        'transit_count': len(transit_analysis),
+        'green_count': overall_health.get('green_count', 0),
+        'amber_count': overall_health.get('amber_count', 0),
+        'red_count': overall_health.get('red_count', 0)
+    }
+
+
+def iter_date_range(start_date: str, end_date: str):
+    """Yield YYYY-MM-DD strings from start_date to end_date (inclusive)"""
+    current = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+    while current <= end:
+        yield current.strftime('%Y-%m-%d')
+        current += datetime.timedelta(days=1)
+
+
+def iter_date_chunks(start_date: str, end_date: str, chunk_days: int = 31):
+    """Split start_date..end_date (inclusive) into (chunk_start, chunk_end) pairs of at most chunk_days"""
+    current = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+    while current <= end:
+        chunk_end = min(current + datetime.timedelta(days=chunk_days - 1), end)
+        yield current.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')
+        current = chunk_end + datetime.timedelta(days=1)
+
+
+def validate_date_range(start_date: str, end_date: str) -> int:
+    """Check a scan range and return its length in days (raises ValueError if invalid)"""
+    start = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.datetime.strptime(end_date, '%Y-%m-%d').date()
+    num_days = (end - start).days + 1
+    if num_days < 1:
+        raise ValueError("end_date must not be before start_date")
+    if num_days > MAX_AUSPICIOUS_RANGE_DAYS:
+        raise ValueError(f"Date range too long: {num_days} days (maximum {MAX_AUSPICIOUS_RANGE_DAYS})")
+    return num_days
+
+
+def iter_auspicious_dates(natal_context: Dict, start_date: str, end_date: str,
+                          sav_chart: List[int] = None):
+    """Yield the score dict of each date in start_date..end_date, skipping dates that fail"""
+    for date_str in iter_date_range(start_date, end_date):
+        try:
+            yield score_auspicious_date(natal_context, date_str, sav_chart)
+        except Exception as e:
+            # Skip dates that fail calculation
+            print(f"Error calculating date {date_str}: {e}")
+
+
+def score_auspicious_date_range(natal_context: Dict, start_date: str, end_date: str,
+                                sav_chart: List[int] = None) -> List[Dict]:
+    """Score every date in start_date..end_date (chronological list, failed dates skipped)"""
+    return list(iter_auspicious_dates(natal_context, start_date, end_date, sav_chart))
+
+
+def select_top_dates(date_scores: Iterable[Dict], top_n: int) -> List[Dict]:
+    """
+    Pick the top N dates by score with a bounded heap, returned in chronological order.
+    
+    date_scores must be chronological; on equal scores the earlier date wins.
+    """
+    top_dates = heapq.nlargest(top_n, date_scores, key=lambda x: x['score'])
+    top_dates.sort(key=lambda x: x['date'])
+    return top_dates
+
+
 def calculate_auspicious_dates(dob: str, tob: str, lat: float, lon: float, tz_offset: float,
                                month: str, sav_chart: List[int] = None, top_n: int = 10) -> Dict:
     """
@@ -566,149 +828,21 @@ def calculate_auspicious_dates(dob: str, tob: str, lat: float, lon: float, tz_of
     
     # Parse month
     year, month_num = map(int, month.split('-'))
-    
-    # Get all dates in the month
     num_days = calendar.monthrange(year, month_num)[1]
-    dates_in_month = [
-        f"{year}-{month_num:02d}-{day:02d}"
-        for day in range(1, num_days + 1)
-    ]
     
     # Calculate natal chart once (for all dates)
-    natal_data, planet_connections, natal_asc_deg = calculate_natal_chart(dob, tob, lat, lon, tz_offset)
-    natal_dict = {pc['Planet']: pc for pc in planet_connections}
-    
-    # Calculate date scores
-    date_scores = []
-    
-    for date_str in dates_in_month:
-        try:
-            # Calculate transits for this date
-            transit_result = calculate_transits(dob, tob, lat, lon, tz_offset, date_str)
-            
-            overall_health = transit_result.get('overall_health', {})
-            transit_analysis = transit_result.get('transit_analysis', [])
-            
-            base_score = overall_health.get('average_score', 50.0)
-            sav_modifier = 0.0
-            sav_reasons = []
-            
-            # Factor in BAV/SAV if provided
-            if sav_chart and len(sav_chart) == 12:
-                # Check SAV for transit houses
-                for transit in transit_analysis:
-                    transit_house = transit.get('transit_house', 0)
-                    if 1 <= transit_house <= 12:
-                        sav_points = sav_chart[transit_house - 1]
-                        
-                        # High SAV (>30) boosts score
-                        if sav_points >= 30:
-                            sav_modifier += 5.0
-                            sav_reasons.append(f"H{transit_house} (SAV {sav_points})")
-                        # Low SAV (<22) reduces score
-                        elif sav_points < 22:
-                            sav_modifier -= 3.0
-                            sav_reasons.append(f"H{transit_house} (SAV {sav_points})")
-            
-            # Apply modifier (cap at ±15 points)
-            final_score = max(0, min(100, base_score + sav_modifier))
-            
-            # Get RAG status
-            rag = get_rag_status(final_score)
-            
-            # Extract detailed explanations
-            top_planets = sorted(
-                transit_analysis,
-                key=lambda x: x.get('score', 0),
-                reverse=True
-            )[:5]  # Top 5 planets for detailed explanation
-            
-            reasons = []
-            detailed_explanations = []
-            planetary_details = []
-            
-            for planet_data in top_planets:
-                planet = planet_data.get('planet', '')
-                score = planet_data.get('score', 0)
-                transit_house = planet_data.get('transit_house', 0)
-                natal_house = planet_data.get('natal_house', 0)
-                rag_status = planet_data.get('rag', {}).get('status', '')
-                transit_sign = planet_data.get('transit_sign', '')
-                nakshatra = planet_data.get('nakshatra', '')
-                
-                # Short reason for display
-                if score >= 70:
-                    reasons.append(f"{planet} in H{transit_house} ({rag_status})")
-                
-                # Detailed explanation
-                explanation = f"{planet} transiting {transit_sign} in House {transit_house}"
-                if natal_house:
-                    explanation += f" (natal position: House {natal_house})"
-                explanation += f" with score {score:.1f}/100 ({rag_status})"
-                if nakshatra:
-                    explanation += f" in {nakshatra} Nakshatra"
-                
-                detailed_explanations.append(explanation)
-                
-                # Store planetary details
-                planetary_details.append({
-                    'planet': planet,
-                    'transit_house': transit_house,
-                    'natal_house': natal_house,
-                    'transit_sign': transit_sign,
-                    'score': round(score, 1),
-                    'rag': rag_status,
-                    'nakshatra': nakshatra
-                })
-            
-            # Add SAV explanation
-            sav_explanation = ""
-            if sav_reasons:
-                reasons.append(f"SAV: {', '.join(sav_reasons[:2])}")
-                if len(sav_reasons) > 0:
-                    sav_explanation = f"Strong SAV houses ({', '.join(sav_reasons[:3])}) enhance planetary transits, boosting overall auspiciousness."
-            
-            # Create comprehensive explanation
-            comprehensive_explanation = ""
-            if detailed_explanations:
-                comprehensive_explanation = "This date is auspicious because: "
-                comprehensive_explanation += "; ".join(detailed_explanations[:3])
-                if sav_explanation:
-                    comprehensive_explanation += f" Additionally, {sav_explanation}"
-            
-            date_scores.append({
-                'date': date_str,
-                'score': round(final_score, 1),
-                'base_score': round(base_score, 1),
-                'sav_modifier': round(sav_modifier, 2) if sav_chart else 0.0,
-                'rag': rag,
-                'reasons': reasons[:5],  # Top 5 short reasons
-                'detailed_explanation': comprehensive_explanation,
-                'planetary_details': planetary_details,
-                'sav_explanation': sav_explanation,
-                'overall_health': overall_health,
-                'transit_count': len(transit_analysis),
-                'green_count': overall_health.get('green_count', 0),
-                'amber_count': overall_health.get('amber_count', 0),
-                'red_count': overall_health.get('red_count', 0)
-            })
-        except Exception as e:
-            # Skip dates that fail calculation
-            print(f"Error calculating date {date_str}: {e}")
-            continue
+    natal_context = prepare_natal_context(dob, tob, lat, lon, tz_offset)
     
-    # Sort by date (ascending - chronological order)
-    date_scores.sort(key=lambda x: x['date'])
+    # Calculate date scores for all dates in the month (chronological order)
+    date_scores = score_auspicious_date_range(
+        natal_context,
+        f"{year}-{month_num:02d}-01",
+        f"{year}-{month_num:02d}-{num_days:02d}",
+        sav_chart
+    )
     
     # Get top N dates by score (but keep them in chronological order)
-    # First, identify top N by score
-    sorted_by_score = sorted(date_scores, key=lambda x: x['score'], reverse=True)
-    top_n_dates_by_score = sorted_by_score[:top_n]
-    top_n_dates_set = {d['date'] for d in top_n_dates_by_score}
-    
-    # Filter all dates to only include top N, then sort chronologically
-    top_dates_chronological = [d for d in date_scores if d['date'] in top_n_dates_set]
-    top_dates_chronological.sort(key=lambda x: x['date'])
+    top_dates_chronological = select_top_dates(date_scores, top_n)
     
     return {
         'month': month,
@@ -718,3 +852,49 @@ def calculate_auspicious_dates(dob: str, tob: str, lat: float, lon: float, tz_of
         'all_dates': date_scores  # All dates in chronological order
     }
 
+
+def calculate_auspicious_dates_range(dob: str, tob: str, lat: float, lon: float, tz_offset: float,
+                                     start_date: str, end_date: str, sav_chart: List[int] = None,
+                                     top_n: int = 10) -> Dict:
+    """
+    Calculate the top auspicious dates over an arbitrary date range (up to about 5 years).
+    
+    The natal chart is computed once and dates are scored in a single pass; only the
+    running top N is kept, so memory does not grow with the length of the range.
+    
+    Args:
+        dob: Date of birth (YYYY-MM-DD)
+        tob: Time of birth (HH:MM)
+        lat: Latitude
+        lon: Longitude
+        tz_offset: Timezone offset
+        start_date: First date to scan (YYYY-MM-DD)
+        end_date: Last date to scan (YYYY-MM-DD, inclusive)
+        sav_chart: SAV chart (12 houses) to factor into scoring, optional
+        top_n: Number of top dates to return (default 10)
+    
+    Returns:
+        Dict with the top dates (chronological) and the number of dates analyzed
+    """
+    validate_date_range(start_date, end_date)
+    natal_context = prepare_natal_context(dob, tob, lat, lon, tz_offset)
+    
+    total_dates_analyzed = 0
+    
+    def counted(date_scores):
+        nonlocal total_dates_analyzed
+        for date_score in date_scores:
+            total_dates_analyzed += 1
+            yield date_score
+    
+    top_dates = select_top_dates(
+        counted(iter_auspicious_dates(natal_context, start_date, end_date, sav_chart)),
+        top_n
+    )
+    
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_dates_analyzed': total_dates_analyzed,
+        'top_dates': top_dates
+    }
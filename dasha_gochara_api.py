@@ -5,19 +5,47 @@ Uses extracted logic from OpenAIAstroPrediction and cosmicconnection repos
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
+from contextlib import asynccontextmanager
 import swisseph as swe
 import datetime
+import json
 
 from calculators.dasha_calculator import (
+    DASA_LEVEL_NAMES,
+    calculate_dasa_start,
+    calculate_julian_day,
     generate_dasa_table,
     generate_dasa_bhukti_table,
-    get_current_dasa_bhukti
+    get_current_dasa_bhukti,
+    get_moon_longitude,
+    iter_vimshottari_periods
 )
-from calculators.transit_calculator import calculate_transits, calculate_auspicious_dates
+from calculators.transit_calculator import (
+    calculate_transits,
+    calculate_auspicious_dates,
+    calculate_auspicious_dates_range,
+    iter_date_chunks,
+    prepare_natal_context,
+    score_auspicious_date_range,
+    select_top_dates,
+    validate_date_range
+)
+from calculation_executor import CalculationOverloaded, get_executor
+from calculators.natal_cache import natal_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Shut down the calculation pool with the server"""
+    yield
+    get_executor().shutdown()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Dasha/Gochara API",
     description="FastAPI endpoints for Dasha, Bhukti, and Gochara (Transit) calculations",
     version="1.0.0"
@@ -80,6 +108,26 @@ class DashaBhuktiResponse(BaseModel):
     dasa_bhukti_table: List[BhuktiPeriod]
 
 
+class VimshottariPeriodModel(BaseModel):
+    level: int
+    level_name: str
+    lords: List[str]
+    planet: str
+    start: str
+    end: str
+    start_jd: float
+    end_jd: float
+    duration_days: float
+
+
+class DashaPeriodsResponse(BaseModel):
+    birth_nakshatra: str
+    birth_pada: int
+    level: int
+    level_name: str
+    periods: List[VimshottariPeriodModel]
+
+
 class CurrentDashaResponse(BaseModel):
     current_dasa: str
     current_bhukti: Optional[str]
@@ -147,6 +195,25 @@ class AuspiciousDatesResponse(BaseModel):
     all_dates: List[AuspiciousDate]
 
 
+class AuspiciousDatesRangeRequest(BaseModel):
+    dob: str = Field(..., description="Date of birth in YYYY-MM-DD format")
+    tob: str = Field(..., description="Time of birth in HH:MM format")
+    lat: float = Field(..., description="Latitude", ge=-90, le=90)
+    lon: float = Field(..., description="Longitude", ge=-180, le=180)
+    tz_offset: float = Field(..., description="Timezone offset from UTC")
+    start_date: str = Field(..., description="First date to scan in YYYY-MM-DD format")
+    end_date: str = Field(..., description="Last date to scan in YYYY-MM-DD format (inclusive, up to ~5 years after start)")
+    sav_chart: Optional[List[int]] = Field(None, description="SAV chart (12 houses) to factor into scoring")
+    top_n: int = Field(10, description="Number of top dates to return", ge=1, le=100)
+
+
+class AuspiciousDatesRangeResponse(BaseModel):
+    start_date: str
+    end_date: str
+    total_dates_analyzed: int
+    top_dates: List[AuspiciousDate]
+
+
 class HealthResponse(BaseModel):
     status: str
     version: str
@@ -156,20 +223,59 @@ class HealthResponse(BaseModel):
 # HELPER FUNCTIONS
 # ============================================================================
 
-def calculate_julian_day(dob: str, tob: str, tz_offset: float) -> float:
-    """Calculate Julian Day from birth data"""
-    dob_date = datetime.datetime.strptime(dob, '%Y-%m-%d').date()
-    tob_time = datetime.datetime.strptime(tob, '%H:%M').time()
-    local_dt = datetime.datetime.combine(dob_date, tob_time)
-    utc_dt = local_dt - datetime.timedelta(hours=tz_offset)
-    return swe.julday(utc_dt.year, utc_dt.month, utc_dt.day, utc_dt.hour + utc_dt.minute/60.0)
+def compute_dasa_table(dob: str, tob: str, tz_offset: float, total_years: int):
+    """Dasa table for birth data - runs in the calculation executor"""
+    jd = calculate_julian_day(dob, tob, tz_offset)
+    return generate_dasa_table(jd, get_moon_longitude(jd), total_years)
+
 
+def compute_dasa_bhukti_table(dob: str, tob: str, tz_offset: float):
+    """Dasa-Bhukti table for birth data - runs in the calculation executor"""
+    jd = calculate_julian_day(dob, tob, tz_offset)
+    return generate_dasa_bhukti_table(jd, get_moon_longitude(jd))
 
-def get_moon_longitude(jd: float) -> float:
-    """Get Moon's longitude for Dasha calculations"""
-    FLAGS = swe.FLG_SIDEREAL
-    moon_result = swe.calc_ut(jd, swe.MOON, FLAGS)[0]
-    return moon_result[0]
+
+def compute_current_dasa_bhukti(dob: str, tob: str, tz_offset: float, current_dt: datetime.datetime) -> Dict:
+    """Current Dasa/Bhukti for birth data - runs in the calculation executor"""
+    jd = calculate_julian_day(dob, tob, tz_offset)
+    return get_current_dasa_bhukti(jd, get_moon_longitude(jd), current_dt)
+
+
+def compute_vimshottari_periods(dob: str, tob: str, tz_offset: float, level: int,
+                                start_jd: Optional[float], end_jd: Optional[float]):
+    """Vimshottari periods at one level within a window - runs in the calculation executor"""
+    jd = calculate_julian_day(dob, tob, tz_offset)
+    moon_longitude = get_moon_longitude(jd)
+    birth_nakshatra, birth_pada, _, _ = calculate_dasa_start(moon_longitude)
+    periods = [
+        (period.lords, period.start_jd, period.end_jd)
+        for period in iter_vimshottari_periods(jd, moon_longitude, level, start_jd, end_jd, tz_offset)
+    ]
+    return birth_nakshatra, birth_pada, periods
+
+
+def local_date_to_jd(date_str: str, tz_offset: float) -> float:
+    """Julian Day (UT) of local midnight on a YYYY-MM-DD date"""
+    return calculate_julian_day(date_str, "00:00", tz_offset)
+
+
+def format_jd(jd: float, tz_offset: float) -> str:
+    """Local 'YYYY-MM-DD HH:MM' for a Julian Day (UT)"""
+    year, month, day, hours = swe.revjul(jd)
+    utc_dt = datetime.datetime(year, month, day) + datetime.timedelta(hours=hours)
+    return (utc_dt + datetime.timedelta(hours=tz_offset)).strftime('%Y-%m-%d %H:%M')
+
+
+async def run_calculation(func, *args, **kwargs):
+    """Await func on the calculation executor, answering 503 when it is overloaded"""
+    try:
+        return await get_executor().run(func, *args, **kwargs)
+    except CalculationOverloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy, retry shortly: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
 
 
 # ============================================================================
@@ -185,6 +291,16 @@ async def health_check():
     }
 
 
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    """
+    Natal chart cache size and hit/miss counters for monitoring.
+    
+    Counters are per process: with CALC_EXECUTOR=process each worker keeps its own cache.
+    """
+    return {"natal_cache": natal_cache.stats()}
+
+
 @app.post("/api/v1/dasha/calculate", response_model=DashaResponse)
 async def calculate_dasha(birth_data: BirthData, total_years: int = 120):
     """
@@ -193,11 +309,8 @@ async def calculate_dasha(birth_data: BirthData, total_years: int = 120):
     Returns all Dasa periods up to total_years (default 120 for full cycle).
     """
     try:
-        jd = calculate_julian_day(birth_data.dob, birth_data.tob, birth_data.tz_offset)
-        moon_longitude = get_moon_longitude(jd)
-        
-        birth_nakshatra, birth_pada, dasa_table = generate_dasa_table(
-            jd, moon_longitude, total_years
+        birth_nakshatra, birth_pada, dasa_table = await run_calculation(
+            compute_dasa_table, birth_data.dob, birth_data.tob, birth_data.tz_offset, total_years
         )
         
         return DashaResponse(
@@ -205,6 +318,8 @@ async def calculate_dasha(birth_data: BirthData, total_years: int = 120):
             birth_pada=birth_pada,
             dasa_periods=[DashaPeriod(**period) for period in dasa_table]
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
@@ -218,16 +333,70 @@ async def calculate_dasha_bhukti(birth_data: BirthData):
     with their corresponding Bhukti (sub-period) breakdowns.
     """
     try:
-        jd = calculate_julian_day(birth_data.dob, birth_data.tob, birth_data.tz_offset)
-        moon_longitude = get_moon_longitude(jd)
-        
-        birth_nakshatra, birth_pada, bhukti_table = generate_dasa_bhukti_table(jd, moon_longitude)
+        birth_nakshatra, birth_pada, bhukti_table = await run_calculation(
+            compute_dasa_bhukti_table, birth_data.dob, birth_data.tob, birth_data.tz_offset
+        )
         
         return DashaBhuktiResponse(
             birth_nakshatra=birth_nakshatra,
             birth_pada=birth_pada,
             dasa_bhukti_table=[BhuktiPeriod(**period) for period in bhukti_table]
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+@app.post("/api/v1/dasha/periods", response_model=DashaPeriodsResponse)
+async def calculate_dasha_periods(birth_data: BirthData, level: int = 2,
+                                  start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    Get Vimshottari periods at any level within a date window.
+    
+    Levels: 1 = Maha Dasa, 2 = Bhukti (Antara), 3 = Pratyantara, 4 = Sookshma.
+    Only the periods overlapping start_date..end_date (YYYY-MM-DD, end exclusive, local
+    dates) are expanded, e.g. level=4 with 2027-01-01..2028-01-01 returns the Sookshma
+    periods of 2027. Without a window the whole 120-year cycle is returned.
+    Start/end times are local to the birth timezone offset.
+    """
+    if level not in DASA_LEVEL_NAMES:
+        raise HTTPException(status_code=400, detail=f"level must be between 1 and {len(DASA_LEVEL_NAMES)}")
+    
+    try:
+        start_jd = local_date_to_jd(start_date, birth_data.tz_offset) if start_date else None
+        end_jd = local_date_to_jd(end_date, birth_data.tz_offset) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    
+    try:
+        birth_nakshatra, birth_pada, periods = await run_calculation(
+            compute_vimshottari_periods, birth_data.dob, birth_data.tob, birth_data.tz_offset,
+            level, start_jd, end_jd
+        )
+        
+        return DashaPeriodsResponse(
+            birth_nakshatra=birth_nakshatra,
+            birth_pada=birth_pada,
+            level=level,
+            level_name=DASA_LEVEL_NAMES[level],
+            periods=[
+                VimshottariPeriodModel(
+                    level=level,
+                    level_name=DASA_LEVEL_NAMES[level],
+                    lords=list(lords),
+                    planet=lords[-1],
+                    start=format_jd(period_start, birth_data.tz_offset),
+                    end=format_jd(period_end, birth_data.tz_offset),
+                    start_jd=period_start,
+                    end_jd=period_end,
+                    duration_days=round(period_end - period_start, 4)
+                )
+                for lords, period_start, period_end in periods
+            ]
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
@@ -241,17 +410,18 @@ async def get_current_dasha(birth_data: BirthData, current_date: Optional[str] =
     If current_date is not provided, uses today's date.
     """
     try:
-        jd = calculate_julian_day(birth_data.dob, birth_data.tob, birth_data.tz_offset)
-        moon_longitude = get_moon_longitude(jd)
-        
         if current_date:
             current_dt = datetime.datetime.strptime(current_date, '%Y-%m-%d')
         else:
             current_dt = datetime.datetime.now()
         
-        current_info = get_current_dasa_bhukti(jd, moon_longitude, current_dt)
+        current_info = await run_calculation(
+            compute_current_dasa_bhukti, birth_data.dob, birth_data.tob, birth_data.tz_offset, current_dt
+        )
         
         return CurrentDashaResponse(**current_info)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
@@ -269,7 +439,8 @@ async def calculate_gochara(birth_data: BirthData, transit_date: Optional[str] =
     If transit_date is not provided, uses today's date.
     """
     try:
-        result = calculate_transits(
+        result = await run_calculation(
+            calculate_transits,
             birth_data.dob,
             birth_data.tob,
             birth_data.lat,
@@ -284,6 +455,8 @@ async def calculate_gochara(birth_data: BirthData, transit_date: Optional[str] =
             transit_analysis=[TransitAnalysis(**ta) for ta in result['transit_analysis']],
             house_rankings=result['house_rankings']
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
@@ -321,7 +494,8 @@ async def get_auspicious_dates(request: AuspiciousDatesRequest):
     - RED (<40): Less auspicious
     """
     try:
-        result = calculate_auspicious_dates(
+        result = await run_calculation(
+            calculate_auspicious_dates,
             dob=request.dob,
             tob=request.tob,
             lat=request.lat,
@@ -340,8 +514,102 @@ async def get_auspicious_dates(request: AuspiciousDatesRequest):
             top_10=[AuspiciousDate(**date) for date in result['top_10']],
             all_dates=[AuspiciousDate(**date) for date in result['all_dates']]
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+@app.post("/api/v1/gochara/auspicious-dates/range", response_model=AuspiciousDatesRangeResponse)
+async def get_auspicious_dates_range(request: AuspiciousDatesRangeRequest):
+    """
+    Calculate the top auspicious dates over a date range (e.g. a whole year).
+    
+    Same scoring as /api/v1/gochara/auspicious-dates, but for any start/end date
+    (up to ~5 years) in a single pass. Returns the global top N in chronological order.
+    """
+    try:
+        validate_date_range(request.start_date, request.end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        result = await run_calculation(
+            calculate_auspicious_dates_range,
+            dob=request.dob,
+            tob=request.tob,
+            lat=request.lat,
+            lon=request.lon,
+            tz_offset=request.tz_offset,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            sav_chart=request.sav_chart,
+            top_n=request.top_n
+        )
+        
+        return AuspiciousDatesRangeResponse(
+            start_date=result['start_date'],
+            end_date=result['end_date'],
+            total_dates_analyzed=result['total_dates_analyzed'],
+            top_dates=[AuspiciousDate(**date) for date in result['top_dates']]
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+
+@app.post("/api/v1/gochara/auspicious-dates/range/stream")
+async def stream_auspicious_dates_range(request: AuspiciousDatesRangeRequest):
+    """
+    Stream per-day auspicious date scores over a date range as NDJSON.
+    
+    Emits one JSON line per date as the scan progresses (chronological), followed by
+    a final line {"done": true, "total_dates_analyzed": ..., "top_dates": [...]}.
+    If the scan fails part way, the last line is {"error": "..."}.
+    """
+    try:
+        validate_date_range(request.start_date, request.end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        natal_context = await run_calculation(
+            prepare_natal_context, request.dob, request.tob, request.lat, request.lon, request.tz_offset
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    
+    async def generate():
+        top_dates = []
+        total_dates_analyzed = 0
+        try:
+            # Score a month at a time so each chunk is one bounded executor job
+            for chunk_start, chunk_end in iter_date_chunks(request.start_date, request.end_date):
+                date_scores = await run_calculation(
+                    score_auspicious_date_range, natal_context, chunk_start, chunk_end, request.sav_chart
+                )
+                for date_score in date_scores:
+                    yield json.dumps(date_score, ensure_ascii=False) + "\n"
+                total_dates_analyzed += len(date_scores)
+                # Earlier top dates come first, so ties still go to the earlier date
+                top_dates = select_top_dates(top_dates + date_scores, request.top_n)
+        except HTTPException as e:
+            yield json.dumps({"error": e.detail}) + "\n"
+            return
+        except Exception as e:
+            yield json.dumps({"error": f"Calculation error: {str(e)}"}) + "\n"
+            return
+        
+        yield json.dumps({
+            "done": True,
+            "total_dates_analyzed": total_dates_analyzed,
+            "top_dates": top_dates
+        }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 if __name__ == "__main__":
@@ -81,6 +81,41 @@ def test_sav_calculation():
         print(f"Error: {response.text}")
     print()
 
+def test_batch_calculation():
+    """Test batch calculation endpoint"""
+    print("Testing /api/v1/calculate/batch endpoint...")
+    payload = {
+        "records": [
+            {
+                "name": "Test User",
+                "dob": "1978-09-18",
+                "tob": "17:35",
+                "latitude": 13.0827,
+                "longitude": 80.2707,
+                "tz_offset": 5.5
+            },
+            {
+                "name": "Second User",
+                "dob": "1990-01-01",
+                "tob": "06:00",
+                "latitude": 19.0760,
+                "longitude": 72.8777,
+                "tz_offset": 5.5
+            }
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/calculate/batch", json=payload)
+    print(f"Status: {response.status_code}")
+    if response.status_code == 200:
+        data = response.json()
+        print(f"Count: {data['count']}")
+        print(f"SAV Totals: {data['sav_total']}")
+        print(f"Sun BAV Totals: {data['bav_totals']['SUN']}")
+        print(f"Errors: {data['errors']}")
+    else:
+        print(f"Error: {response.text}")
+    print()
+
 if __name__ == "__main__":
     print("=" * 60)
     print("FastAPI Endpoint Tests")
@@ -92,6 +127,7 @@ if __name__ == "__main__":
         test_full_calculation()
         test_bav_calculation()
         test_sav_calculation()
+        test_batch_calculation()
         print("✅ All tests completed!")
     except requests.exceptions.ConnectionError:
         print("❌ Error: Cannot connect to API server.")
@@ -114,6 +114,52 @@ def test_current_dasha():
         assert False
 
 
+def test_dasha_periods():
+    """Test multi-level Vimshottari periods endpoint"""
+    print("\n" + "="*60)
+    print("Testing Vimshottari Periods (Sookshma, one year)")
+    print("="*60)
+    
+    response = requests.post(
+        f"{BASE_URL}/api/v1/dasha/periods",
+        params={"level": 4, "start_date": "2027-01-01", "end_date": "2028-01-01"},
+        json=TEST_BIRTH_DATA
+    )
+    print(f"Status: {response.status_code}")
+    
+    if response.status_code == 200:
+        data = response.json()
+        periods = data['periods']
+        print(f"Periods: {len(periods)}")
+        print(f"First: {' > '.join(periods[0]['lords'])} {periods[0]['start']} to {periods[0]['end']}")
+        assert all(len(p['lords']) == 4 for p in periods)
+        assert all(a['end_jd'] == b['start_jd'] for a, b in zip(periods, periods[1:]))
+        print("✅ Vimshottari periods check passed")
+    else:
+        print(f"❌ Error: {response.text}")
+        assert False
+
+
+def test_dasha_periods_match_dasa_table():
+    """Maha Dasa periods start and end on the same dates as the Dasa table"""
+    print("\n" + "="*60)
+    print("Testing Vimshottari Periods vs Dasa Table")
+    print("="*60)
+    
+    periods = requests.post(f"{BASE_URL}/api/v1/dasha/periods", params={"level": 1},
+                            json=TEST_BIRTH_DATA).json()['periods']
+    dasa_table = requests.post(f"{BASE_URL}/api/v1/dasha/calculate",
+                               json=TEST_BIRTH_DATA).json()['dasa_periods']
+    
+    # One full cycle (the table restarts its second cycle from Ketu)
+    for period, dasa in zip(periods[:9], dasa_table[:9]):
+        print(f"{period['planet']}: {period['start'][:10]} / {dasa['start_date']}")
+        assert period['planet'] == dasa['planet']
+        assert period['start'][:10] == dasa['start_date']
+        assert period['end'][:10] == dasa['end_date']
+    print("✅ Periods match the Dasa table")
+
+
 def test_gochara_calculate():
     """Test Gochara (transit) calculation endpoint"""
     print("\n" + "="*60)
@@ -177,6 +223,39 @@ def test_current_gochara():
         assert False
 
 
+def test_auspicious_dates_range():
+    """Test auspicious dates range endpoint (JSON and NDJSON stream)"""
+    print("\n" + "="*60)
+    print("Testing Auspicious Dates Range")
+    print("="*60)
+    
+    payload = {**TEST_BIRTH_DATA, "start_date": "2026-01-01", "end_date": "2026-12-31", "top_n": 5}
+    response = requests.post(f"{BASE_URL}/api/v1/gochara/auspicious-dates/range", json=payload)
+    print(f"Status: {response.status_code}")
+    
+    if response.status_code == 200:
+        data = response.json()
+        print(f"Dates Analyzed: {data['total_dates_analyzed']}")
+        for date in data['top_dates']:
+            print(f"  {date['date']}: {date['score']:.1f} ({date['rag']['status']})")
+        assert data['total_dates_analyzed'] == 365
+        assert len(data['top_dates']) == 5
+    else:
+        print(f"❌ Error: {response.text}")
+        assert False
+    
+    response = requests.post(
+        f"{BASE_URL}/api/v1/gochara/auspicious-dates/range/stream",
+        json=payload,
+        stream=True
+    )
+    lines = [json.loads(line) for line in response.iter_lines() if line]
+    print(f"Streamed lines: {len(lines)}")
+    assert lines[-1]['done']
+    assert lines[-1]['top_dates'] == data['top_dates']
+    print("✅ Auspicious dates range passed")
+
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "="*60)
@@ -193,8 +272,11 @@ def run_all_tests():
         test_dasha_calculate()
         test_dasha_bhukti()
         test_current_dasha()
+        test_dasha_periods()
+        test_dasha_periods_match_dasa_table()
         test_gochara_calculate()
         test_current_gochara()
+        test_auspicious_dates_range()
         
         print("\n" + "="*60)
         print("✅ ALL TESTS PASSED!")